@@ -0,0 +1,221 @@
+"""
+Benchmarks the stages of the generation pipeline on the face_images/aldrich letters, so upgrades to
+pythonocc or changes here can be checked for regressions:
+
+    create_char[X]            building each glyph's face from its svg file, without a cache
+    combine_faces[XY]         extruding and intersecting a letter pair
+    combine_outlines[XY]      combining the same pair with the polygon engine
+    combine_voxels[XY]        combining the same pair's bitmaps with the voxel engine
+    split_compound[XY]        splitting the combined pair into cells
+    create_solid_graph[XY]    building the adjacency graph of the cells
+    SolidFaceValidator[XY]    building the validator for the cells
+    remove_redundant_geom[XY] all of redundant geometry removal, including the split
+
+Each benchmark is run --repeat times, and the best and median times are kept. The inputs a stage
+needs (eg. the cells for create_solid_graph) are made once beforehand and aren't timed. Stages that
+take ShapeProperties get fresh ones each run, since remove_redundant_geom computes them too.
+
+Baselines are only meaningful on the machine they were recorded on, so none are kept in the repo.
+Record one with --save-baseline before making a change, then compare against it with --baseline.
+Benchmarks whose best time is more than --threshold slower than the baseline's are flagged, and
+the exit code is 1 if there are any.
+
+Usage: python benchmarks.py [--repeat n] [--height height_mm] [--pairs pair ...] [--filter text]
+                            [--save-baseline file] [--baseline file] [--threshold fraction] [--output file]
+eg.    python benchmarks.py --save-baseline baseline.json
+       python benchmarks.py --baseline baseline.json --threshold 0.1
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+DEFAULT_PAIRS = ["HV", "ET", "GE", "Q4"]
+DEFAULT_THRESHOLD = 0.1
+FONT_DIR = Path(__file__).parent / "face_images/aldrich"
+
+
+def time_call(fn, repeat):
+    """
+    :return: The time each of the repeat calls took, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def iter_benchmarks(pairs, height_mm, font_dir=FONT_DIR):
+    """
+    Yields (name, fn) for each benchmark. The setup for each one happens just before it's yielded,
+    so time fn as it comes rather than collecting them all first
+    """
+    from combiner import combine_faces
+    from face_factory import FaceFactory
+    from geom_removal import create_solid_graph, remove_redundant_geom
+    from polygon_combiner import combine_outlines
+    from shape_properties import ShapeProperties
+    from solid_face_validator import SolidFaceValidator
+    from util import split_compound
+    from voxel_engine import DEFAULT_RESOLUTION, combine_letters, rasterize
+
+    # No cache, so every call builds the face from scratch
+    face_factory = FaceFactory(Path(font_dir))
+    for filepath in sorted(Path(font_dir).glob("*.svg")):
+        char = filepath.stem.upper()
+        yield "create_char[{}]".format(char), lambda char=char: face_factory.create_char(char, height_mm)
+
+    for pair in pairs:
+        assert len(pair) == 2
+        face1 = face_factory.create_char(pair[0], height_mm)
+        face2 = face_factory.create_char(pair[1], height_mm)
+        yield "combine_faces[{}]".format(pair), lambda: combine_faces(face1, face2, height_mm)
+        outlines1 = face_factory.create_outlines(pair[0])
+        outlines2 = face_factory.create_outlines(pair[1])
+        yield "combine_outlines[{}]".format(pair), lambda: combine_outlines(outlines1, outlines2, height_mm)
+        voxel_size = height_mm / DEFAULT_RESOLUTION
+        bitmap1 = rasterize(outlines1, height_mm, voxel_size)
+        bitmap2 = rasterize(outlines2, height_mm, voxel_size)
+        yield "combine_voxels[{}]".format(pair), lambda: combine_letters(bitmap1, bitmap2, voxel_size)
+
+        combined = combine_faces(face1, face2, height_mm)
+        yield "split_compound[{}]".format(pair), lambda: split_compound(combined)
+
+        solids = split_compound(combined)
+        yield "create_solid_graph[{}]".format(pair), \
+            lambda: create_solid_graph(solids, [ShapeProperties(s) for s in solids])
+        yield "SolidFaceValidator[{}]".format(pair), \
+            lambda: SolidFaceValidator(combined, solids, [ShapeProperties(s) for s in solids])
+        yield "remove_redundant_geom[{}]".format(pair), lambda: remove_redundant_geom(combined)
+
+
+def run_benchmarks(pairs, height_mm, repeat, name_filter=None):
+    """
+    :param name_filter: Only run the benchmarks with this in their name
+    :return: A dict of benchmark name to its best and median seconds and how many runs they're from
+    """
+    results = {}
+    for name, fn in iter_benchmarks(pairs, height_mm):
+        if name_filter and name_filter not in name:
+            continue
+        times = time_call(fn, repeat)
+        results[name] = {"best": min(times), "median": statistics.median(times), "repeat": repeat}
+        print("{:<32} best {:>9.4f}s  median {:>9.4f}s".format(name, min(times), statistics.median(times)),
+              file=sys.stderr)
+    return results
+
+
+def environment():
+    """
+    What the results were recorded with, so baselines from a different setup can be spotted
+    """
+    try:
+        from OCC import VERSION as occ_version
+    except ImportError:
+        occ_version = None
+    return {
+        "python": platform.python_version(),
+        "pythonocc": occ_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "recorded": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def save_results(results, filepath, height_mm):
+    data = {"environment": environment(), "height_mm": height_mm, "results": results}
+    Path(filepath).write_text(json.dumps(data, indent=1, sort_keys=True))
+
+
+def load_results(filepath):
+    data = json.loads(Path(filepath).read_text())
+    if "results" not in data:
+        raise ValueError("Invalid benchmark results file: {}. It has no results".format(filepath))
+    return data
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares the best times of the benchmarks in both results
+    :param threshold: How much slower than the baseline a benchmark can be before it's a regression,
+    as a fraction of the baseline's time
+    :return: A list of (name, baseline seconds, current seconds, change as a fraction, status) sorted
+    by name, where status is "regression", "improvement", "ok", "new" or "missing"
+    """
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline:
+            rows.append((name, None, current[name]["best"], None, "new"))
+            continue
+        if name not in current:
+            rows.append((name, baseline[name]["best"], None, None, "missing"))
+            continue
+
+        before = baseline[name]["best"]
+        after = current[name]["best"]
+        change = (after - before) / before if before > 0 else 0.0
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((name, before, after, change, status))
+    return rows
+
+
+def format_comparison(rows, threshold=DEFAULT_THRESHOLD):
+    def seconds(value):
+        return "{:.4f}".format(value) if value is not None else "-"
+
+    lines = ["{:<32} {:>12} {:>12} {:>9}  {}".format("benchmark", "baseline (s)", "current (s)", "change", "status")]
+    for name, before, after, change, status in rows:
+        change_text = "{:+.1%}".format(change) if change is not None else "-"
+        lines.append("{:<32} {:>12} {:>12} {:>9}  {}".format(name, seconds(before), seconds(after), change_text,
+                                                             status.upper() if status == "regression" else status))
+    regressions = sum(1 for row in rows if row[4] == "regression")
+    lines.append("{} regressions beyond {:.0%} out of {} benchmarks".format(regressions, threshold, len(rows)))
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the generation pipeline's stages and compare to a baseline")
+    parser.add_argument('--pairs', metavar='pair', type=str, nargs='+', default=DEFAULT_PAIRS,
+                        help="The letter pairs to benchmark the per-pair stages on")
+    parser.add_argument('--height', metavar='height_mm', type=float, default=50, help="The height of the characters")
+    parser.add_argument('--repeat', type=int, default=5, help="How many times to run each benchmark")
+    parser.add_argument('--filter', metavar='text', type=str, default=None,
+                        help="Only run the benchmarks with this in their name, eg. combine_faces")
+    parser.add_argument('--save-baseline', metavar='file', type=str, default=None,
+                        help="Write the results to this file, to compare later runs against")
+    parser.add_argument('--baseline', metavar='file', type=str, default=None,
+                        help="Compare the results to a baseline written by --save-baseline")
+    parser.add_argument('--threshold', metavar='fraction', type=float, default=DEFAULT_THRESHOLD,
+                        help="How much slower than the baseline a benchmark can be before it's flagged")
+    parser.add_argument('--output', metavar='file', type=str, default=None,
+                        help="Also write the results to this file, without making them the baseline")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline) if args.baseline is not None else None
+    results = run_benchmarks(args.pairs, args.height, args.repeat, args.filter)
+
+    for path in (args.save_baseline, args.output):
+        if path is not None:
+            save_results(results, path, args.height)
+            print("Wrote {}".format(path))
+
+    if baseline is not None:
+        if baseline.get("height_mm") != args.height:
+            print("Warning: the baseline was recorded with a height of {}mm".format(baseline.get("height_mm")))
+        baseline_results = baseline["results"]
+        if args.filter:
+            baseline_results = {name: r for name, r in baseline_results.items() if args.filter in name}
+        rows = compare(baseline_results, results, args.threshold)
+        print(format_comparison(rows, args.threshold))
+        sys.exit(1 if any(row[4] == "regression" for row in rows) else 0)
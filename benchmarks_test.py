@@ -0,0 +1,51 @@
+import unittest
+import pathlib
+import tempfile
+from benchmarks import compare, format_comparison, load_results, save_results, time_call
+
+
+def result(best):
+    return {"best": best, "median": best, "repeat": 1}
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare(self):
+        baseline = {"a": result(1.0), "b": result(1.0), "c": result(1.0), "gone": result(1.0)}
+        current = {"a": result(1.05), "b": result(1.5), "c": result(0.5), "added": result(2.0)}
+        rows = compare(baseline, current, threshold=0.1)
+        self.assertEqual(["a", "added", "b", "c", "gone"], [row[0] for row in rows])
+        statuses = {row[0]: row[4] for row in rows}
+        self.assertEqual({"a": "ok", "added": "new", "b": "regression", "c": "improvement", "gone": "missing"},
+                         statuses)
+        self.assertAlmostEqual(0.5, rows[2][3])
+
+    def test_format_comparison(self):
+        rows = compare({"a": result(1.0)}, {"a": result(2.0)}, threshold=0.1)
+        report = format_comparison(rows, threshold=0.1)
+        self.assertIn("REGRESSION", report)
+        self.assertIn("+100.0%", report)
+        self.assertIn("1 regressions beyond 10% out of 1 benchmarks", report)
+
+    def test_save_and_load_results(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = pathlib.Path(tmp_dir, "baseline.json")
+            save_results({"a": result(1.0)}, filepath, 50)
+            data = load_results(filepath)
+            self.assertEqual({"a": result(1.0)}, data["results"])
+            self.assertEqual(50, data["height_mm"])
+            self.assertIn("python", data["environment"])
+
+            filepath.write_text("{}")
+            with self.assertRaises(ValueError):
+                load_results(filepath)
+
+    def test_time_call(self):
+        calls = []
+        times = time_call(lambda: calls.append(1), 3)
+        self.assertEqual(3, len(calls))
+        self.assertEqual(3, len(times))
+        self.assertTrue(all(t >= 0 for t in times))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+class BooleanOptions():
+    """
+    Settings applied to every OCC boolean operation we run (BRepAlgoAPI_Common in combine_faces and
+    BOPAlgo_Builder in split_compound). The defaults match OCC's own defaults
+    """
+
+    # The names of the OCC glue enum values. OCC is only imported once the options are applied,
+    # so the options can be set up (eg. from command line arguments) without loading it
+    GLUE_MODES = {
+        "off": "BOPAlgo_GlueOff",
+        "shift": "BOPAlgo_GlueShift",
+        "full": "BOPAlgo_GlueFull",
+    }
+
+    def __init__(self, parallel=False, fuzzy_value=0.0, use_obb=False, glue="off"):
+        """
+        :param parallel: Run the boolean operations multi-threaded
+        :param fuzzy_value: Extra tolerance (in mm) used to treat nearly coincident geometry as coincident
+        :param use_obb: Use oriented bounding boxes to filter out pairs of sub-shapes that can't interact
+        :param glue: How to glue shapes with coincident faces. One of "off", "shift" or "full". Only correct
+        if the arguments really do only share faces, but much faster when they do
+        """
+        if glue not in self.GLUE_MODES:
+            raise ValueError("Invalid glue option: '{}'. Please use one of {}".format(glue, list(self.GLUE_MODES)))
+        if fuzzy_value < 0:
+            raise ValueError("Invalid fuzzy value: {}. Must not be negative".format(fuzzy_value))
+
+        self.parallel = parallel
+        self.fuzzy_value = fuzzy_value
+        self.use_obb = use_obb
+        self.glue = glue
+
+    def apply(self, operation):
+        """
+        Applies the options to a BOPAlgo_Builder or BRepAlgoAPI boolean operation. Must be called before
+        the operation is performed
+        """
+        from OCC.Core import BOPAlgo
+
+        operation.SetRunParallel(self.parallel)
+        if self.fuzzy_value > 0:
+            operation.SetFuzzyValue(self.fuzzy_value)
+        operation.SetUseOBB(self.use_obb)
+        operation.SetGlue(getattr(BOPAlgo, self.GLUE_MODES[self.glue]))
+
+    def key(self):
+        """
+        The options that can change the result of an operation, for use in cache keys
+        """
+        return self.fuzzy_value, self.glue
+
+    def __repr__(self):
+        return "BooleanOptions(parallel={}, fuzzy_value={}, use_obb={}, glue='{}')".format(
+            self.parallel, self.fuzzy_value, self.use_obb, self.glue)
+
+
+DEFAULT_BOOLEAN_OPTIONS = BooleanOptions()
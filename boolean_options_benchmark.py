@@ -0,0 +1,59 @@
+"""
+Times combine_faces and split_compound for some letter pairs, with each BooleanOptions setting
+turned on by itself and then all together, and compares them to OCC's defaults.
+
+Usage: python boolean_options_benchmark.py [--height height_mm] [--repeat n] [pair ...]
+eg.    python boolean_options_benchmark.py HV ET GE Q4
+"""
+import argparse
+import time
+from pathlib import Path
+from boolean_options import BooleanOptions
+from combiner import combine_faces
+from face_factory import FaceFactory
+from util import split_compound
+
+CONFIGURATIONS = [
+    ("default", BooleanOptions()),
+    ("parallel", BooleanOptions(parallel=True)),
+    ("fuzzy", BooleanOptions(fuzzy_value=1e-4)),
+    ("obb", BooleanOptions(use_obb=True)),
+    ("glue shift", BooleanOptions(glue="shift")),
+    ("all", BooleanOptions(parallel=True, fuzzy_value=1e-4, use_obb=True, glue="shift")),
+]
+
+
+def time_call(fn, repeat):
+    # Report the best time, which is the least affected by whatever else the machine is doing
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(pairs, height_mm, repeat):
+    face_factory = FaceFactory(Path(__file__).parent / "face_images/aldrich")
+
+    print("{:<6} {:<12} {:>12} {:>12} {:>8}".format("pair", "options", "combine (s)", "split (s)", "cells"))
+    for pair in pairs:
+        assert len(pair) == 2
+        face1 = face_factory.create_char(pair[0], height_mm)
+        face2 = face_factory.create_char(pair[1], height_mm)
+        for name, options in CONFIGURATIONS:
+            combine_time, combined = time_call(lambda: combine_faces(face1, face2, height_mm, options), repeat)
+            split_time, cells = time_call(lambda: split_compound(combined, options), repeat)
+            print("{:<6} {:<12} {:>12.3f} {:>12.3f} {:>8}".format(pair, name, combine_time, split_time, len(cells)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the boolean operations with each BooleanOptions setting")
+    parser.add_argument('pairs', metavar='pair', type=str, nargs='*', default=["HV", "ET", "GE", "Q4"],
+                        help="the letter pairs to combine")
+    parser.add_argument('--height', metavar='height_mm', type=float, default=50, help="The height of the characters")
+    parser.add_argument('--repeat', type=int, default=3, help="How many times to time each operation")
+    args = parser.parse_args()
+
+    main(args.pairs, args.height, args.repeat)
@@ -0,0 +1,49 @@
+import unittest
+from boolean_options import BooleanOptions, DEFAULT_BOOLEAN_OPTIONS
+
+
+class TestBooleanOptions(unittest.TestCase):
+    def test_default_key_is_stable(self):
+        self.assertEqual(DEFAULT_BOOLEAN_OPTIONS.key(), BooleanOptions().key())
+        self.assertEqual(BooleanOptions().key(), BooleanOptions(fuzzy_value=0.0, glue="off").key())
+
+    def test_different_options_different_keys(self):
+        keys = [
+            BooleanOptions().key(),
+            BooleanOptions(fuzzy_value=1e-4).key(),
+            BooleanOptions(glue="shift").key(),
+            BooleanOptions(glue="full").key(),
+            BooleanOptions(fuzzy_value=1e-4, glue="shift").key(),
+        ]
+        self.assertEqual(len(keys), len(set(keys)))
+
+    def test_speed_options_share_a_key(self):
+        # Running in parallel or with oriented bounding boxes doesn't change the result
+        self.assertEqual(BooleanOptions().key(), BooleanOptions(parallel=True, use_obb=True).key())
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            BooleanOptions(glue="sticky")
+        with self.assertRaises(ValueError):
+            BooleanOptions(fuzzy_value=-1)
+
+    def test_apply(self):
+        # OCC is only needed once the options are applied
+        from OCC.Core.BOPAlgo import BOPAlgo_Builder, BOPAlgo_GlueOff, BOPAlgo_GlueShift
+
+        builder = BOPAlgo_Builder()
+        BooleanOptions(parallel=True, fuzzy_value=1e-4, use_obb=True, glue="shift").apply(builder)
+        self.assertTrue(builder.RunParallel())
+        self.assertAlmostEqual(1e-4, builder.FuzzyValue())
+        self.assertTrue(builder.UseOBB())
+        self.assertEqual(BOPAlgo_GlueShift, builder.Glue())
+
+        builder = BOPAlgo_Builder()
+        DEFAULT_BOOLEAN_OPTIONS.apply(builder)
+        self.assertFalse(builder.RunParallel())
+        self.assertFalse(builder.UseOBB())
+        self.assertEqual(BOPAlgo_GlueOff, builder.Glue())
+
+
+if __name__ == '__main__':
+    unittest.main()
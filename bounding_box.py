@@ -35,6 +35,9 @@ class BoundingBox():
         assert ymin <= ymax
         assert zmin <= zmax
 
+    def bounds(self):
+        return self._xmin, self._ymin, self._zmin, self._xmax, self._ymax, self._zmax
+
     def z_length(self):
         return self._zmax - self._zmin
 
@@ -0,0 +1,87 @@
+import numpy as np
+from bounding_box import BoundingBox, Point
+
+
+class BoundingBoxArray():
+    """
+    N bounding boxes stored as an (N, 6) array of (xmin, ymin, zmin, xmax, ymax, zmax), with
+    vectorized versions of the BoundingBox operations. Results match BoundingBox's
+    """
+
+    def __init__(self, bounds):
+        self._bounds = np.asarray(bounds, dtype=float).reshape(-1, 6)
+        assert np.all(self._bounds[:, :3] <= self._bounds[:, 3:])
+
+    @classmethod
+    def from_bboxes(cls, bboxes):
+        return cls([b.bounds() for b in bboxes])
+
+    def __len__(self):
+        return self._bounds.shape[0]
+
+    def bbox(self, index):
+        return BoundingBox(*self._bounds[index])
+
+    def mins(self):
+        return self._bounds[:, :3]
+
+    def maxs(self):
+        return self._bounds[:, 3:]
+
+    def overlaps(self, i, j, threshold=0):
+        """
+        Element-wise BoundingBox.overlaps between the boxes at indices i and the boxes at indices j
+        """
+        mins_i, maxs_i = self.mins()[i], self.maxs()[i]
+        mins_j, maxs_j = self.mins()[j], self.maxs()[j]
+        # Whether the projections onto each axis overlap by more than the threshold
+        axis_overlaps = (mins_i - maxs_j < -threshold) & (mins_j - maxs_i < -threshold)
+        x, y, z = axis_overlaps[..., 0], axis_overlaps[..., 1], axis_overlaps[..., 2]
+        return (x & y) | (x & z) | (y & z)
+
+    def dist(self, i, j):
+        """
+        Element-wise BoundingBox.dist between the boxes at indices i and the boxes at indices j
+        """
+        mins_i, maxs_i = self.mins()[i], self.maxs()[i]
+        mins_j, maxs_j = self.mins()[j], self.maxs()[j]
+        max_dist = np.maximum(np.abs(maxs_i - mins_j), np.abs(maxs_j - mins_i))
+        axis_dist = np.maximum(max_dist - (maxs_i - mins_i) - (maxs_j - mins_j), 0)
+        return np.sqrt(np.sum(axis_dist ** 2, axis=-1))
+
+    def overlaps_matrix(self, threshold=0):
+        """
+        Returns the (N, N) matrix of BoundingBox.overlaps between every pair of boxes
+        """
+        i, j = self._all_pairs()
+        return self.overlaps(i, j, threshold)
+
+    def dist_matrix(self):
+        """
+        Returns the (N, N) matrix of BoundingBox.dist between every pair of boxes
+        """
+        i, j = self._all_pairs()
+        return self.dist(i, j)
+
+    def min_dist_to_point(self, pnt):
+        """
+        BoundingBox.min_dist_to_point for every box
+        """
+        return np.sqrt(np.sum(np.minimum(*self._corner_dists_squared(pnt)), axis=1))
+
+    def max_dist_to_point(self, pnt):
+        """
+        BoundingBox.max_dist_to_point for every box
+        """
+        return np.sqrt(np.sum(np.maximum(*self._corner_dists_squared(pnt)), axis=1))
+
+    def _corner_dists_squared(self, pnt):
+        # The distance to each corner is independent along each axis, so the closest (or furthest)
+        # corner is the closest (or furthest) of the min and max coordinate along each axis
+        assert isinstance(pnt, Point)
+        p = np.array([pnt.x(), pnt.y(), pnt.z()])
+        return (self.mins() - p) ** 2, (self.maxs() - p) ** 2
+
+    def _all_pairs(self):
+        indices = np.arange(len(self))
+        return indices[:, np.newaxis], indices[np.newaxis, :]
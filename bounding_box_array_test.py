@@ -0,0 +1,62 @@
+import unittest
+import random
+import numpy as np
+
+from bounding_box import BoundingBox, Point
+from bounding_box_array import BoundingBoxArray
+
+
+class BoundingBoxArrayTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.bboxes = []
+        for _ in range(30):
+            xmin, ymin, zmin = rng.uniform(0, 20), rng.uniform(0, 20), rng.uniform(0, 20)
+            self.bboxes.append(BoundingBox(xmin, ymin, zmin, xmin + rng.uniform(0, 10), ymin + rng.uniform(0, 10),
+                                           zmin + rng.uniform(0, 10)))
+        # Touching and identical boxes
+        self.bboxes.append(BoundingBox(0, 0, 0, 10, 10, 10))
+        self.bboxes.append(BoundingBox(10, 0, 0, 20, 10, 10))
+        self.bboxes.append(BoundingBox(0, 0, 0, 10, 10, 10))
+        self.array = BoundingBoxArray.from_bboxes(self.bboxes)
+
+    def test_len(self):
+        self.assertEqual(len(self.bboxes), len(self.array))
+
+    def test_overlaps_matrix_matches_bounding_box(self):
+        for threshold in [0, 1, 5]:
+            matrix = self.array.overlaps_matrix(threshold)
+            for i, a in enumerate(self.bboxes):
+                for j, b in enumerate(self.bboxes):
+                    self.assertEqual(a.overlaps(b, threshold), matrix[i, j])
+
+    def test_dist_matrix_matches_bounding_box(self):
+        matrix = self.array.dist_matrix()
+        for i, a in enumerate(self.bboxes):
+            for j, b in enumerate(self.bboxes):
+                self.assertAlmostEqual(a.dist(b), matrix[i, j])
+
+    def test_pairwise_overlaps_and_dist(self):
+        i = np.array([0, 30, 31])
+        j = np.array([1, 31, 32])
+        overlaps = self.array.overlaps(i, j, threshold=1)
+        dists = self.array.dist(i, j)
+        for k in range(3):
+            a, b = self.bboxes[i[k]], self.bboxes[j[k]]
+            self.assertEqual(a.overlaps(b, threshold=1), overlaps[k])
+            self.assertAlmostEqual(a.dist(b), dists[k])
+
+    def test_dist_to_point_matches_bounding_box(self):
+        for pnt in [Point(0, 0, 0), Point(15, -3, 40), Point(5, 5, 5)]:
+            min_dists = self.array.min_dist_to_point(pnt)
+            max_dists = self.array.max_dist_to_point(pnt)
+            for index, bbox in enumerate(self.bboxes):
+                self.assertAlmostEqual(bbox.min_dist_to_point(pnt), min_dists[index])
+                self.assertAlmostEqual(bbox.max_dist_to_point(pnt), max_dists[index])
+
+    def test_bbox(self):
+        self.assertEqual(self.bboxes[5], self.array.bbox(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from stl import read_brep, write_brep
+
+logger = logging.getLogger("TFT")
+
+DEFAULT_MAX_MEMORY_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+# The subdirectories of a cache directory that make_caches keeps each cache in
+FACE_CACHE_DIR = "faces"
+PAIR_CACHE_DIR = "pairs"
+
+
+def make_key(*parts):
+    """
+    Returns a stable hex digest for the given key parts. The digest is safe to use as a filename
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(repr(part).encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def file_digest(filepath):
+    assert isinstance(filepath, Path)
+    hasher = hashlib.sha256()
+    with open(str(filepath), "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def default_cache_dir():
+    return Path.home() / ".cache" / "two-faced-type"
+
+
+class LruCache():
+    """
+    In-memory cache that evicts the least recently used entry once it holds more than max_entries
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_MEMORY_ENTRIES):
+        assert max_entries > 0
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            return default
+        return self._entries[key]
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class BrepDiskCache():
+    """
+    Stores shapes as BRep files in a directory. Once the files take up more than max_bytes,
+    the least recently used ones are deleted. Reads bump a file's modification time so
+    the file's mtime doubles as its last-used time
+    """
+
+    SUFFIX = ".brep"
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_DISK_BYTES):
+        assert max_bytes > 0
+        self._cache_dir = Path(cache_dir)
+        self._max_bytes = max_bytes
+        os.makedirs(str(self._cache_dir), exist_ok=True)
+        self._total_bytes = sum(f.stat().st_size for f in self._cache_files())
+
+    def get(self, key):
+        filepath = self._filepath(key)
+        if not filepath.is_file():
+            return None
+
+        try:
+            shape = read_brep(filepath)
+        except (AssertionError, OSError) as e:
+            logger.warning("Discarding unreadable cache file {}: {}".format(filepath, e))
+            self._remove(filepath)
+            return None
+
+        try:
+            os.utime(str(filepath))
+        except OSError:
+            # Another process may have evicted it in the meantime. We still have the shape
+            pass
+        return shape
+
+    def put(self, key, shape):
+        filepath = self._filepath(key)
+        # Write to a temporary file and rename so concurrent readers never see a partial file
+        tmp_filepath = filepath.with_name("{}.{}.tmp".format(filepath.name, os.getpid()))
+        write_brep(shape, tmp_filepath)
+        size = tmp_filepath.stat().st_size
+        if filepath.is_file():
+            self._total_bytes -= filepath.stat().st_size
+        os.replace(str(tmp_filepath), str(filepath))
+        self._total_bytes += size
+
+        if self._total_bytes > self._max_bytes:
+            self._evict()
+
+    def __contains__(self, key):
+        return self._filepath(key).is_file()
+
+    def _evict(self):
+        files = []
+        for f in self._cache_files():
+            try:
+                stat = f.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, f))
+        files.sort(key=lambda x: x[0])
+
+        self._total_bytes = sum(size for _, size, _ in files)
+        for _, size, f in files:
+            if self._total_bytes <= self._max_bytes:
+                break
+            self._remove(f)
+            logger.debug("Evicted {} from the shape cache".format(f.name))
+
+    def _remove(self, filepath):
+        try:
+            size = filepath.stat().st_size
+            filepath.unlink()
+        except OSError:
+            return
+        self._total_bytes -= size
+
+    def _cache_files(self):
+        return self._cache_dir.glob("*" + self.SUFFIX)
+
+    def _filepath(self, key):
+        return self._cache_dir / (key + self.SUFFIX)
+
+
+class ShapeCache():
+    """
+    Two-tier shape cache. An in-process LRU sits in front of an optional BRep store on disk,
+    and shapes found on disk are promoted to memory
+    """
+
+    def __init__(self, max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES, cache_dir=None,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self._memory = LruCache(max_memory_entries)
+        self._disk = BrepDiskCache(cache_dir, max_disk_bytes) if cache_dir is not None else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        shape = self._memory.get(key)
+        if shape is not None:
+            self.hits += 1
+            return shape
+
+        if self._disk is not None:
+            shape = self._disk.get(key)
+            if shape is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._memory.put(key, shape)
+                return shape
+
+        self.misses += 1
+        return None
+
+    def put(self, key, shape):
+        self._memory.put(key, shape)
+        if self._disk is not None:
+            self._disk.put(key, shape)
+
+    def __contains__(self, key):
+        """
+        Whether the key is cached, without loading the shape or counting as a hit or miss
+        """
+        return key in self._memory or (self._disk is not None and key in self._disk)
+
+    def count_hit(self):
+        """
+        Counts a hit for a lookup that didn't go through get, eg. a shape the caller kept from an earlier get
+        """
+        self.hits += 1
+
+    def count_miss(self):
+        """
+        Counts a miss for a lookup that didn't go through get, eg. a key found missing with `in`
+        """
+        self.misses += 1
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+def make_caches(cache_dir=None):
+    """
+    Makes the letter face cache and the combined letter pair cache. Each one is kept in its own
+    subdirectory of cache_dir, since a disk cache counts every file in its directory against its
+    size limit and evicts them as if they were its own
+    :param cache_dir: Where to cache the shapes between runs. Only cached in memory if None
+    :return: The face cache and the pair cache
+    """
+    if cache_dir is None:
+        return ShapeCache(), ShapeCache()
+    return (ShapeCache(cache_dir=Path(cache_dir, FACE_CACHE_DIR)),
+            ShapeCache(cache_dir=Path(cache_dir, PAIR_CACHE_DIR)))
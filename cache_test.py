@@ -0,0 +1,108 @@
+import unittest
+import tempfile
+import pathlib
+from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeBox
+from OCC.Core.TopoDS import TopoDS_Solid
+from OCC.Core.gp import gp_Trsf, gp_Vec
+from OCC.Core.TopLoc import TopLoc_Location
+
+from cache import LruCache, ShapeCache, make_caches, make_key
+from stl import shape_from_brep_string, shape_to_brep_string
+from util import get_mass
+
+
+class TestLruCache(unittest.TestCase):
+    def test_get_missing_key(self):
+        cache = LruCache(2)
+        self.assertIsNone(cache.get("a"))
+
+    def test_evicts_least_recently_used(self):
+        cache = LruCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(2, len(cache))
+
+
+class TestMakeKey(unittest.TestCase):
+    def test_same_parts_same_key(self):
+        self.assertEqual(make_key("abc", "H", 50.0), make_key("abc", "H", 50.0))
+
+    def test_different_parts_different_key(self):
+        self.assertNotEqual(make_key("abc", "H", 50.0), make_key("abc", "H", 51.0))
+        self.assertNotEqual(make_key("ab", "cH"), make_key("abc", "H"))
+
+
+class TestShapeCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = pathlib.Path(self.tmp_dir.name)
+        self.box = BRepPrimAPI_MakeBox(10, 20, 30).Shape()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_memory_hit(self):
+        cache = ShapeCache()
+        self.assertIsNone(cache.get("box"))
+        cache.put("box", self.box)
+        self.assertIs(self.box, cache.get("box"))
+        self.assertEqual({"hits": 1, "disk_hits": 0, "misses": 1}, cache.stats())
+
+    def test_contains_doesnt_count(self):
+        cache = ShapeCache(cache_dir=self.cache_dir)
+        self.assertNotIn("box", cache)
+        cache.put("box", self.box)
+        self.assertIn("box", ShapeCache(cache_dir=self.cache_dir))
+        self.assertEqual({"hits": 0, "disk_hits": 0, "misses": 0}, cache.stats())
+
+    def test_count_without_get(self):
+        cache = ShapeCache()
+        cache.count_miss()
+        cache.count_hit()
+        cache.count_hit()
+        self.assertEqual({"hits": 2, "disk_hits": 0, "misses": 1}, cache.stats())
+
+    def test_disk_hit_from_new_cache(self):
+        ShapeCache(cache_dir=self.cache_dir).put("box", self.box)
+
+        cache = ShapeCache(cache_dir=self.cache_dir)
+        shape = cache.get("box")
+        self.assertIsInstance(shape, TopoDS_Solid)
+        self.assertAlmostEqual(6000, get_mass(shape), delta=1e-6)
+        self.assertEqual(1, cache.stats()["disk_hits"])
+
+    def test_disk_eviction(self):
+        cache = ShapeCache(cache_dir=self.cache_dir, max_disk_bytes=1)
+        cache.put("box1", self.box)
+        cache.put("box2", self.box)
+        self.assertLessEqual(len(list(self.cache_dir.glob("*.brep"))), 1)
+
+    def test_caches_dont_share_a_directory(self):
+        face_cache, pair_cache = make_caches(self.cache_dir)
+        face_cache.put("box", self.box)
+        self.assertNotIn("box", pair_cache)
+        pair_cache.put("box", self.box)
+        self.assertEqual(2, len(list(self.cache_dir.glob("*/*.brep"))))
+        self.assertIn("box", make_caches(self.cache_dir)[0])
+
+
+class TestBrepString(unittest.TestCase):
+    def test_round_trip_keeps_location_and_orientation(self):
+        transform = gp_Trsf()
+        transform.SetTranslation(gp_Vec(5, 0, 0))
+        box = BRepPrimAPI_MakeBox(10, 20, 30).Shape().Moved(TopLoc_Location(transform)).Reversed()
+
+        shape = shape_from_brep_string(shape_to_brep_string(box))
+        self.assertIsInstance(shape, TopoDS_Solid)
+        self.assertEqual(box.Orientation(), shape.Orientation())
+        self.assertAlmostEqual(5, shape.Location().Transformation().TranslationPart().X())
+        self.assertAlmostEqual(6000, abs(get_mass(shape)), delta=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Minimal client for server.py, using only the standard library.
+
+Usage: python client.py word1 word2 --height height_mm [-o output_directory] [--url http://127.0.0.1:8642]
+Without -o the server keeps the files and the paths it wrote them to are printed. With -o the files
+are sent back and written to output_directory
+"""
+import argparse
+import base64
+import json
+import os
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+DEFAULT_URL = "http://127.0.0.1:8642"
+
+
+class ServerError(Exception):
+    pass
+
+
+class Client():
+    def __init__(self, url=DEFAULT_URL, timeout=None):
+        self._url = url.rstrip("/")
+        self._timeout = timeout
+
+    def generate(self, word1, word2, height_mm, formats=None, options=None, return_bytes=False):
+        """
+        Runs a job on the server and waits for it to finish
+        :param options: A dict of BooleanOptions arguments
+        :param return_bytes: Have the files sent back rather than kept on the server
+        :return: The server's response. Files sent back are decoded to bytes
+        """
+        job = {"word1": word1, "word2": word2, "height_mm": height_mm,
+               "return": "bytes" if return_bytes else "paths"}
+        if formats is not None:
+            job["formats"] = list(formats)
+        if options is not None:
+            job["options"] = options
+
+        result = self._request("/jobs", json.dumps(job).encode("utf-8"))
+        if "files" in result:
+            result["files"] = {name: base64.b64decode(data) for name, data in result["files"].items()}
+        return result
+
+    def stats(self):
+        return self._request("/stats")
+
+    def _request(self, path, data=None):
+        request = urllib.request.Request(self._url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8"))["error"]
+            except (ValueError, KeyError):
+                message = e.reason
+            raise ServerError("{} {}".format(e.code, message))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Send a job to a Two-Faced Type server")
+    parser.add_argument('words', metavar='word', type=str, nargs=2, help='the words to combine')
+    parser.add_argument('--height', metavar='height_mm', type=float, required=True,
+                        help="The height of the characters, in mm")
+    parser.add_argument('-o', '--output_dir', metavar='output_directory', type=str, default=None,
+                        help="Have the files sent back and write them here")
+    parser.add_argument('--formats', metavar='format', type=str, nargs='+', default=None,
+                        help="The file formats to write each letter to")
+    parser.add_argument('--url', type=str, default=DEFAULT_URL, help="The server's address")
+    args = parser.parse_args()
+
+    client = Client(args.url)
+    result = client.generate(args.words[0], args.words[1], args.height, args.formats,
+                             return_bytes=args.output_dir is not None)
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        for name, data in result["files"].items():
+            Path(args.output_dir, name).write_bytes(data)
+            print(Path(args.output_dir, name))
+    else:
+        for path in result["paths"]:
+            print(path)
+    print("Timings: {}".format(result["timings"]))
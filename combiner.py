@@ -1,65 +1,244 @@
 import math
-import copy
+from collections import Counter
+from pathlib import Path
 from OCC.Core.TopoDS import TopoDS_Face, TopoDS_Compound
 from OCC.Extend.ShapeFactory import make_extrusion, make_edge, make_face, make_vertex
 from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Common
 from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_Transform
 from OCC.Core.gp import gp_Trsf, gp_Ax1, gp_Vec, gp_Pnt
-from constants import *
+from OCC.Core.TopTools import TopTools_ListOfShape
+from constants import ORIGIN, DIR_Z
+from cache import make_key, ShapeCache
+from boolean_options import DEFAULT_BOOLEAN_OPTIONS
+from face_factory import FaceFactory
+from parallel import imap_in_pool
+from engines import BREP_ENGINES, ENGINES
+from polygon_combiner import combine_outlines, has_curves
+import profiling
+from stl import shape_to_brep_string, shape_from_brep_string
 
-def combine_faces(face1, face2, height_mm):
-    assert isinstance(face1, TopoDS_Face)
-    assert isinstance(face2, TopoDS_Face)
-
-    face1_ = copy.deepcopy(face1)
-    face2_ = copy.deepcopy(face2)
+def combine_faces(face1, face2, height_mm, options=DEFAULT_BOOLEAN_OPTIONS):
+    """
+    The faces are not modified, and the result is not copied. Shapes are treated as immutable
+    everywhere, so faces can be shared with the caches and between letter pairs
+    :param face1: A face from FaceFactory.create_char, or a compound of faces for glyphs in several pieces
+    """
+    assert isinstance(face1, (TopoDS_Face, TopoDS_Compound))
+    assert isinstance(face2, (TopoDS_Face, TopoDS_Compound))
 
     # assuming both faces start in the XZ plane
     tf = gp_Trsf()
     # rotate from the XZ plane to the YZ plane
     tf.SetRotation(gp_Ax1(ORIGIN, DIR_Z), math.pi / 2)
-    face2_ = BRepBuilderAPI_Transform(face2_, tf).Shape()
+    # Without copying, the transform only gives the new shape a location. face2 itself is untouched
+    face2_ = BRepBuilderAPI_Transform(face2, tf).Shape()
 
     # We assume characters are no wider than they are tall, but just in case
     # we extrude by twice the height to make sure to capture all features
-    face1_extruded = make_extrusion(face1_, 2 * height_mm, gp_Vec(0, 1, 0))
-    face2_extruded = make_extrusion(face2_, 2 * height_mm, gp_Vec(1, 0, 0))
-    common = BRepAlgoAPI_Common(face1_extruded, face2_extruded)
+    with profiling.span("extrude"):
+        face1_extruded = make_extrusion(face1, 2 * height_mm, gp_Vec(0, 1, 0))
+        face2_extruded = make_extrusion(face2_, 2 * height_mm, gp_Vec(1, 0, 0))
+    arguments = TopTools_ListOfShape()
+    arguments.Append(face1_extruded)
+    tools = TopTools_ListOfShape()
+    tools.Append(face2_extruded)
+    common = BRepAlgoAPI_Common()
+    common.SetArguments(arguments)
+    common.SetTools(tools)
+    options.apply(common)
+    with profiling.span("boolean_common"):
+        common.Build()
+    profiling.count("booleans")
 
     result = common.Shape()
     assert isinstance(result, TopoDS_Compound)
-    return copy.deepcopy(result)
+    return result
+
+def combined_pair_key(letter1, letter2, height_mm, face_factory, options=DEFAULT_BOOLEAN_OPTIONS,
+                      remove_redundant=False, engine="occ"):
+    font = str(face_factory.font_path().resolve())
+    parts = ["combined_pair", letter1.upper(), letter2.upper(), float(height_mm), font, options.key()]
+    if remove_redundant:
+        # Only added when set, so the keys of pairs cached before this option existed stay the same
+        parts.append("redundant_geometry_removed")
+    if engine != "occ":
+        # Likewise only added for the other engines
+        parts.append("engine={}".format(engine))
+    return make_key(*parts)
+
+def combine_words(word1, word2, face_factory, height_mm, pair_cache=None, workers=None,
+                  options=DEFAULT_BOOLEAN_OPTIONS, remove_redundant=False, engine="occ"):
+    """
+    Combines every letter pair of the words at once. See iter_combined_letters for the parameters
+    :return: The combined letters, and the faces of the letters of each word. With the voxel engine,
+    the letters are Meshes and the faces are the letters' bitmaps
+    """
+    if engine == "voxel":
+        import voxel_engine
+
+        return voxel_engine.combine_words(word1, word2, face_factory, height_mm, remove_redundant)
+
+    faces = {}
+    combined_faces = list(_iter_combined_letters(word1, word2, face_factory, height_mm, pair_cache, workers, options,
+                                                 remove_redundant, None, faces, engine))
+    faces1 = [_get_face(faces, face_factory, letter1, height_mm) for letter1 in word1]
+    faces2 = [_get_face(faces, face_factory, letter2, height_mm) for letter2 in word2]
+    return combined_faces, faces1, faces2
+
+def iter_combined_letters(word1, word2, face_factory, height_mm, pair_cache=None, workers=None,
+                          options=DEFAULT_BOOLEAN_OPTIONS, remove_redundant=False, max_in_flight=None, engine="occ"):
+    """
+    Yields the combined letter for each letter pair of the words, in order, as soon as it's finished,
+    so it can be written out before the rest are done. Only the pairs being worked on, and finished
+    pairs that appear again later in the words, are kept in memory
+    :param pair_cache: An optional cache.ShapeCache of combined letter pairs. Pairs found in the cache
+    skip combine_faces entirely. Pairs repeated within the words are only combined once regardless
+    :param workers: The number of processes to combine letter pairs in. Runs in this process if None or 1
+    :param options: The BooleanOptions to combine letter pairs with
+    :param remove_redundant: Also remove the redundant geometry from each combined letter
+    :param max_in_flight: The most letter pairs to have submitted to the workers at once. Twice the
+    number of workers by default
+    :param engine: How to combine each letter pair. "occ" intersects the letters' extruded faces with
+    the OCC boolean. "polygon" builds the result straight from the letters' outlines, with the curves
+    flattened, which is much faster. "polygon_exact" does the same for pairs without curves and uses
+    the OCC boolean for the rest. See polygon_combiner.py. "voxel" builds a Mesh of each letter from
+    the letters' bitmaps, for instant but blocky previews, and doesn't use the caches or workers. See
+    voxel_engine.py
+    """
+    if engine == "voxel":
+        import voxel_engine
+
+        return voxel_engine.iter_combined_letters(word1, word2, face_factory, height_mm, remove_redundant)
 
-def combine_words(word1, word2, face_factory, height_mm):
+    return _iter_combined_letters(word1, word2, face_factory, height_mm, pair_cache, workers, options,
+                                  remove_redundant, max_in_flight, None, engine)
+
+def _iter_combined_letters(word1, word2, face_factory, height_mm, pair_cache, workers, options, remove_redundant,
+                           max_in_flight, faces, engine):
+    """
+    :param faces: An optional dict to collect the faces of the letters in, by upper case letter
+    """
     assert isinstance(word1, str)
     assert isinstance(word2, str)
     assert len(word1) == len(word2)
+    # The mesh engines are handed off before getting here
+    if engine not in BREP_ENGINES:
+        raise ValueError("Invalid engine: '{}'. Please use one of {}".format(engine, ENGINES))
 
-    combined_faces = []
-    faces1 = []
-    faces2 = []
-    for letter1, letter2 in zip(word1, word2):
-        face1 = face_factory.create_char(letter1, height_mm)
-        face2 = face_factory.create_char(letter2, height_mm)
-        faces1.append(face1)
-        faces2.append(face2)
-        combined_letter = combine_faces(face1, face2, height_mm)
-        combined_faces.append(combined_letter)
+    pairs = list(zip(word1, word2))
+    keys = [combined_pair_key(letter1, letter2, height_mm, face_factory, options, remove_redundant, engine)
+            for letter1, letter2 in pairs]
 
-    return combined_faces, faces1, faces2
+    # Only the first occurrence of each pair that isn't cached needs to be combined. The results
+    # come back in the same order, which is the order the loop below needs them in
+    missing = []
+    missing_keys = set()
+    for key, (letter1, letter2) in zip(keys, pairs):
+        if key not in missing_keys and (pair_cache is None or key not in pair_cache):
+            missing.append((letter1, letter2))
+            missing_keys.add(key)
+
+    parallel = bool(workers and workers > 1 and len(missing) > 1)
+    if parallel:
+        font_path = str(face_factory.font_path())
+        results = imap_in_pool(_combine_pair_in_worker,
+                               ((font_path, letter1, letter2, height_mm, options, remove_redundant, engine)
+                                for letter1, letter2 in missing),
+                               workers, max_in_flight)
+    else:
+        local_faces = faces if faces is not None else {}
+        results = (_combine_pair(face_factory, local_faces, letter1, letter2, height_mm, options, remove_redundant,
+                                 engine)
+                   for letter1, letter2 in missing)
+
+    remaining = Counter(keys)
+    finished = {}
+    for key, (letter1, letter2) in zip(keys, pairs):
+        if key in finished:
+            combined_letter = finished[key]
+            # Checking the cache was skipped, so count the hit here to keep the stats the same as
+            # looking up every pair
+            if pair_cache is not None:
+                pair_cache.count_hit()
+        elif key in missing_keys:
+            combined_letter = next(results)
+            if parallel:
+                combined_brep, face1_brep, face2_brep = combined_letter
+                combined_letter = shape_from_brep_string(combined_brep)
+                if faces is not None:
+                    for letter, face_brep in ((letter1, face1_brep), (letter2, face2_brep)):
+                        if face_brep is not None and letter.upper() not in faces:
+                            faces[letter.upper()] = shape_from_brep_string(face_brep)
+            if pair_cache is not None:
+                pair_cache.count_miss()
+                pair_cache.put(key, combined_letter)
+        else:
+            combined_letter = pair_cache.get(key)
+            if combined_letter is None:
+                # Evicted since we checked. Rare enough to just combine it here
+                combined_letter = _combine_pair(face_factory, {}, letter1, letter2, height_mm, options,
+                                                remove_redundant, engine)
+                pair_cache.put(key, combined_letter)
+
+        remaining[key] -= 1
+        if remaining[key] > 0:
+            finished[key] = combined_letter
+        else:
+            finished.pop(key, None)
+        yield combined_letter
+
+def _combine_pair(face_factory, faces, letter1, letter2, height_mm, options, remove_redundant, engine="occ"):
+    with profiling.span("combine_pair", letter1=letter1, letter2=letter2):
+        combined_letter = None
+        if engine != "occ":
+            outlines1 = face_factory.create_outlines(letter1)
+            outlines2 = face_factory.create_outlines(letter2)
+            if engine == "polygon" or not (has_curves(outlines1) or has_curves(outlines2)):
+                with profiling.span("combine_outlines"):
+                    combined_letter = combine_outlines(outlines1, outlines2, height_mm)
+        if combined_letter is None:
+            face1 = _get_face(faces, face_factory, letter1, height_mm)
+            face2 = _get_face(faces, face_factory, letter2, height_mm)
+            with profiling.span("combine_faces"):
+                combined_letter = combine_faces(face1, face2, height_mm, options)
+        if remove_redundant:
+            # geom_removal is only imported when it's needed, since it's slow to import
+            from geom_removal import remove_redundant_geom
+            combined_letter = remove_redundant_geom(combined_letter, options)
+        return combined_letter
+
+def _get_face(faces, face_factory, letter, height_mm):
+    face = faces.get(letter.upper())
+    if face is None:
+        face = face_factory.create_char(letter, height_mm)
+        faces[letter.upper()] = face
+    return face
+
+# Face factories are kept for the lifetime of each worker process so glyphs are only parsed once per process
+_worker_face_factories = {}
+
+def _combine_pair_in_worker(font_path, letter1, letter2, height_mm, options, remove_redundant, engine="occ"):
+    face_factory = _worker_face_factories.get(font_path)
+    if face_factory is None:
+        face_factory = FaceFactory(Path(font_path), cache=ShapeCache())
+        _worker_face_factories[font_path] = face_factory
+
+    faces = {}
+    combined_letter = _combine_pair(face_factory, faces, letter1, letter2, height_mm, options, remove_redundant,
+                                    engine)
+    # The polygon engines may not have needed the faces. They're built afterwards if they're wanted
+    face_breps = [shape_to_brep_string(faces[letter.upper()]) if letter.upper() in faces else None
+                  for letter in (letter1, letter2)]
+    return (shape_to_brep_string(combined_letter),) + tuple(face_breps)
 
 def offset_shapes(shapes, height_mm):
+    return [offset_shape(shape, index, height_mm) for index, shape in enumerate(shapes)]
+
+def offset_shape(shape, index, height_mm):
     # Offset letters so they can be previewed properly from 2 directions
     tf = gp_Trsf()
-    p1 = ORIGIN
-    offset = 0
-    offset_increment = 1.1*height_mm
-    offset_letters = []
-    for shape in shapes:
-        tf.SetTranslation(p1, gp_Pnt(offset, offset, 0))
-        offset_letter = BRepBuilderAPI_Transform(shape, tf).Shape()
-        assert isinstance(offset_letter, TopoDS_Compound)
-        offset_letters.append(offset_letter)
-        offset += offset_increment
-
-    return offset_letters
+    offset = index * 1.1*height_mm
+    tf.SetTranslation(ORIGIN, gp_Pnt(offset, offset, 0))
+    offset_letter = BRepBuilderAPI_Transform(shape, tf).Shape()
+    assert isinstance(offset_letter, TopoDS_Compound)
+    return offset_letter
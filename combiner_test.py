@@ -0,0 +1,62 @@
+import unittest
+import pathlib
+import types
+from cache import ShapeCache
+from face_factory import FaceFactory
+from combiner import combine_words, iter_combined_letters
+from util import get_mass, get_solids
+
+
+class TestCombiner(unittest.TestCase):
+    def setUp(self):
+        face_images_dir = pathlib.Path(__file__).parent / "test_data"
+        self.face_factory = FaceFactory(face_images_dir)
+        self.height_mm = 50
+
+    def test_iter_combined_letters_is_a_generator(self):
+        letters = iter_combined_letters("HE", "TV", self.face_factory, self.height_mm)
+        self.assertIsInstance(letters, types.GeneratorType)
+
+    def test_iter_combined_letters_matches_combine_words(self):
+        combined_faces, faces1, faces2 = combine_words("HEH", "EGE", self.face_factory, self.height_mm)
+        letters = list(iter_combined_letters("HEH", "EGE", self.face_factory, self.height_mm))
+        self.assertEqual(3, len(letters))
+        self.assertEqual(3, len(faces1))
+        self.assertEqual(3, len(faces2))
+        for letter, combined_face in zip(letters, combined_faces):
+            self.assertAlmostEqual(get_mass(combined_face), get_mass(letter), delta=1e-6)
+
+    def test_repeated_pairs_combined_once(self):
+        pair_cache = ShapeCache()
+        letters = list(iter_combined_letters("HEH", "EGE", self.face_factory, self.height_mm, pair_cache=pair_cache))
+        self.assertIs(letters[0], letters[2])
+        # HE and EG are combined, and the second HE is reused
+        self.assertEqual({"hits": 1, "disk_hits": 0, "misses": 2}, pair_cache.stats())
+
+        # Everything is cached the second time around
+        list(iter_combined_letters("HEH", "EGE", self.face_factory, self.height_mm, pair_cache=pair_cache))
+        self.assertEqual({"hits": 4, "disk_hits": 0, "misses": 2}, pair_cache.stats())
+
+    def test_parallel_matches_serial(self):
+        serial = list(iter_combined_letters("HEG", "EGH", self.face_factory, self.height_mm))
+        parallel = list(iter_combined_letters("HEG", "EGH", self.face_factory, self.height_mm, workers=2,
+                                              max_in_flight=1))
+        for s, p in zip(serial, parallel):
+            self.assertAlmostEqual(get_mass(s), get_mass(p), delta=1e-6)
+
+    def test_polygon_engines_match_occ(self):
+        occ = list(iter_combined_letters("HE4", "EH4", self.face_factory, self.height_mm))
+        for engine in ("polygon", "polygon_exact"):
+            letters = list(iter_combined_letters("HE4", "EH4", self.face_factory, self.height_mm, engine=engine))
+            for o, p in zip(occ, letters):
+                self.assertAlmostEqual(get_mass(o), get_mass(p), delta=1e-3)
+                # The cells are fused, rather than left as separate solids that touch
+                self.assertEqual(len(get_solids(o)), len(get_solids(p)))
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            next(iter_combined_letters("H", "E", self.face_factory, self.height_mm, engine="nope"))
+
+
+if __name__ == '__main__':
+    unittest.main()
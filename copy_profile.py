@@ -0,0 +1,136 @@
+"""
+Reports, stage by stage, how much time and memory the defensive copy.deepcopy calls used to cost
+on a full word pair. Shapes are now treated as immutable and shared between stages, so each stage
+is run as it is now, and the copies it used to make are then replayed on the same shapes:
+
+    combine  combine_faces copied both faces and its result
+    split    get_split_planes (through get_faces) and split_compound each copied the combined letter
+    graph    every Node copied its solid
+    export   write_stl copied the shape before meshing it
+
+deepcopy of a shape pickles it, which serialises the whole topology to a BRep string and reads it
+back. "peak alloc" is the most Python memory (tracemalloc) in use during the copies, which is mostly
+those strings. "copied" is the size of the BRep data that was duplicated, as an indication of the
+native memory the copies held on top of that.
+
+Usage: python copy_profile.py [--height height_mm] [word1 word2]
+eg.    python copy_profile.py HELLO WORLD
+"""
+import argparse
+import copy
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+from pathlib import Path
+from combiner import combine_faces
+from face_factory import FaceFactory
+from geom_removal import create_solid_graph
+from shape_properties import ShapeProperties
+from stl import shape_to_brep_string, write_stl
+from util import split_compound
+
+STAGES = ("combine", "split", "graph", "export")
+
+
+class StageProfile():
+    def __init__(self):
+        self.seconds = 0.0
+        self.copies = 0
+        self.copy_seconds = 0.0
+        self.copy_peak_bytes = 0
+        self.copied_bytes = 0
+
+
+def profile_copies(shapes):
+    """
+    Deep copies each shape the way the stages used to
+    :return: The time taken, the peak Python memory allocated and the total BRep size of the shapes
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    copies = [copy.deepcopy(s) for s in shapes]
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del copies
+    return seconds, peak, sum(len(shape_to_brep_string(s)) for s in shapes)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def profile_word_pair(word1, word2, height_mm, output_dir):
+    assert len(word1) == len(word2)
+    face_factory = FaceFactory(Path(__file__).parent / "face_images/aldrich")
+    profiles = OrderedDict((stage, StageProfile()) for stage in STAGES)
+
+    def record(stage, seconds, copied_shapes, copy_profile=None):
+        """
+        :param copy_profile: What profile_copies returned for copied_shapes, if they had to be copied earlier
+        """
+        profile = profiles[stage]
+        copy_seconds, peak, size = copy_profile or profile_copies(copied_shapes)
+        profile.seconds += seconds
+        profile.copies += len(copied_shapes)
+        profile.copy_seconds += copy_seconds
+        profile.copy_peak_bytes = max(profile.copy_peak_bytes, peak)
+        profile.copied_bytes += size
+
+    for number, (letter1, letter2) in enumerate(zip(word1, word2), start=1):
+        face1 = face_factory.create_char(letter1, height_mm)
+        face2 = face_factory.create_char(letter2, height_mm)
+
+        seconds, combined = timed(lambda: combine_faces(face1, face2, height_mm))
+        record("combine", seconds, [face1, face2, combined])
+
+        seconds, solids = timed(lambda: split_compound(combined))
+        record("split", seconds, [combined, combined])
+
+        properties = [ShapeProperties(s) for s in solids]
+        seconds, _ = timed(lambda: create_solid_graph(solids, properties))
+        record("graph", seconds, solids)
+
+        # The old copy was made before the shape was meshed, so profile it before writing
+        copy_profile = profile_copies([combined])
+        filepath = Path(output_dir, "combined_shape_{}.stl".format(number))
+        seconds, _ = timed(lambda: write_stl(combined, filepath))
+        record("export", seconds, [combined], copy_profile)
+
+    return profiles
+
+
+def format_report(profiles):
+    lines = ["{:<8} {:>10} {:>7} {:>10} {:>8} {:>14} {:>12}".format(
+        "stage", "stage (s)", "copies", "copy (s)", "saved", "peak alloc MB", "copied MB")]
+    total = StageProfile()
+    for profile in profiles.values():
+        total.seconds += profile.seconds
+        total.copies += profile.copies
+        total.copy_seconds += profile.copy_seconds
+        total.copy_peak_bytes = max(total.copy_peak_bytes, profile.copy_peak_bytes)
+        total.copied_bytes += profile.copied_bytes
+    for stage, profile in list(profiles.items()) + [("total", total)]:
+        # The share of the old stage time that went on copying
+        saved = profile.copy_seconds / (profile.seconds + profile.copy_seconds) if profile.copies else 0.0
+        lines.append("{:<8} {:>10.3f} {:>7} {:>10.3f} {:>7.1f}% {:>14.2f} {:>12.2f}".format(
+            stage, profile.seconds, profile.copies, profile.copy_seconds, 100 * saved,
+            profile.copy_peak_bytes / 1e6, profile.copied_bytes / 1e6))
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Profile the deep copies the shape pipeline used to make")
+    parser.add_argument('words', metavar='word', type=str, nargs='*', default=["HELLO", "WORLD"],
+                        help="the two words to combine. They must be the same length")
+    parser.add_argument('--height', metavar='height_mm', type=float, default=50, help="The height of the characters")
+    args = parser.parse_args()
+    if len(args.words) != 2 or len(args.words[0]) != len(args.words[1]):
+        parser.error("Please give two words of the same length")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        profiles = profile_word_pair(args.words[0], args.words[1], args.height, output_dir)
+    print(format_report(profiles))
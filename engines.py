@@ -0,0 +1,10 @@
+"""
+The engines letter pairs can be combined with. Kept apart from the engines themselves so the list
+can be used (eg. by main.py's arguments) without loading any of them
+"""
+
+# Combine each pair into a BRep shape, with the OCC boolean or from the outlines (see polygon_combiner.py)
+BREP_ENGINES = ("occ", "polygon", "polygon_exact")
+# Build a Mesh of each pair from the letters' bitmaps. See voxel_engine.py
+MESH_ENGINES = ("voxel",)
+ENGINES = BREP_ENGINES + MESH_ENGINES
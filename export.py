@@ -0,0 +1,249 @@
+import os
+import time
+import logging
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+import profiling
+from stl import mesh_shape, DEFAULT_LINEAR_DEFLECTION, DEFAULT_ANGULAR_DEFLECTION
+
+logger = logging.getLogger("TFT")
+
+
+class Mesh():
+    """
+    A triangle mesh. vertices are (x, y, z) tuples and triangles are (i, j, k) tuples of indices
+    into vertices, wound counter-clockwise when seen from outside the shape
+    """
+
+    __slots__ = ("vertices", "triangles")
+
+    def __init__(self, vertices, triangles):
+        self.vertices = vertices
+        self.triangles = triangles
+
+
+def extract_mesh(shape):
+    """
+    Returns the triangulation the shape's faces already carry (see stl.mesh_shape) as a Mesh
+    """
+    from OCC.Core.BRep import BRep_Tool
+    from OCC.Core.TopAbs import TopAbs_REVERSED
+    from OCC.Core.TopLoc import TopLoc_Location
+    from OCC.Extend.TopologyUtils import TopologyExplorer
+
+    vertices = []
+    triangles = []
+    for face in TopologyExplorer(shape).faces():
+        location = TopLoc_Location()
+        triangulation = BRep_Tool.Triangulation(face, location)
+        if triangulation is None:
+            continue
+
+        transform = location.Transformation()
+        offset = len(vertices)
+        nodes = triangulation.Nodes()
+        for i in range(1, triangulation.NbNodes() + 1):  # Indices start at 1 :(
+            pnt = nodes.Value(i).Transformed(transform)
+            vertices.append((pnt.X(), pnt.Y(), pnt.Z()))
+
+        # The triangles are stored relative to the underlying surface, so flip them on reversed faces
+        reverse = face.Orientation() == TopAbs_REVERSED
+        face_triangles = triangulation.Triangles()
+        for i in range(1, triangulation.NbTriangles() + 1):
+            n1, n2, n3 = face_triangles.Value(i).Get()
+            if reverse:
+                n2, n3 = n3, n2
+            triangles.append((offset + n1 - 1, offset + n2 - 1, offset + n3 - 1))
+
+    return Mesh(vertices, triangles)
+
+
+def write_obj(mesh, filepath):
+    assert isinstance(filepath, Path)
+    with open(str(filepath), "w") as f:
+        for x, y, z in mesh.vertices:
+            f.write("v {} {} {}\n".format(x, y, z))
+        for i, j, k in mesh.triangles:
+            # OBJ indices start at 1
+            f.write("f {} {} {}\n".format(i + 1, j + 1, k + 1))
+
+
+def write_mesh_stl(mesh, filepath, ascii=False):
+    """
+    Writes a Mesh to an STL file, for meshes that don't come from a BRep shape (see stl.write_stl for those)
+    """
+    import numpy as np
+
+    assert isinstance(filepath, Path)
+    vertices = np.asarray(mesh.vertices, dtype=float).reshape(-1, 3)
+    triangles = vertices[np.asarray(mesh.triangles, dtype=int).reshape(-1, 3)]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    normals[lengths > 0] /= lengths[lengths > 0, None]
+
+    if ascii:
+        with open(str(filepath), "w") as f:
+            f.write("solid mesh\n")
+            for normal, triangle in zip(normals, triangles):
+                f.write("facet normal {} {} {}\n outer loop\n".format(*normal))
+                for vertex in triangle:
+                    f.write("  vertex {} {} {}\n".format(*vertex))
+                f.write(" endloop\nendfacet\n")
+            f.write("endsolid mesh\n")
+        return
+
+    # 80 byte header, the triangle count, then per triangle its normal, corners and a 2 byte attribute
+    records = np.zeros(len(triangles), dtype=[("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+    records["normal"] = normals
+    records["vertices"] = triangles
+    with open(str(filepath), "wb") as f:
+        f.write(b"\0" * 80)
+        f.write(np.array([len(triangles)], dtype="<u4").tobytes())
+        f.write(records.tobytes())
+
+
+def write_3mf(mesh, filepath):
+    assert isinstance(filepath, Path)
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+        '</Types>')
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+        'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+        '</Relationships>')
+    vertices = "".join('<vertex x="{}" y="{}" z="{}"/>'.format(x, y, z) for x, y, z in mesh.vertices)
+    triangles = "".join('<triangle v1="{}" v2="{}" v3="{}"/>'.format(i, j, k) for i, j, k in mesh.triangles)
+    model = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<model unit="millimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">'
+        '<resources><object id="1" type="model"><mesh>'
+        '<vertices>{}</vertices><triangles>{}</triangles>'
+        '</mesh></object></resources>'
+        '<build><item objectid="1"/></build>'
+        '</model>').format(vertices, triangles)
+
+    with zipfile.ZipFile(str(filepath), "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", content_types)
+        archive.writestr("_rels/.rels", rels)
+        archive.writestr("3D/3dmodel.model", model)
+
+
+class ExportPipeline():
+    """
+    Writes shapes to every configured file format. Each shape is meshed exactly once, and the formats
+    that need triangles (STL, OBJ and 3MF) all use that mesh. STEP files are written from the BRep.
+    Time spent meshing and in each writer is logged
+    """
+
+    FORMATS = ("stl", "step", "obj", "3mf")
+    MESH_FORMATS = ("obj", "3mf")
+
+    def __init__(self, output_dir, formats=("stl", "step"), ascii_stl=False,
+                 linear_deflection=DEFAULT_LINEAR_DEFLECTION, angular_deflection=DEFAULT_ANGULAR_DEFLECTION):
+        for f in formats:
+            if f not in self.FORMATS:
+                raise ValueError("Unsupported export format: '{}'. Please use one of {}".format(f, self.FORMATS))
+
+        self._output_dir = Path(output_dir)
+        self._formats = tuple(formats)
+        self._ascii_stl = ascii_stl
+        self._linear_deflection = linear_deflection
+        self._angular_deflection = angular_deflection
+        self._timings = {}
+        os.makedirs(str(self._output_dir), exist_ok=True)
+
+    def export(self, shapes):
+        """
+        Exports each shape, numbered from 1 in the order given
+        :return: A list with the paths written for each shape
+        """
+        paths = [self.export_shape(shape, index + 1) for index, shape in enumerate(shapes)]
+        self.log_timings()
+        return paths
+
+    def export_shape(self, shape, number):
+        """
+        Exports a single shape as combined_shape_<number>.<format> for each format
+        :return: The list of paths written
+        """
+        with profiling.span("export_shape", number=number):
+            return self._export_shape(shape, number)
+
+    def _export_shape(self, shape, number):
+        with self._timed("mesh"):
+            mesh_shape(shape, self._linear_deflection, self._angular_deflection, parallel=True)
+
+        mesh = None
+        if any(f in self.MESH_FORMATS for f in self._formats):
+            with self._timed("extract mesh"):
+                mesh = extract_mesh(shape)
+
+        paths = []
+        for f in self._formats:
+            filepath = self._output_dir / "combined_shape_{}.{}".format(number, f)
+            with self._timed(f):
+                if f == "stl":
+                    from OCC.Core.StlAPI import StlAPI_Writer
+
+                    # The writer uses the triangulation the shape already has
+                    stl_writer = StlAPI_Writer()
+                    stl_writer.SetASCIIMode(self._ascii_stl)
+                    if not stl_writer.Write(shape, str(filepath)):
+                        raise IOError("Unable to write STL file: {}".format(filepath))
+                elif f == "step":
+                    from OCC.Extend.DataExchange import write_step_file
+
+                    write_step_file(shape, str(filepath))
+                elif f == "obj":
+                    write_obj(mesh, filepath)
+                elif f == "3mf":
+                    write_3mf(mesh, filepath)
+            paths.append(filepath)
+        return paths
+
+    def export_mesh(self, mesh, number):
+        """
+        Exports a Mesh that has no BRep shape behind it, eg. from the voxel engine, the same way as
+        export_shape. STEP files need a BRep shape, so they can't be written
+        :return: The list of paths written
+        """
+        if "step" in self._formats:
+            raise ValueError("STEP files can't be written from a mesh. Please use one of {}".format(
+                [f for f in self.FORMATS if f != "step"]))
+
+        with profiling.span("export_mesh", number=number):
+            paths = []
+            for f in self._formats:
+                filepath = self._output_dir / "combined_shape_{}.{}".format(number, f)
+                with self._timed(f):
+                    if f == "stl":
+                        write_mesh_stl(mesh, filepath, self._ascii_stl)
+                    elif f == "obj":
+                        write_obj(mesh, filepath)
+                    elif f == "3mf":
+                        write_3mf(mesh, filepath)
+                paths.append(filepath)
+            return paths
+
+    def timings(self):
+        """
+        :return: A dict of the total seconds spent in each stage (meshing and each format)
+        """
+        return dict(self._timings)
+
+    def log_timings(self):
+        for stage, seconds in self._timings.items():
+            logger.info("Export {}: {:.3f}s".format(stage, seconds))
+
+    @contextmanager
+    def _timed(self, stage):
+        start = time.perf_counter()
+        with profiling.span("export_" + stage.replace(" ", "_")):
+            yield
+        self._timings[stage] = self._timings.get(stage, 0) + time.perf_counter() - start
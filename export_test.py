@@ -0,0 +1,57 @@
+import unittest
+import tempfile
+import zipfile
+from pathlib import Path
+from OCC.Extend.ShapeFactory import make_box
+from export import ExportPipeline, Mesh, extract_mesh, write_obj, write_3mf
+from stl import mesh_shape
+
+
+class TestExport(unittest.TestCase):
+    def test_extract_mesh_from_box(self):
+        box = make_box(10, 20, 30)
+        mesh_shape(box)
+        mesh = extract_mesh(box)
+        # Each face of the box has its own 4 corners and is split into 2 triangles
+        self.assertEqual(len(mesh.vertices), 24)
+        self.assertEqual(len(mesh.triangles), 12)
+
+    def test_write_obj(self):
+        mesh = Mesh([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 1, 2)])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = Path(tmp_dir, "triangle.obj")
+            write_obj(mesh, filepath)
+            lines = filepath.read_text().splitlines()
+        self.assertEqual(lines, ["v 0 0 0", "v 1 0 0", "v 0 1 0", "f 1 2 3"])
+
+    def test_write_3mf(self):
+        mesh = Mesh([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 1, 2)])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = Path(tmp_dir, "triangle.3mf")
+            write_3mf(mesh, filepath)
+            with zipfile.ZipFile(str(filepath)) as archive:
+                self.assertIn("[Content_Types].xml", archive.namelist())
+                self.assertIn("_rels/.rels", archive.namelist())
+                model = archive.read("3D/3dmodel.model").decode()
+        self.assertIn('<triangle v1="0" v2="1" v3="2"/>', model)
+        self.assertEqual(model.count("<vertex "), 3)
+
+    def test_export_all_formats(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pipeline = ExportPipeline(tmp_dir, formats=ExportPipeline.FORMATS)
+            paths = pipeline.export([make_box(10, 10, 10), make_box(5, 5, 5)])
+            self.assertEqual(len(paths), 2)
+            for shape_paths in paths:
+                self.assertEqual([p.suffix for p in shape_paths], [".stl", ".step", ".obj", ".3mf"])
+                for p in shape_paths:
+                    self.assertTrue(p.is_file())
+            self.assertIn("mesh", pipeline.timings())
+
+    def test_unsupported_format(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(ValueError):
+                ExportPipeline(tmp_dir, formats=["stl", "dxf"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,36 +1,95 @@
-from OCC.Core.Geom import Geom_BezierCurve
-from OCC.Core.TColgp import TColgp_Array1OfPnt
-from OCC.Core.gp import gp_Pnt, gp_Trsf, gp_OX, gp_Elips
-import OCC.Core.GeomConvert as g2dc
-from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_MakeEdge, BRepBuilderAPI_MakeFace, BRepBuilderAPI_MakeWire, \
-    BRepBuilderAPI_Transform
-from OCC.Extend.ShapeFactory import make_edge
 import pathlib
-from svgpathtools import Line, CubicBezier, Path, QuadraticBezier, Document, Arc
 import logging
-from constants import PL_XZ
-from shapely.geometry import Point, Polygon
+import profiling
 from svg_path_hierarchy import SvgPathHierarchy
+from cache import make_key, file_digest
+
+# OCC, svgpathtools and shapely are only needed to build faces from svg files, which is skipped
+# entirely when the faces are cached. So they're imported by the methods that use them
 
 logging.getLogger("PIL").setLevel(logging.WARNING)
 
 
 class FaceFactory():
-    def __init__(self, face_images_dir):
-        self._face_images_dir = face_images_dir
-        assert face_images_dir.is_dir()
+    def __init__(self, font_path, cache=None):
+        """
+        :param font_path: The directory containing one <char>.svg file per character, or a font pack
+        built from one (see font_pack.py). Font packs skip parsing the svg files entirely
+        :param cache: An optional cache.ShapeCache. When given, faces are looked up by the content
+        of their svg file (or font pack glyph), the char, the height and the font before being built from scratch
+        """
+        self._font_path = font_path
+        if font_path.is_file():
+            from font_pack import FontPack
+            self._font_pack = FontPack(font_path)
+        else:
+            assert font_path.is_dir()
+            self._font_pack = None
+        self._cache = cache
+        self._file_digests = {}
+
+    def font_path(self):
+        return self._font_path
 
     def create_char(self, char, height_mm):
+        char = self._check_char(char)
+
+        if self._cache is None:
+            return self._build_char(char, height_mm)
+
+        if self._font_pack is not None:
+            digest = self._font_pack.glyph_digest(char)
+        else:
+            digest = self._file_digest(self._font_path / "{}.svg".format(char))
+        key = make_key(digest, char, float(height_mm), str(self._font_path.resolve()))
+        face = self._cache.get(key)
+        if face is None:
+            face = self._build_char(char, height_mm)
+            self._cache.put(key, face)
+        return face
+
+    def create_outlines(self, char):
+        """
+        :return: The char's glyph as unit height outlines, in the format parse_svg returns. Read from
+        the font pack, or parsed from the char's svg file
+        """
+        char = self._check_char(char)
+        with profiling.span("load_glyph", char=char):
+            if self._font_pack is not None:
+                return self._font_pack.glyph(char)
+            return self.parse_svg(self._font_path / "{}.svg".format(char))
+
+    def _check_char(self, char):
+        """
+        :return: The char in upper case, once it's known the font has it
+        """
         if not char.isalnum():
             raise ValueError("Unable to create face from char: '{}'. Only alphanumeric characters are supported".format(char))
 
         char = char.upper()
 
-        char_image_file = self._face_images_dir / "{}.svg".format(char)
-        assert char_image_file.is_file()
-
-        return self._create_from_svg(char_image_file, height_mm)
-
+        if self._font_pack is not None:
+            if char not in self._font_pack:
+                raise ValueError("Unable to create face from char: '{}'. The font pack {} has no glyph for it".format(
+                    char, self._font_path))
+        else:
+            assert (self._font_path / "{}.svg".format(char)).is_file()
+        return char
+
+    def _build_char(self, char, height_mm):
+        outlines = self.create_outlines(char)
+        with profiling.span("build_face", char=char):
+            return self.build_face(outlines, height_mm)
+
+    def _file_digest(self, filepath):
+        # Only re-hash the file if it has changed since we last saw it
+        stat = filepath.stat()
+        stat_key = (str(filepath), stat.st_mtime_ns, stat.st_size)
+        digest = self._file_digests.get(stat_key)
+        if digest is None:
+            digest = file_digest(filepath)
+            self._file_digests[stat_key] = digest
+        return digest
 
     @classmethod
     def _create_from_image(cls, filepath, height_mm):
@@ -49,10 +108,24 @@ class FaceFactory():
 
     @classmethod
     def _create_from_svg(cls, filepath, height_mm):
+        return cls.build_face(cls.parse_svg(filepath), height_mm)
+
+    @classmethod
+    def parse_svg(cls, filepath):
+        """
+        Parses the glyph in an svg file into outlines that build_face can make a face from. The glyph
+        is scaled to a height of 1 with y pointing up, and lined up to the x and y axes
+        :return: A list of outlines. Each outline is a list of contours, the first being the outside of
+        the outline and the rest its holes. Each contour is a list of segments, and each segment is a
+        tuple of (x, y) points: the start and end of a line, or the start, control points and end of
+        a Bezier curve
+        """
         assert isinstance(filepath, pathlib.Path)
         if not filepath.is_file():
             raise IOError("Unable to create Face from image file: {}. File does not exist".format(filepath))
 
+        from svgpathtools import Document
+
         # Load as a document rather than as paths directly (using svg2paths) because
         # the document respects any transforms
         doc = Document(str(filepath))
@@ -64,7 +137,7 @@ class FaceFactory():
         ymax = max([path.bbox()[3] for path in continuous_paths])
         current_height = ymax - ymin
         assert current_height >= 0
-        scaling_factor = height_mm / current_height
+        scaling_factor = 1 / current_height
         scaled_paths = [path.scaled(scaling_factor, -scaling_factor) for path in continuous_paths]
 
         # Line up to the x and y axes
@@ -73,34 +146,62 @@ class FaceFactory():
         translated_paths = [path.translated(complex(-xmin, -ymin)) for path in scaled_paths]
 
         normalized_paths = cls._normalize_paths_clockwise(translated_paths)
+        # Glyphs with islands inside holes, or several separate shapes, give more than one hierarchy.
+        # Each one becomes its own outline. Nothing connects the separate pieces, so they come out as
+        # separate solids after combining
         path_hierarchies = cls._create_path_hierarchy(normalized_paths)
-        # Currently only really support a single main contiguous shape with holes.
-        # Although multiple disconnected shapes can be generated, they won't be
-        # perfectly represented by the final geometry because some material has to
-        # connect them
-        assert len(path_hierarchies) == 1
 
-        faceMaker = BRepBuilderAPI_MakeFace(PL_XZ)
+        outlines = []
         for path_hierarchy in path_hierarchies:
-            root_edges = cls._create_edges_from_path(path_hierarchy.root_path())
-            root_wire = cls._create_wire_from_edges(root_edges)
-            faceMaker.Add(root_wire)
-            for sub_path in path_hierarchy.child_paths():
-                sub_path_edges = cls._create_edges_from_path(sub_path)
-                sub_path_wire = cls._create_wire_from_edges(sub_path_edges)
-                # reverse the wire so it creates a hole
-                sub_path_wire.Reverse()
-                faceMaker.Add(sub_path_wire)
-        return faceMaker.Shape()
+            contours = [cls._path_to_segments(path_hierarchy.root_path())]
+            contours += [cls._path_to_segments(sub_path) for sub_path in path_hierarchy.child_paths()]
+            outlines.append(contours)
+        return outlines
+
+    @classmethod
+    def build_face(cls, outlines, height_mm):
+        """
+        Builds a face in the XZ plane from outlines returned by parse_svg, scaled to height_mm
+        :return: A TopoDS_Face, or a TopoDS_Compound of one face per outline if there's more than one
+        """
+        from OCC.Core.BRep import BRep_Builder
+        from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_MakeFace
+        from OCC.Core.TopoDS import TopoDS_Compound
+        from constants import PL_XZ
+
+        faces = []
+        for outline in outlines:
+            faceMaker = BRepBuilderAPI_MakeFace(PL_XZ)
+            for index, contour in enumerate(outline):
+                edges = cls._create_edges_from_segments(contour, height_mm)
+                wire = cls._create_wire_from_edges(edges)
+                if index > 0:
+                    # reverse the wire so it creates a hole
+                    wire.Reverse()
+                faceMaker.Add(wire)
+            faces.append(faceMaker.Face())
+        if len(faces) == 1:
+            return faces[0]
+
+        compound = TopoDS_Compound()
+        builder = BRep_Builder()
+        builder.MakeCompound(compound)
+        for face in faces:
+            builder.Add(compound, face)
+        return compound
 
     @classmethod
     def _get_create_gp_pnt_func(cls):
+        from OCC.Core.gp import gp_Pnt
+
         # for now assume everything is in the XZ plane. We can rotate one
         # of the faces when we go to combine them
         return lambda x: gp_Pnt(x[0], 0, x[1])
 
     @classmethod
     def _remove_zero_length_lines(cls, paths):
+        from svgpathtools import Path
+
         new_paths = []
         for path in paths:
             pp = list(filter(lambda x: x.start != x.end, path))
@@ -114,7 +215,6 @@ class FaceFactory():
     def _get_continuous_subpaths(cls, paths):
         subpaths = []
         for path in paths:
-            assert isinstance(path, Path)
             subpaths += path.continuous_subpaths()
         return subpaths
 
@@ -123,7 +223,6 @@ class FaceFactory():
         assert isinstance(paths, list)
         normalized_paths = []
         for path in paths:
-            assert isinstance(path, Path)
             if cls._path_is_clockwise(path):
                 normalized_paths.append(path)
             else:
@@ -132,7 +231,6 @@ class FaceFactory():
 
     @classmethod
     def _path_is_clockwise(cls, path):
-        assert isinstance(path, Path)
         # https://stackoverflow.com/a/1165943
         vertices = [(path_component.start.real, path_component.start.imag) for path_component in path]
         curve_sum = sum((v2[0] - v1[0]) * (v2[1] + v1[1]) for v1, v2 in zip(vertices, vertices[1:] + [vertices[0]]))
@@ -140,63 +238,62 @@ class FaceFactory():
 
     @classmethod
     def _create_path_hierarchy(cls, paths):
-        # Find path that is not contained by another
-        def get_root_path(all_paths):
-            for path in all_paths:
-                all_except_path = [p for p in all_paths if p != path]
-                path_vertices = [complex(line.start.real, line.start.imag) for line in path]
-                # TODO: This doesn't really account for Bezier curves, but is close enough for now
-                if not any(
-                        [cls._point_in_poly(v, other_path) for other_path in all_except_path for v in path_vertices]):
-                    # No other path contains the current path
-                    return path
-            return None
-
-        def get_contained_paths(root_path, all_paths):
-            all_except_path = [p for p in all_paths if p != root_path]
-            contained_paths = []
-            for other_path in all_except_path:
-                # TODO: This doesn't really account for Bezier curves, but is close enough for now
-                other_path_vertices = [complex(line.start.real, line.start.imag) for line in other_path]
-                if any([cls._point_in_poly(v, root_path) for v in other_path_vertices]):
-                    contained_paths.append(other_path)
-            return contained_paths
-
-        hierarchy = []
-        paths_copy = [p for p in paths]
-        while paths_copy:
-            root = get_root_path(paths_copy)
-            contained = get_contained_paths(root, paths_copy)
-            path_hierarchy = SvgPathHierarchy(root, contained)
-            hierarchy.append(path_hierarchy)
-            for cp in contained:
-                paths_copy.remove(cp)
-            paths_copy.remove(root)
-        return hierarchy
+        """
+        Groups the paths into outer paths and their holes, in a single pass. A path's depth is the
+        number of other paths containing it. Paths at even depths are the outsides of shapes, and
+        paths at odd depths are holes in the path directly containing them. So islands inside holes,
+        and holes in those islands, each get their own hierarchy
+        """
+        from shapely.geometry import Point, Polygon
+        from shapely.prepared import prep
+
+        # TODO: This doesn't really account for Bezier curves, but is close enough for now
+        vertices = [[(line.start.real, line.start.imag) for line in path] for path in paths]
+        # Each polygon is only built (and prepared for repeated containment checks) once
+        polygons = [Polygon(v) for v in vertices]
+        prepared = [prep(polygon) for polygon in polygons]
+        bounds = [polygon.bounds for polygon in polygons]
+
+        # A path is inside another if any of its vertices are. Paths whose bounding boxes don't
+        # overlap can't be inside each other, so are skipped without checking any vertices
+        containers = [[] for _ in paths]
+        for i in range(len(paths)):
+            for j in range(len(paths)):
+                if i == j or not cls._bounds_overlap(bounds[i], bounds[j]):
+                    continue
+                if any(prepared[j].contains(Point(v)) for v in vertices[i]):
+                    containers[i].append(j)
+        depths = [len(c) for c in containers]
+
+        # Shallowest first, so every hole's outer path already has its hierarchy
+        hierarchies = {}
+        for i in sorted(range(len(paths)), key=lambda i: depths[i]):
+            if depths[i] % 2 == 0:
+                hierarchies[i] = SvgPathHierarchy(paths[i])
+            else:
+                # The path directly containing a hole is the deepest one containing it
+                outer = max(containers[i], key=lambda j: depths[j])
+                hierarchies[outer].add_child_path(paths[i])
+        return [hierarchies[i] for i in sorted(hierarchies)]
 
     @classmethod
-    def _point_in_poly(cls, point, lines):
-        # helper function for checking if a (complex) point is contained
-        # inside a polygon (made of lines)
-        poly = Polygon([(line.start.real, line.start.imag) for line in lines])
-        return poly.contains(Point(point.real, point.imag))
+    def _bounds_overlap(cls, bounds1, bounds2):
+        xmin1, ymin1, xmax1, ymax1 = bounds1
+        xmin2, ymin2, xmax2, ymax2 = bounds2
+        return xmin1 <= xmax2 and xmin2 <= xmax1 and ymin1 <= ymax2 and ymin2 <= ymax1
 
     @classmethod
-    def _create_edges_from_path(cls, path):
-        assert isinstance(path, Path)
-        edges = []
-        create_gp_pnt = cls._get_create_gp_pnt_func()
+    def _path_to_segments(cls, path):
+        from svgpathtools import Line, CubicBezier, QuadraticBezier, Arc
+
+        segments = []
         for geom in path:
             if isinstance(geom, Line):
-                start = geom.start
-                end = geom.end
-                p1 = create_gp_pnt((start.real, start.imag))
-                p2 = create_gp_pnt((end.real, end.imag))
-                edges.append(make_edge(p1, p2))
+                segments.append(cls._to_points(geom.start, geom.end))
             elif isinstance(geom, CubicBezier):
-                edges.append(cls._create_edge_from_bezier_pts(geom.start, geom.end, geom.control1, geom.control2))
+                segments.append(cls._to_points(geom.start, geom.control1, geom.control2, geom.end))
             elif isinstance(geom, QuadraticBezier):
-                edges.append(cls._create_edge_from_bezier_pts(geom.start, geom.end, geom.control))
+                segments.append(cls._to_points(geom.start, geom.control, geom.end))
             elif isinstance(geom, Arc):
                 raise NotImplementedError()
                 # https://github.com/tpaviot/pythonocc-core/issues/773 
@@ -235,26 +332,49 @@ class FaceFactory():
                 # wireMaker.Add(edge)
             else:
                 raise RuntimeError("Invalid geom type: {}".format(type(geom)))
+        return segments
+
+    @classmethod
+    def _to_points(cls, *complex_points):
+        return tuple((p.real, p.imag) for p in complex_points)
+
+    @classmethod
+    def _create_edges_from_segments(cls, segments, scale):
+        from OCC.Extend.ShapeFactory import make_edge
+
+        create_gp_pnt = cls._get_create_gp_pnt_func()
+        edges = []
+        for segment in segments:
+            points = [create_gp_pnt((x * scale, y * scale)) for x, y in segment]
+            if len(points) == 2:
+                edges.append(make_edge(points[0], points[1]))
+            else:
+                edges.append(cls._create_edge_from_bezier_pts(points))
         return edges
 
     @classmethod
     def _create_wire_from_edges(cls, edges):
+        from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_MakeWire
+
         wire_maker = BRepBuilderAPI_MakeWire()
         for edge in edges:
             wire_maker.Add(edge)
         return wire_maker.Wire()
 
     @classmethod
-    def _create_edge_from_bezier_pts(cls, start, end, *control_pts):
-        create_gp_pnt = cls._get_create_gp_pnt_func()
-        arr = TColgp_Array1OfPnt(0, 1 + len(control_pts))
-        arr.SetValue(0, create_gp_pnt((start.real, start.imag)))
-        index = 1
-        for cp in control_pts:
-            arr.SetValue(index, create_gp_pnt((cp.real, cp.imag)))
-            index += 1
-        arr.SetValue(index, create_gp_pnt((end.real, end.imag)))
+    def _create_edge_from_bezier_pts(cls, points):
+        """
+        :param points: The gp_Pnt start, control points and end of the curve
+        """
+        from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_MakeEdge
+        from OCC.Core.Geom import Geom_BezierCurve
+        from OCC.Core.GeomConvert import GeomConvert_CompCurveToBSplineCurve
+        from OCC.Core.TColgp import TColgp_Array1OfPnt
+
+        arr = TColgp_Array1OfPnt(0, len(points) - 1)
+        for index, pnt in enumerate(points):
+            arr.SetValue(index, pnt)
         bcurve = Geom_BezierCurve(arr)
-        bspline = g2dc.GeomConvert_CompCurveToBSplineCurve(bcurve).BSplineCurve()
+        bspline = GeomConvert_CompCurveToBSplineCurve(bcurve).BSplineCurve()
         edge = BRepBuilderAPI_MakeEdge(bspline).Edge()
         return edge
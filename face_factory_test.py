@@ -0,0 +1,67 @@
+import unittest
+import pathlib
+import tempfile
+from svgpathtools import Line, Path
+from face_factory import FaceFactory
+
+
+def square(x, y, size):
+    corners = [complex(x, y), complex(x + size, y), complex(x + size, y + size), complex(x, y + size)]
+    return Path(*[Line(start, end) for start, end in zip(corners, corners[1:] + corners[:1])])
+
+
+class TestFaceFactory(unittest.TestCase):
+    def hierarchy_indices(self, paths):
+        hierarchies = FaceFactory._create_path_hierarchy(paths)
+        return sorted((paths.index(h.root_path()), sorted(paths.index(c) for c in h.child_paths()))
+                      for h in hierarchies)
+
+    def test_path_hierarchy_single_path(self):
+        self.assertEqual([(0, [])], self.hierarchy_indices([square(0, 0, 10)]))
+
+    def test_path_hierarchy_holes(self):
+        paths = [square(2, 2, 2), square(0, 0, 10), square(6, 6, 2)]
+        self.assertEqual([(1, [0, 2])], self.hierarchy_indices(paths))
+
+    def test_path_hierarchy_separate_shapes(self):
+        paths = [square(0, 0, 10), square(20, 0, 10), square(22, 2, 2)]
+        self.assertEqual([(0, []), (1, [2])], self.hierarchy_indices(paths))
+
+    def test_path_hierarchy_islands_in_holes(self):
+        # An outer path, a hole in it, an island in the hole, and a hole in the island
+        paths = [square(30, 30, 40), square(0, 0, 100), square(20, 20, 60), square(10, 10, 80)]
+        self.assertEqual([(1, [3]), (2, [0])], self.hierarchy_indices(paths))
+
+    def test_parse_svg_glyphs(self):
+        face_images_dir = pathlib.Path(__file__).parent / "test_data"
+        for filepath in face_images_dir.glob("*.svg"):
+            outlines = FaceFactory.parse_svg(filepath)
+            self.assertEqual(1, len(outlines))
+            points = [p for outline in outlines for contour in outline for segment in contour for p in segment]
+            self.assertAlmostEqual(0, min(y for _, y in points), delta=1e-9)
+            self.assertAlmostEqual(0, min(x for x, _ in points), delta=1e-9)
+
+    def test_parse_svg_island_in_hole(self):
+        # A square with a square hole, and a square island in the hole
+        svg = ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">'
+               '<path d="M0 0L100 0L100 100L0 100Z M20 20L20 80L80 80L80 20Z M40 40L60 40L60 60L40 60Z"/></svg>')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = pathlib.Path(tmp_dir, "O.svg")
+            filepath.write_text(svg)
+            outlines = FaceFactory.parse_svg(filepath)
+
+        # The square and its hole, then the island
+        self.assertEqual([2, 1], sorted((len(outline) for outline in outlines), reverse=True))
+        island = min(outlines, key=len)[0]
+        points = [p for segment in island for p in segment]
+        self.assertAlmostEqual(0.4, min(x for x, _ in points))
+        self.assertAlmostEqual(0.6, max(y for _, y in points))
+
+    def test_parse_svg_holes(self):
+        face_images_dir = pathlib.Path(__file__).parent / "test_data"
+        self.assertEqual(1, len(FaceFactory.parse_svg(face_images_dir / "H.svg")[0]))
+        self.assertEqual(2, len(FaceFactory.parse_svg(face_images_dir / "4.svg")[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Font packs: a whole font directory of <char>.svg files compiled into one file. Each glyph is stored
+as the outlines FaceFactory.parse_svg returns (already scaled, lined up, wound clockwise and split
+into outer contours and holes), with the points as packed doubles. FaceFactory builds faces straight
+from a font pack, so svgpathtools and shapely aren't needed at all, and the pack is memory-mapped so
+only the glyphs that are used are ever read.
+
+Usage: python font_pack.py font_directory [-o font_pack_file]
+eg.    python font_pack.py face_images/aldrich  (writes face_images/aldrich.tftpack)
+
+Layout, all little-endian:
+    header  magic (8 bytes), version (uint32), glyph count (uint32)
+    index   per glyph: char code point (uint32), data offset (uint64), data length (uint64)
+    data    per glyph: outline count (uint32), then per outline: contour count (uint32), then per
+            contour: segment count (uint32), the number of points in each segment (uint8 each),
+            and every point's x and y (float64 each)
+"""
+import argparse
+import hashlib
+import logging
+import mmap
+import struct
+from pathlib import Path
+
+MAGIC = b"TFTPACK\0"
+VERSION = 1
+FONT_PACK_SUFFIX = ".tftpack"
+
+_HEADER = struct.Struct("<8sII")
+_INDEX_ENTRY = struct.Struct("<IQQ")
+_COUNT = struct.Struct("<I")
+
+logger = logging.getLogger("TFT")
+
+
+def encode_glyph(outlines):
+    """
+    :param outlines: Outlines as returned by FaceFactory.parse_svg
+    :return: The outlines packed as bytes
+    """
+    parts = [_COUNT.pack(len(outlines))]
+    for outline in outlines:
+        parts.append(_COUNT.pack(len(outline)))
+        for contour in outline:
+            parts.append(_COUNT.pack(len(contour)))
+            parts.append(bytes(len(segment) for segment in contour))
+            coords = [c for segment in contour for point in segment for c in point]
+            parts.append(struct.pack("<{}d".format(len(coords)), *coords))
+    return b"".join(parts)
+
+
+def decode_glyph(buffer, offset=0):
+    """
+    The inverse of encode_glyph
+    :return: The outlines, with the segments and points as tuples
+    """
+    (num_outlines,) = _COUNT.unpack_from(buffer, offset)
+    offset += _COUNT.size
+    outlines = []
+    for _ in range(num_outlines):
+        (num_contours,) = _COUNT.unpack_from(buffer, offset)
+        offset += _COUNT.size
+        outline = []
+        for _ in range(num_contours):
+            (num_segments,) = _COUNT.unpack_from(buffer, offset)
+            offset += _COUNT.size
+            point_counts = buffer[offset:offset + num_segments]
+            offset += num_segments
+            num_coords = 2 * sum(point_counts)
+            coords = struct.unpack_from("<{}d".format(num_coords), buffer, offset)
+            offset += 8 * num_coords
+
+            contour = []
+            index = 0
+            for num_points in point_counts:
+                contour.append(tuple((coords[index + 2 * i], coords[index + 2 * i + 1]) for i in range(num_points)))
+                index += 2 * num_points
+            outline.append(contour)
+        outlines.append(outline)
+    return outlines
+
+
+def build_font_pack(font_dir, pack_path=None):
+    """
+    Parses every <char>.svg file in the font directory and writes them all to one font pack. Other
+    svg files (eg. I_old.svg) are skipped with a warning
+    :param pack_path: Where to write the font pack. Next to the font directory by default
+    :return: The path of the font pack
+    """
+    from face_factory import FaceFactory
+
+    font_dir = Path(font_dir)
+    assert font_dir.is_dir()
+    if pack_path is None:
+        pack_path = font_dir.with_name(font_dir.name + FONT_PACK_SUFFIX)
+    pack_path = Path(pack_path)
+
+    glyphs = []
+    for filepath in sorted(font_dir.glob("*.svg")):
+        char = filepath.stem.upper()
+        if len(char) != 1:
+            logger.warning("Skipping {}. Only files named after a single character are packed".format(filepath))
+            continue
+        glyphs.append((char, encode_glyph(FaceFactory.parse_svg(filepath))))
+
+    offset = _HEADER.size + _INDEX_ENTRY.size * len(glyphs)
+    index = []
+    for char, data in glyphs:
+        index.append(_INDEX_ENTRY.pack(ord(char), offset, len(data)))
+        offset += len(data)
+
+    # Write to a temporary file and rename so a pack that's in use is never seen half written
+    tmp_path = pack_path.with_name(pack_path.name + ".tmp")
+    with open(str(tmp_path), "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(glyphs)))
+        f.writelines(index)
+        f.writelines(data for _, data in glyphs)
+    tmp_path.replace(pack_path)
+    return pack_path
+
+
+class FontPack():
+    """
+    A memory-mapped font pack. Only the index is read when it's opened. Glyphs are decoded when asked for
+    """
+
+    def __init__(self, pack_path):
+        self._pack_path = Path(pack_path)
+        with open(str(self._pack_path), "rb") as f:
+            # The mapping stays valid after the file is closed
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._buffer) < _HEADER.size:
+            raise ValueError("Invalid font pack: {}. The file is too short".format(self._pack_path))
+        magic, version, num_glyphs = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Invalid font pack: {}. Not a font pack file".format(self._pack_path))
+        if version != VERSION:
+            raise ValueError("Unsupported font pack version {} in {}. Please rebuild it with font_pack.py".format(
+                version, self._pack_path))
+
+        self._index = {}
+        for i in range(num_glyphs):
+            code_point, offset, length = _INDEX_ENTRY.unpack_from(self._buffer, _HEADER.size + i * _INDEX_ENTRY.size)
+            self._index[chr(code_point)] = (offset, length)
+
+    def chars(self):
+        return sorted(self._index)
+
+    def glyph(self, char):
+        """
+        :return: The char's outlines, in the format FaceFactory.parse_svg returns
+        """
+        offset, _ = self._index[char]
+        return decode_glyph(self._buffer, offset)
+
+    def glyph_digest(self, char):
+        """
+        A digest of the char's glyph data, for use in cache keys
+        """
+        offset, length = self._index[char]
+        return hashlib.sha256(self._buffer[offset:offset + length]).hexdigest()
+
+    def close(self):
+        self._buffer.close()
+
+    def __contains__(self, char):
+        return char in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile a font directory of <char>.svg files into a font pack")
+    parser.add_argument('font_dir', metavar='font_directory', type=str, help="The directory of svg files")
+    parser.add_argument('-o', '--output', metavar='font_pack_file', type=str, default=None,
+                        help="Where to write the font pack. font_directory{} by default".format(FONT_PACK_SUFFIX))
+    args = parser.parse_args()
+
+    pack_path = build_font_pack(args.font_dir, args.output)
+    print("Wrote {} ({} bytes)".format(pack_path, pack_path.stat().st_size))
@@ -0,0 +1,91 @@
+import unittest
+import shutil
+import tempfile
+import pathlib
+from face_factory import FaceFactory
+from font_pack import FontPack, build_font_pack, encode_glyph, decode_glyph
+
+
+class TestFontPack(unittest.TestCase):
+    def setUp(self):
+        self.font_dir = pathlib.Path(__file__).parent / "test_data"
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.pack_path = pathlib.Path(self.tmp_dir.name, "test_data.tftpack")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_encode_decode_glyph(self):
+        outlines = [
+            [
+                [((0.0, 0.0), (1.0, 0.0)), ((1.0, 0.0), (1.0, 1.0), (0.0, 1.0)), ((0.0, 1.0), (0.0, 0.0))],
+                [((0.25, 0.25), (0.5, 0.5), (0.5, 0.25), (0.25, 0.25))],
+            ],
+            [
+                [((2.0, 0.0), (3.0, 0.0)), ((3.0, 0.0), (2.0, 0.0))],
+            ],
+        ]
+        self.assertEqual(outlines, decode_glyph(encode_glyph(outlines)))
+
+    def test_pack_matches_svg(self):
+        build_font_pack(self.font_dir, self.pack_path)
+        pack = FontPack(self.pack_path)
+        try:
+            svg_chars = sorted(f.stem.upper() for f in self.font_dir.glob("*.svg"))
+            self.assertEqual(svg_chars, pack.chars())
+            for char in svg_chars:
+                outlines = FaceFactory.parse_svg(self.font_dir / "{}.svg".format(char))
+                self.assertEqual(outlines, pack.glyph(char))
+        finally:
+            pack.close()
+
+    def test_other_svgs_skipped_with_warning(self):
+        font_dir = pathlib.Path(self.tmp_dir.name, "font")
+        font_dir.mkdir()
+        shutil.copy(str(self.font_dir / "H.svg"), str(font_dir / "H.svg"))
+        shutil.copy(str(self.font_dir / "H.svg"), str(font_dir / "H(1).svg"))
+        with self.assertLogs("TFT", level="WARNING") as logs:
+            build_font_pack(font_dir, self.pack_path)
+        self.assertEqual(1, len(logs.output))
+        self.assertIn("H(1).svg", logs.output[0])
+
+        pack = FontPack(self.pack_path)
+        try:
+            self.assertEqual(["H"], pack.chars())
+        finally:
+            pack.close()
+
+    def test_shipped_packs_up_to_date(self):
+        # The packs are the default input, so they have to match the svg files they were built from
+        face_images_dir = pathlib.Path(__file__).parent / "face_images"
+        shipped_packs = sorted(face_images_dir.glob("*.tftpack"))
+        self.assertGreater(len(shipped_packs), 0)
+        for shipped_pack in shipped_packs:
+            rebuilt_pack = build_font_pack(face_images_dir / shipped_pack.stem, self.pack_path)
+            self.assertEqual(shipped_pack.read_bytes(), rebuilt_pack.read_bytes(),
+                             "{} is out of date. Rebuild it with font_pack.py".format(shipped_pack))
+
+    def test_glyph_digests_differ(self):
+        build_font_pack(self.font_dir, self.pack_path)
+        pack = FontPack(self.pack_path)
+        try:
+            self.assertEqual(pack.glyph_digest("H"), pack.glyph_digest("H"))
+            self.assertNotEqual(pack.glyph_digest("H"), pack.glyph_digest("E"))
+        finally:
+            pack.close()
+
+    def test_invalid_pack(self):
+        self.pack_path.write_bytes(b"not a font pack")
+        with self.assertRaises(ValueError):
+            FontPack(self.pack_path)
+
+    def test_face_factory_missing_glyph(self):
+        build_font_pack(self.font_dir, self.pack_path)
+        face_factory = FaceFactory(self.pack_path)
+        self.assertEqual(self.pack_path, face_factory.font_path())
+        with self.assertRaises(ValueError):
+            face_factory.create_char("Z", 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
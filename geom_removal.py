@@ -1,41 +1,46 @@
 from OCC.Core.BRep import BRep_Builder
-
-from OCCUtils.base import BaseObject
-from OCCUtils.Common import to_string
-from OCCUtils.solid import Solid
+from OCC.Core.TopoDS import TopoDS_Compound, TopoDS_Solid
+from OCCUtils.base import GlobalProperties
 from graph import Graph
 from bounding_box import BoundingBox, Point
-from util import *
-from collections import deque
+from spatial_index import BoundingBoxGrid
+from bounding_box_array import BoundingBoxArray
+from shape_properties import ShapeProperties
+from boolean_options import DEFAULT_BOOLEAN_OPTIONS
+from util import split_compound
+from collections import deque, defaultdict
+import numpy as np
 from solid_face_validator import SolidFaceValidator
-from OCCUtils.Construct import compound as make_compound
+from parallel import map_in_pool
+import profiling
+from stl import shape_to_brep_string, shape_from_brep_string
 
 class Node():
-    def __init__(self, solid):
+    __slots__ = ("_solid", "_props")
+
+    def __init__(self, solid, props=None):
+        """
+        :param props: The solid's ShapeProperties, if something else already has them
+        """
         assert isinstance(solid, TopoDS_Solid)
-        self._solid = copy.deepcopy(solid)
-        props = GlobalProperties(solid)
-        x1, y1, z1, x2, y2, z2 = props.bbox()
-        xmin = min(x1, x2)
-        xmax = max(x1, x2)
-        ymin = min(y1, y2)
-        ymax = max(y1, y2)
-        zmin = min(z1, z2)
-        zmax = max(z1, z2)
-        self._bbox = BoundingBox(xmin, ymin, zmin, xmax, ymax, zmax)
+        self._solid = solid
+        self._props = props if props is not None else ShapeProperties(solid)
 
     def solid(self):
         return self._solid
 
     def bbox(self):
-        return self._bbox
+        return self._props.bbox()
+
+    def properties(self):
+        return self._props
 
     def __hash__(self):
-        return self._bbox.__hash__()
+        return self.bbox().__hash__()
         # return self._solid.__hash__() + self._bbox.__hash__()
 
     def __eq__(self, other):
-        bbox_eq = self._bbox == other.bbox()
+        bbox_eq = self.bbox() == other.bbox()
         return bbox_eq
         # Ignore the shapes for now. The equality is based on memory location, so doesn't work
         # and i haven't found another way to check for geometry equality yet. In theory the bbox
@@ -44,31 +49,48 @@ class Node():
     def __ne__(self, other):
         return not self.__eq__(other)
 
-def create_solid_graph(solids):
+# Solids are adjacent if their bounding boxes overlap (by more than the threshold) when viewed
+# along one of the axes, and are within the max distance of each other
+ADJACENCY_OVERLAP_THRESHOLD = 1
+ADJACENCY_MAX_DIST = 0.1
+
+def create_solid_graph(solids, properties=None):
+    """
+    :param properties: The ShapeProperties of each solid, if the caller already has them
+    """
     graph = Graph()
     if not solids:
         return graph
 
-    def _is_adjacent(node1, node2):
-        assert isinstance(node1, Node)
-        assert isinstance(node2, Node)
-
-        overlap = node1.bbox().overlaps(node2.bbox(), threshold=1)
-        close = node1.bbox().dist(node2.bbox()) < 0.1
-        return overlap and close
+    if properties is None:
+        properties = [ShapeProperties(s) for s in solids]
+    nodes = list({Node(s, p) for s, p in zip(solids, properties)})
+    bboxes = BoundingBoxArray.from_bboxes([n.bbox() for n in nodes])
+
+    # Only pairs of nodes close enough to be adjacent are checked, rather than every pair
+    candidates = sorted(BoundingBoxGrid([n.bbox() for n in nodes]).candidate_pairs(margin=ADJACENCY_MAX_DIST))
+    neighbours = defaultdict(list)
+    if candidates:
+        i, j = np.array(candidates).T
+        adjacent = bboxes.overlaps(i, j, threshold=ADJACENCY_OVERLAP_THRESHOLD) & \
+                   (bboxes.dist(i, j) < ADJACENCY_MAX_DIST)
+        for a, b in zip(i[adjacent], j[adjacent]):
+            neighbours[a].append(b)
+            neighbours[b].append(a)
 
-    nodes = {Node(s) for s in solids}
     visited = set()
     frontier = deque()
-    frontier.append(nodes.pop())
+    frontier.append(0)
     while frontier:
-        node = frontier.pop()
-        visited.add(node)
-        graph.add_node(node)
-        adjacent = [n for n in nodes if n not in visited and _is_adjacent(node, n)]
-        for a in adjacent:
-            graph.add_edge(node, a)
-            frontier.append(a)
+        i = frontier.pop()
+        if i in visited:
+            continue
+        visited.add(i)
+        graph.add_node(nodes[i])
+        for j in neighbours[i]:
+            if j not in visited:
+                graph.add_edge(nodes[i], nodes[j])
+                frontier.append(j)
 
     # assert len(graph.all_vertices()) == len(solids)
     assert graph.is_connected()
@@ -83,34 +105,63 @@ def create_compound(nodes):
         aBuilder.Add(aRes, n.solid())
     return aRes
 
-def remove_redundant_geom(compound):
-    validator = SolidFaceValidator(compound)
-    all_solids = split_compound(compound)
-    graph = create_solid_graph(all_solids)
+def remove_redundant_geom(compound, options=DEFAULT_BOOLEAN_OPTIONS):
+    """
+    :param options: The BooleanOptions to split the compound with
+    """
+    with profiling.span("remove_redundant_geom"):
+        return _remove_redundant_geom(compound, options)
+
+def _remove_redundant_geom(compound, options):
+    with profiling.span("split_compound"):
+        all_solids = split_compound(compound, options)
+    profiling.count("split_cells", len(all_solids))
+    # Shared so each solid's bbox and centroid are only computed once
+    with profiling.span("solid_properties"):
+        properties = [ShapeProperties(s) for s in all_solids]
+    with profiling.span("validator_init"):
+        validator = SolidFaceValidator(compound, all_solids, properties)
+    with profiling.span("graph_build"):
+        graph = create_solid_graph(all_solids, properties)
 
     props = GlobalProperties(compound)
     x1, y1, z1, x2, y2, z2 = props.bbox()
     corner = Point(x2, y1, z2)
-    vertices_to_remove = list(graph.all_vertices())
-    vertices_to_remove.sort(key=lambda x: x.bbox().max_dist_to_point(corner), reverse=True)
-
-    for index, v in enumerate(vertices_to_remove):
-        new_graph = copy.deepcopy(graph)
-        new_graph.remove_vertex(v)
-        is_connected = new_graph.is_connected()
-        # Short-circuit if the removal is invalid before we check the validator.
-        # If is_connected=False but the validator reports "valid", the validator's
-        # internal state will be changed but it won't be in sync with the actual shape anymore
-        if not is_connected:
-            continue
-
-        if validator.remove_if_valid(v.solid()):
-            graph = copy.deepcopy(new_graph)
+    vertices = list(graph.all_vertices())
+    dists = BoundingBoxArray.from_bboxes([v.bbox() for v in vertices]).max_dist_to_point(corner)
+    # Furthest first. A stable sort keeps ties in the same order as before
+    vertices_to_remove = [vertices[i] for i in np.argsort(-dists, kind="stable")]
+
+    with profiling.span("removal_loop"):
+        for v in vertices_to_remove:
+            # Short-circuit if the removal would disconnect the shape before we check the validator.
+            # If the removal disconnects the shape but the validator reports "valid", the validator's
+            # internal state will be changed but it won't be in sync with the actual shape anymore.
+            # The articulation points are only recomputed after a vertex is actually removed
+            if graph.is_articulation_point(v):
+                continue
+
+            if validator.remove_if_valid(v.solid(), v.properties()):
+                graph.remove_vertex(v)
+                profiling.count("solids_removed")
 
     final_geom = create_compound(graph.all_vertices())
 
     return final_geom
 
 
-def remove_redundant_geometry(shapes):
-    return [remove_redundant_geom(shape) for shape in shapes]
+def remove_redundant_geometry(shapes, workers=None, options=DEFAULT_BOOLEAN_OPTIONS):
+    """
+    Removes the redundant geometry from each shape. The shapes are independent, so if workers > 1
+    they are processed in that many processes. The results are in the same order as the shapes
+    """
+    if not workers or workers <= 1 or len(shapes) <= 1:
+        return [remove_redundant_geom(shape, options) for shape in shapes]
+
+    results = map_in_pool(_remove_redundant_geom_in_worker, [(shape_to_brep_string(s), options) for s in shapes],
+                          workers)
+    return [shape_from_brep_string(r) for r in results]
+
+def _remove_redundant_geom_in_worker(shape_brep, options):
+    result = remove_redundant_geom(shape_from_brep_string(shape_brep), options)
+    return shape_to_brep_string(result)
@@ -1,9 +1,11 @@
 import unittest
+import copy
 from unittest.mock import MagicMock
 import pathlib
 from face_factory import FaceFactory
 from combiner import combine_faces
 from geom_removal import *
+from util import get_mass
 from OCCUtils.Common import random_color, color
 from OCC.Display.SimpleGui import init_display
 
@@ -73,6 +75,16 @@ class TestGeomRemoval(unittest.TestCase):
             graph.remove_vertex(copy.deepcopy(graph.all_vertices().pop()))
         self.assertEqual(0, len(graph.all_vertices()))
 
+    def test_remove_redundant_geometry_parallel_matches_serial(self):
+        shapes = [self.compound_HE, self.compound_VT, self.compound_GE]
+        serial = remove_redundant_geometry(shapes)
+        parallel = remove_redundant_geometry(shapes, workers=2)
+        self.assertEqual(len(shapes), len(parallel))
+        # In the same order as the shapes
+        for s, p in zip(serial, parallel):
+            self.assertAlmostEqual(get_mass(s), get_mass(p), delta=1e-6)
+        self.assertNotAlmostEqual(get_mass(parallel[0]), get_mass(parallel[1]), delta=1e-3)
+
     def test_remove_geom_HE(self):
         result = remove_redundant_geom(self.compound_HE)
         display.DisplayShape(self.compound_HE, color="WHITE", transparency=0.7)
@@ -9,24 +9,31 @@ class Graph:
 
     def __init__(self):
         self.graph = defaultdict(list)
+        # Cached until the graph changes
+        self._articulation_points = None
 
     def add_node(self, v):
         if v not in self.graph.keys():
             self.graph[v] = []
+            self._articulation_points = None
 
     def add_edge(self, v1, v2):
+        self._articulation_points = None
         if v2 not in self.graph[v1]:
             self.graph[v1].append(v2)
         if v1 not in self.graph[v2]:
             self.graph[v2].append(v1)
 
     def remove_vertex(self, v):
-        foo = self.graph.pop(v, None)
-        # if foo is None:
-        #     print("ERROR. Didn't find vertex to remove")
-        for vertex, adjacency in self.graph.items():
+        adjacency = self.graph.pop(v, None)
+        if adjacency is None:
+            return
+
+        self._articulation_points = None
+        # Edges are always added in both directions, so only the neighbours can refer to v
+        for vertex in adjacency:
             try:
-                adjacency.remove(v)
+                self.graph[vertex].remove(v)
             except ValueError:
                 pass
 
@@ -55,3 +62,56 @@ class Graph:
         num_nodes = len(self.graph.keys())
         return num_visited == num_nodes
 
+    def articulation_points(self):
+        """
+        Returns the vertices whose removal would disconnect the graph (or the part of it they are in).
+        This is O(V + E), and the result is cached until the graph is next modified, so checking many
+        vertices between removals is cheap
+        """
+        if self._articulation_points is None:
+            self._articulation_points = frozenset(self._find_articulation_points())
+        return self._articulation_points
+
+    def is_articulation_point(self, v):
+        return v in self.articulation_points()
+
+    def _find_articulation_points(self):
+        # Tarjan's algorithm. The depth-first search is iterative so large graphs don't
+        # hit the recursion limit
+        discovery = {}
+        low = {}
+        result = set()
+        time = 0
+        for root in self.graph.keys():
+            if root in discovery:
+                continue
+
+            discovery[root] = low[root] = time
+            time += 1
+            root_children = 0
+            stack = [(root, None, iter(self.graph[root]))]
+            while stack:
+                vertex, parent, neighbours = stack[-1]
+                for adj in neighbours:
+                    if adj not in discovery:
+                        discovery[adj] = low[adj] = time
+                        time += 1
+                        stack.append((adj, vertex, iter(self.graph[adj])))
+                        break
+                    elif adj != parent:
+                        low[vertex] = min(low[vertex], discovery[adj])
+                else:
+                    stack.pop()
+                    if parent is None:
+                        continue
+                    low[parent] = min(low[parent], low[vertex])
+                    if parent == root:
+                        root_children += 1
+                    elif low[vertex] >= discovery[parent]:
+                        result.add(parent)
+
+            if root_children > 1:
+                result.add(root)
+
+        return result
+
@@ -96,6 +96,51 @@ class TestGraph(unittest.TestCase):
 
         self.assertFalse(graph.is_connected())
 
+    def test_articulation_points_cycle(self):
+        graph = Graph()
+        graph.add_edge(0, 1)
+        graph.add_edge(1, 2)
+        graph.add_edge(2, 0)
+        self.assertEqual(set(), graph.articulation_points())
+
+    def test_articulation_points_path(self):
+        graph = Graph()
+        graph.add_edge(0, 1)
+        graph.add_edge(1, 2)
+        graph.add_edge(2, 3)
+        self.assertEqual({1, 2}, graph.articulation_points())
+        self.assertTrue(graph.is_articulation_point(1))
+        self.assertFalse(graph.is_articulation_point(0))
+
+    def test_articulation_points_single_vertex(self):
+        graph = Graph()
+        graph.add_node(0)
+        self.assertEqual(set(), graph.articulation_points())
+
+    def test_articulation_points_match_is_connected(self):
+        graph = Graph()
+        graph.add_edge(0, 1)
+        graph.add_edge(1, 2)
+        graph.add_edge(2, 3)
+        graph.add_edge(2, 4)
+        graph.add_edge(1, 4)
+        graph.add_edge(4, 5)
+        graph.add_edge(5, 0)
+        self.assertEqual({2}, graph.articulation_points())
+
+        # Removing a vertex updates the articulation points
+        graph.remove_vertex(0)
+        self.assertEqual({2, 4}, graph.articulation_points())
+        graph.remove_vertex(5)
+        self.assertEqual({2}, graph.articulation_points())
+
+    def test_articulation_points_large_path(self):
+        # Make sure we don't hit the recursion limit
+        graph = Graph()
+        for i in range(5000):
+            graph.add_edge(i, i + 1)
+        self.assertEqual(set(range(1, 5000)), graph.articulation_points())
+
 if __name__ == '__main__':
     unittest.main()
 
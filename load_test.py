@@ -0,0 +1,67 @@
+"""
+Sends jobs to a running server.py from several threads at once, and reports the throughput and
+latency. Start the server first, eg. python server.py -o /tmp/tft --workers 4
+
+Usage: python load_test.py [--url url] [--requests n] [--concurrency n] [--height height_mm] [pair ...]
+eg.    python load_test.py --requests 40 --concurrency 4 HE:TV GE:Q4
+Each pair is word1:word2, and the jobs cycle through the pairs in order
+"""
+import argparse
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from client import Client, DEFAULT_URL, ServerError
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def main(url, pairs, num_requests, concurrency, height_mm, return_bytes):
+    client = Client(url)
+    jobs = list(itertools.islice(itertools.cycle(pairs), num_requests))
+
+    def run(pair):
+        start = time.perf_counter()
+        try:
+            client.generate(pair[0], pair[1], height_mm, return_bytes=return_bytes)
+        except ServerError as e:
+            print("{} {} failed: {}".format(pair[0], pair[1], e))
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(run, jobs))
+    elapsed = time.perf_counter() - start
+
+    succeeded = [latency for latency in latencies if latency is not None]
+    print("{} requests, {} failed, concurrency {}".format(len(jobs), len(jobs) - len(succeeded), concurrency))
+    print("Total time: {:.3f}s, throughput: {:.2f} jobs/s".format(elapsed, len(succeeded) / elapsed))
+    if succeeded:
+        print("Latency: min {:.3f}s, p50 {:.3f}s, p95 {:.3f}s, max {:.3f}s".format(
+            min(succeeded), percentile(succeeded, 0.5), percentile(succeeded, 0.95), max(succeeded)))
+    print("Server stats: {}".format(client.stats()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the throughput of a Two-Faced Type server")
+    parser.add_argument('pairs', metavar='pair', type=str, nargs='*', default=["HE:TV", "GE:Q4"],
+                        help="word1:word2 pairs to send")
+    parser.add_argument('--url', type=str, default=DEFAULT_URL, help="The server's address")
+    parser.add_argument('-n', '--requests', type=int, default=20, help="The total number of jobs to send")
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help="The number of jobs to send at once")
+    parser.add_argument('--height', metavar='height_mm', type=float, default=50, help="The height of the characters")
+    parser.add_argument('--bytes', action='store_true', help="Have the files sent back with each response")
+    args = parser.parse_args()
+
+    pairs = []
+    for pair in args.pairs:
+        words = pair.split(":")
+        if len(words) != 2 or len(words[0]) != len(words[1]):
+            parser.error("Invalid pair: '{}'. Expected word1:word2 with words of the same length".format(pair))
+        pairs.append(words)
+
+    main(args.url, pairs, args.requests, args.concurrency, args.height, args.bytes)
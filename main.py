@@ -1,49 +1,289 @@
 import logging
+import sys
+import time
 from pathlib import Path
 import argparse
-from combiner import *
-from geom_removal import remove_redundant_geometry
-from stl import save_to_stl, save_to_step
-from OCC.Display.SimpleGui import init_display
+import profiling
+from stl import DEFAULT_LINEAR_DEFLECTION, DEFAULT_ANGULAR_DEFLECTION
+from export import ExportPipeline
 from face_factory import FaceFactory
+from cache import make_caches
+from boolean_options import BooleanOptions, DEFAULT_BOOLEAN_OPTIONS
+from engines import ENGINES
+
+# Only modules that don't load OCC, shapely or svgpathtools are imported here, so parsing the arguments
+# and starting up is fast. The rest are imported when they're first needed. See startup_benchmark.py
 
 logger = logging.getLogger("TFT")
 logger.setLevel(logging.DEBUG)
 
-display, start_display, _, _ = init_display()
+FACE_IMAGES_DIR = Path(__file__).parent / "face_images/aldrich"
+# Built from FACE_IMAGES_DIR by font_pack.py. Rebuild it after changing any of the svg files
+DEFAULT_FONT = Path(__file__).parent / "face_images/aldrich.tftpack"
+
 
 # Also, useful site to make svg letters: https://maketext.io/
 # My blessed documentation: https://old.opencascade.com/doc/occt-6.9.0/refman/html/class_geom2d___b_spline_curve.html#a521ec5263443aca0d5ec43cd3ed32ac6
-def main(word1, word2, height_mm, output_dir):
-    display.DisplayShape(make_edge(LINE_X), update=True, color="RED")
-    display.DisplayShape(make_edge(LINE_Y), update=True, color="GREEN")
-    display.DisplayShape(make_edge(LINE_Z), update=True, color="BLUE")
+def main(word1, word2, height_mm, output_dir, cache_dir=None, jobs=1, boolean_options=DEFAULT_BOOLEAN_OPTIONS,
+         ascii_stl=False, linear_deflection=DEFAULT_LINEAR_DEFLECTION, angular_deflection=DEFAULT_ANGULAR_DEFLECTION,
+         formats=("stl", "step"), remove_redundant=False, max_in_flight=None, font=DEFAULT_FONT, view=False,
+         engine="occ"):
+    """
+    Combines the words, writes each letter to output_dir and prints how long it took
+    :param font: A font directory of svg files, or a font pack
+    :param view: Show the letters in the OCC viewer afterwards, and block until it's closed
+    :param engine: How to combine each letter pair. See combiner.iter_combined_letters
+    """
+    face_cache, pair_cache = make_caches(cache_dir)
+    face_factory = FaceFactory(Path(font), cache=face_cache)
+    letters, timings = generate(word1, word2, height_mm, output_dir, face_factory, pair_cache, jobs, boolean_options,
+                                ascii_stl, linear_deflection, angular_deflection, formats, remove_redundant,
+                                max_in_flight, keep_letters=view, engine=engine)
+    print(format_timings(word1, word2, timings))
+
+    if view:
+        if engine == "voxel":
+            logger.warning("The viewer can only show BRep shapes, not the voxel engine's meshes")
+        else:
+            show(letters)
+
+
+def run_batch(batch, height_mm, output_dir, cache_dir=None, jobs=1, boolean_options=DEFAULT_BOOLEAN_OPTIONS,
+              ascii_stl=False, linear_deflection=DEFAULT_LINEAR_DEFLECTION,
+              angular_deflection=DEFAULT_ANGULAR_DEFLECTION, formats=("stl", "step"), remove_redundant=False,
+              max_in_flight=None, font=DEFAULT_FONT, engine="occ"):
+    """
+    Runs every job in the batch, sharing the face and letter pair caches between them. Each job's
+    files are written to their own <word1>_<word2> directory in output_dir. A job that fails is
+    logged and doesn't stop the rest
+    :param batch: An iterable of lines in the format read_batch expects
+    :param height_mm: The height for jobs that don't give their own
+    :param font: A font directory of svg files, or a font pack
+    :return: The number of jobs that failed
+    """
+    face_cache, pair_cache = make_caches(cache_dir)
+    face_factory = FaceFactory(Path(font), cache=face_cache)
+
+    failures = 0
+    batch_start = time.perf_counter()
+    for word1, word2, job_height_mm in read_batch(batch, height_mm):
+        job_dir = Path(output_dir, "{}_{}".format(word1, word2))
+        try:
+            _, timings = generate(word1, word2, job_height_mm, job_dir, face_factory, pair_cache, jobs,
+                                  boolean_options, ascii_stl, linear_deflection, angular_deflection, formats,
+                                  remove_redundant, max_in_flight, engine=engine)
+        except Exception:
+            logger.exception("Failed to generate {} {}".format(word1, word2))
+            failures += 1
+            continue
+        print(format_timings(word1, word2, timings))
+
+    print("Batch finished in {:.3f}s with {} failed jobs".format(time.perf_counter() - batch_start, failures))
+    logger.debug("Combined letter pair cache: {}".format(pair_cache.stats()))
+    return failures
+
+
+def generate(word1, word2, height_mm, output_dir, face_factory, pair_cache, jobs=1,
+             boolean_options=DEFAULT_BOOLEAN_OPTIONS, ascii_stl=False, linear_deflection=DEFAULT_LINEAR_DEFLECTION,
+             angular_deflection=DEFAULT_ANGULAR_DEFLECTION, formats=("stl", "step"), remove_redundant=False,
+             max_in_flight=None, keep_letters=False, engine="occ"):
+    """
+    Combines the words and writes each letter to output_dir as soon as it's finished
+    :param keep_letters: Return the letters. Otherwise each one is dropped once it's written, so
+    only max_in_flight letters are in memory at once
+    :param engine: How to combine each letter pair. See combiner.iter_combined_letters. The voxel
+    engine's letters are Meshes, so STEP files are skipped for them
+    :return: The letters (or an empty list), and a dict of the seconds spent in each stage
+    """
+    if engine == "voxel":
+        # Imported straight from voxel_engine rather than through the combiner, so previews don't load OCC
+        import voxel_engine
+
+        if "step" in formats:
+            logger.warning("Not writing STEP files, since the voxel engine's letters are meshes")
+            formats = [f for f in formats if f != "step"]
+        # Nothing is combined until the letters are iterated over below
+        letters = voxel_engine.iter_combined_letters(word1, word2, face_factory, height_mm, remove_redundant)
+        offset_letter, export_letter = voxel_engine.offset_mesh, ExportPipeline.export_mesh
+    else:
+        from combiner import iter_combined_letters, offset_shape
+
+        letters = iter_combined_letters(word1, word2, face_factory, height_mm, pair_cache=pair_cache, workers=jobs,
+                                        options=boolean_options, remove_redundant=remove_redundant,
+                                        max_in_flight=max_in_flight, engine=engine)
+        offset_letter, export_letter = offset_shape, ExportPipeline.export_shape
+
+    with profiling.span("generate", word1=word1, word2=word2, height_mm=height_mm):
+        pipeline = ExportPipeline(output_dir, formats, ascii_stl=ascii_stl, linear_deflection=linear_deflection,
+                                  angular_deflection=angular_deflection)
+
+        kept_letters = []
+        timings = {"combine": 0.0, "export": 0.0}
+        start = time.perf_counter()
+        for index, letter in enumerate(letters):
+            letter = offset_letter(letter, index, height_mm)
+            combined = time.perf_counter()
+            timings["combine"] += combined - start
 
-    face_images_dir = Path(__file__).parent / "face_images/aldrich"
-    face_factory = FaceFactory(face_images_dir)
+            export_letter(pipeline, letter, index + 1)
+            if keep_letters:
+                kept_letters.append(letter)
+            start = time.perf_counter()
+            timings["export"] += start - combined
 
-    letters, faces1, faces2 = combine_words(word1, word2, face_factory, height_mm)
-    # letters = remove_redundant_geometry(letters)
-    letters = offset_shapes(letters, height_mm)
+    logger.debug("Combined letter pair cache: {}".format(pair_cache.stats()))
+    pipeline.log_timings()
+    return kept_letters, timings
 
+
+def read_batch(lines, default_height_mm):
+    """
+    Parses batch jobs, one per line, as "word1 word2 [height_mm]". Blank lines and lines starting
+    with # are skipped
+    :return: A list of (word1, word2, height_mm) tuples
+    """
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        fields = line.split()
+        if len(fields) not in (2, 3):
+            raise ValueError("Invalid batch job on line {}: '{}'. Expected 'word1 word2 [height_mm]'".format(
+                line_number, line))
+        word1, word2 = fields[0], fields[1]
+        if len(word1) != len(word2):
+            raise ValueError("Invalid batch job on line {}: '{}'. The words must be the same length".format(
+                line_number, line))
+        # The words name the job's output directory, so they mustn't contain path separators or dots
+        if not word1.isalnum() or not word2.isalnum():
+            raise ValueError("Invalid batch job on line {}: '{}'. The words must only contain letters and "
+                             "numbers".format(line_number, line))
+        height_mm = float(fields[2]) if len(fields) == 3 else default_height_mm
+        batch.append((word1, word2, height_mm))
+    return batch
+
+
+def format_timings(word1, word2, timings):
+    stages = ", ".join("{} {:.3f}s".format(stage, seconds) for stage, seconds in timings.items())
+    return "{} {}: {}, total {:.3f}s".format(word1, word2, stages, sum(timings.values()))
+
+
+def show(letters):
+    """
+    Displays the letters in the OCC viewer and blocks until it's closed. The viewer is only imported
+    here so everything else can run without a display
+    """
+    from OCC.Display.SimpleGui import init_display
+    from OCC.Extend.ShapeFactory import make_edge
+    from constants import LINE_X, LINE_Y, LINE_Z
+
+    display, start_display, _, _ = init_display()
+    display.DisplayShape(make_edge(LINE_X), update=True, color="RED")
+    display.DisplayShape(make_edge(LINE_Y), update=True, color="GREEN")
+    display.DisplayShape(make_edge(LINE_Z), update=True, color="BLUE")
     for letter in letters:
         if letter:
             display.DisplayShape(letter)
-
-    save_to_stl(letters, output_dir)
-    save_to_step(letters, output_dir)
-
     start_display()
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Combine words into Two-Faced Type, and output as STLs")
-    parser.add_argument('words', metavar='word', type=str, nargs=2, help='the words to combine')
+    parser.add_argument('words', metavar='word', type=str, nargs='*',
+                        help="the two words to combine. Leave out when using --batch")
+    parser.add_argument('--batch', metavar='batch_file', type=str, default=None,
+                        help="A file of jobs to run, one 'word1 word2 [height_mm]' per line, or - to read them from "
+                             "stdin. Each job's files are written to output_directory/word1_word2")
     parser.add_argument('-o', '--output_dir', metavar='output_directory', type=str,
                         help="The directory to write STL files to. Will be created if it doesn't exist", required=True)
-    parser.add_argument('--height', metavar='height_mm', type=float, help="The height of the characters, in mm",
-                        required=True)
+    parser.add_argument('--height', metavar='height_mm', type=float, required=True,
+                        help="The height of the characters, in mm. Batch jobs can give their own")
+    parser.add_argument('--cache_dir', metavar='cache_directory', type=str, default=None,
+                        help="A directory to cache letter faces and combined letter pairs in between runs. "
+                             "If not given, they are only cached in memory")
+    parser.add_argument('-j', '--jobs', metavar='num_processes', type=int, default=1,
+                        help="The number of processes to combine letter pairs and remove redundant geometry in")
+    parser.add_argument('--parallel_booleans', action='store_true',
+                        help="Run each boolean operation multi-threaded")
+    parser.add_argument('--fuzzy', metavar='fuzzy_mm', type=float, default=0.0,
+                        help="Extra tolerance for boolean operations, so nearly coincident geometry is treated "
+                             "as coincident")
+    parser.add_argument('--obb', action='store_true',
+                        help="Use oriented bounding boxes to speed up boolean operations")
+    parser.add_argument('--glue', choices=sorted(BooleanOptions.GLUE_MODES), default="off",
+                        help="How boolean operations glue shapes with coincident faces")
+    parser.add_argument('--ascii_stl', action='store_true', help="Write ASCII STL files instead of binary ones")
+    parser.add_argument('--linear_deflection', metavar='mm', type=float, default=DEFAULT_LINEAR_DEFLECTION,
+                        help="How far the STL triangles may deviate from the real surface")
+    parser.add_argument('--angular_deflection', metavar='radians', type=float, default=DEFAULT_ANGULAR_DEFLECTION,
+                        help="How far the STL triangles' angles may deviate from the real surface")
+    parser.add_argument('--formats', metavar='format', type=str, nargs='+', default=["stl", "step"],
+                        choices=ExportPipeline.FORMATS, help="The file formats to write each letter to")
+    parser.add_argument('--remove_redundant', action='store_true',
+                        help="Remove the geometry that can't be seen from either viewing direction from each letter")
+    parser.add_argument('--max_in_flight', metavar='num_letters', type=int, default=None,
+                        help="The most letters to have in progress at once when using multiple jobs. "
+                             "Twice the number of jobs by default")
+    parser.add_argument('--font', metavar='font', type=str, default=str(DEFAULT_FONT),
+                        help="A directory of <char>.svg files, or a font pack built from one with font_pack.py. "
+                             "Defaults to the Aldrich font pack")
+    parser.add_argument('--engine', choices=ENGINES, default="occ",
+                        help="How to combine each letter pair. occ uses OCC's boolean operations. polygon builds the "
+                             "letters straight from the glyph outlines with the curves flattened, which is much "
+                             "faster, for previews. polygon_exact only does that for letter pairs without curves. "
+                             "voxel makes blocky meshes from the letters' bitmaps almost instantly, and can't write STEP "
+                             "files")
+    parser.add_argument('--profile', metavar='trace_file', type=str, default=None,
+                        help="Record how long each stage takes and write it to trace_file as JSON, along with a "
+                             "Chrome trace (trace_file with a .chrome.json suffix) to open in chrome://tracing")
+    display_group = parser.add_mutually_exclusive_group()
+    display_group.add_argument('--headless', action='store_true',
+                               help="Don't show the letters, just write the files. This is the default")
+    display_group.add_argument('--view', action='store_true',
+                               help="Show the letters in the OCC viewer once they're written")
     args = parser.parse_args()
 
-    main(args.words[0], args.words[1], args.height, args.output_dir)
+    if args.batch is not None:
+        if args.words:
+            parser.error("Words can't be given together with --batch")
+        if args.view:
+            parser.error("--view can't be used with --batch")
+    elif len(args.words) != 2:
+        parser.error("Please give exactly 2 words, or use --batch")
+
+    boolean_options = BooleanOptions(parallel=args.parallel_booleans, fuzzy_value=args.fuzzy, use_obb=args.obb,
+                                     glue=args.glue)
+    if args.profile is not None:
+        profiling.enable()
+
+    try:
+        if args.batch is not None:
+            if args.batch == "-":
+                failures = run_batch(sys.stdin, args.height, args.output_dir, args.cache_dir, args.jobs,
+                                     boolean_options, args.ascii_stl, args.linear_deflection,
+                                     args.angular_deflection, args.formats, args.remove_redundant,
+                                     args.max_in_flight, args.font, args.engine)
+            else:
+                with open(args.batch) as batch_file:
+                    failures = run_batch(batch_file, args.height, args.output_dir, args.cache_dir, args.jobs,
+                                         boolean_options, args.ascii_stl, args.linear_deflection,
+                                         args.angular_deflection, args.formats, args.remove_redundant,
+                                         args.max_in_flight, args.font, args.engine)
+        else:
+            failures = 0
+            main(args.words[0], args.words[1], args.height, args.output_dir, args.cache_dir, args.jobs,
+                 boolean_options, args.ascii_stl, args.linear_deflection, args.angular_deflection, args.formats,
+                 args.remove_redundant, args.max_in_flight, args.font, args.view, args.engine)
+    finally:
+        profiler = profiling.disable()
+        if profiler is not None:
+            trace_path = Path(args.profile)
+            profiler.write(trace_path, profiling.chrome_trace_path(trace_path))
+            print(profiler.format_summary())
+            print("Wrote profile to {} and {}".format(trace_path, profiling.chrome_trace_path(trace_path)))
+
+    if args.batch is not None:
+        sys.exit(1 if failures else 0)
 
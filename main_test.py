@@ -0,0 +1,42 @@
+import unittest
+import subprocess
+import sys
+from pathlib import Path
+from main import read_batch, format_timings
+
+
+class TestMain(unittest.TestCase):
+    def test_read_batch(self):
+        lines = [
+            "# word1 word2 [height_mm]\n",
+            "HE TV\n",
+            "\n",
+            "  GE Q4 30  \n",
+        ]
+        self.assertEqual(read_batch(lines, 50), [("HE", "TV", 50), ("GE", "Q4", 30.0)])
+
+    def test_read_batch_invalid_lines(self):
+        with self.assertRaises(ValueError):
+            read_batch(["HE\n"], 50)
+        with self.assertRaises(ValueError):
+            read_batch(["HE TV 30 40\n"], 50)
+        with self.assertRaises(ValueError):
+            read_batch(["HEY TV\n"], 50)
+        with self.assertRaises(ValueError):
+            read_batch(["../../tmp/x abcdefghij\n"], 50)
+
+    def test_format_timings(self):
+        self.assertEqual(format_timings("HE", "TV", {"combine": 1.5, "export": 0.25}),
+                         "HE TV: combine 1.500s, export 0.250s, total 1.750s")
+
+    def test_import_doesnt_load_heavy_packages(self):
+        # Run in a fresh interpreter, since other tests may already have imported them
+        check = "import sys, main; print(sorted({m.split('.')[0] for m in sys.modules} & " \
+                "{'OCC', 'OCCUtils', 'shapely', 'svgpathtools'}))"
+        output = subprocess.check_output([sys.executable, "-c", check], cwd=str(Path(__file__).parent),
+                                         universal_newlines=True)
+        self.assertEqual(output.strip(), "[]")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def map_in_pool(fn, args_list, workers):
+    """
+    Calls fn(*args) for each args in args_list on a pool of worker processes, and returns the
+    results in the same order as args_list. fn, its arguments and its results must be picklable,
+    so shapes should be sent across as BRep strings (see stl.shape_to_brep_string).
+    Runs everything in the current process if workers is None or 1
+    """
+    args_list = list(args_list)
+    if not workers or workers <= 1 or len(args_list) <= 1:
+        return [fn(*args) for args in args_list]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(args_list))) as executor:
+        futures = [executor.submit(fn, *args) for args in args_list]
+        return [f.result() for f in futures]
+
+
+def imap_in_pool(fn, args_iterable, workers, max_in_flight=None):
+    """
+    Like map_in_pool, but yields each result as soon as it and every result before it are ready.
+    args_iterable is only consumed as far as needed to keep max_in_flight calls submitted at once
+    (twice the number of workers by default), so neither the arguments nor the results all have
+    to be in memory at the same time. Runs everything in the current process if workers is None or 1
+    """
+    if not workers or workers <= 1:
+        for args in args_iterable:
+            yield fn(*args)
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    assert max_in_flight > 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for args in args_iterable:
+            in_flight.append(executor.submit(fn, *args))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
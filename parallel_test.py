@@ -0,0 +1,45 @@
+import unittest
+from parallel import map_in_pool, imap_in_pool
+
+
+def _power(base, exponent):
+    return base ** exponent
+
+
+class TestParallel(unittest.TestCase):
+    def test_serial_preserves_order(self):
+        self.assertEqual([1, 8, 81], map_in_pool(_power, [(1, 2), (2, 3), (3, 4)], workers=None))
+
+    def test_pool_preserves_order(self):
+        args = [(i, 2) for i in range(20)]
+        self.assertEqual([i ** 2 for i in range(20)], map_in_pool(_power, args, workers=4))
+
+    def test_imap_serial_is_lazy(self):
+        consumed = []
+
+        def args():
+            for i in range(5):
+                consumed.append(i)
+                yield i, 2
+
+        results = imap_in_pool(_power, args(), workers=1)
+        self.assertEqual(0, next(results))
+        self.assertEqual([0], consumed)
+        self.assertEqual([1, 4, 9, 16], list(results))
+
+    def test_imap_pool_bounds_in_flight(self):
+        consumed = []
+
+        def args():
+            for i in range(20):
+                consumed.append(i)
+                yield i, 2
+
+        results = imap_in_pool(_power, args(), workers=2, max_in_flight=3)
+        self.assertEqual(0, next(results))
+        self.assertEqual(3, len(consumed))
+        self.assertEqual([i ** 2 for i in range(1, 20)], list(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
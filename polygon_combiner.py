@@ -0,0 +1,317 @@
+"""
+Combines letter pairs without the OCC boolean. combine_faces intersects the first letter extruded
+along Y with the second extruded along X, so at any height z the combined letter's cross section is
+just (the first letter's horizontal slice at z) x (the second letter's slice at z): a set of
+rectangles. Here both glyph outlines are flattened to polygons, and cut into Z-slabs at every height
+where either polygon has a vertex. Within a slab each slice interval's ends move linearly with z, so
+every pair of intervals, one from each letter, sweeps out a hexahedron with planar faces. The
+cells are built directly from their corners and glued into the combined letter's solids.
+
+All of the slicing is plain Python on the outlines FaceFactory.create_outlines returns. OCC is only
+imported to build the cells into solids.
+
+Straight edges are reproduced exactly. Curves are flattened to within DEFAULT_CURVE_TOLERANCE of the
+real curve, which is what the "polygon" engine is for: quick previews and quotes. The
+"polygon_exact" engine only uses the polygons for letter pairs made entirely of straight edges, and
+falls back to the OCC boolean for pairs with curves.
+"""
+import math
+from collections import namedtuple
+import profiling
+
+# How far the flattened curves may deviate from the real ones, in mm. The same as the default STL
+# linear deflection, so the previews are as smooth as the exported meshes
+DEFAULT_CURVE_TOLERANCE = 0.05
+
+# Slabs thinner than this, and interval ends closer than this, are treated as the same, in mm
+EPSILON = 1e-9
+
+# A hexahedron in one slab. x is the first letter's interval and y the second letter's, as (start, end)
+# at the bottom (z0) and top (z1) of the slab
+Cell = namedtuple("Cell", ["z0", "z1", "x_bottom", "x_top", "y_bottom", "y_top"])
+
+
+def has_curves(outlines):
+    """
+    :param outlines: Outlines as returned by FaceFactory.create_outlines
+    """
+    return any(len(segment) > 2 for outline in outlines for contour in outline for segment in contour)
+
+
+def flatten_outlines(outlines, height_mm, tolerance=DEFAULT_CURVE_TOLERANCE):
+    """
+    Scales the outlines to height_mm and flattens their Bezier curves to polylines
+    :param tolerance: The most the polylines may deviate from the curves, in mm
+    :return: A list of rings, one per contour of every outline. Each ring is a list of (x, z) points,
+    with the last point joining back to the first
+    """
+    rings = []
+    for outline in outlines:
+        for contour in outline:
+            ring = []
+            for segment in contour:
+                points = [(x * height_mm, y * height_mm) for x, y in segment]
+                # Each segment starts where the last one ended, so only add its start for the first one
+                ring.extend(_flatten_segment(points, tolerance)[0 if not ring else 1:])
+            if len(ring) > 1 and _close(ring[0], ring[-1]):
+                ring.pop()
+            rings.append(ring)
+    return rings
+
+
+def _flatten_segment(points, tolerance):
+    if len(points) == 2:
+        return points
+
+    # Splitting a degree d Bezier curve into n even steps keeps the chords within
+    # d(d-1)/8 * max|second difference of the control points| / n^2 of the curve
+    degree = len(points) - 1
+    second_differences = [math.hypot(p0[0] - 2 * p1[0] + p2[0], p0[1] - 2 * p1[1] + p2[1])
+                          for p0, p1, p2 in zip(points, points[1:], points[2:])]
+    bound = degree * (degree - 1) / 8 * max(second_differences)
+    steps = max(1, int(math.ceil(math.sqrt(bound / tolerance))))
+    return [_bezier_point(points, i / steps) for i in range(steps + 1)]
+
+
+def _bezier_point(points, t):
+    # de Casteljau
+    while len(points) > 1:
+        points = [((1 - t) * p0[0] + t * p1[0], (1 - t) * p0[1] + t * p1[1]) for p0, p1 in zip(points, points[1:])]
+    return points[0]
+
+
+def _close(p1, p2):
+    return abs(p1[0] - p2[0]) < EPSILON and abs(p1[1] - p2[1]) < EPSILON
+
+
+def _edges(rings):
+    """
+    :return: The non-horizontal edges of the rings as (z_min, z_max, x at z_min, x at z_max), sorted by z_min
+    """
+    edges = []
+    for ring in rings:
+        for (x1, z1), (x2, z2) in zip(ring, ring[1:] + ring[:1]):
+            if abs(z1 - z2) < EPSILON:
+                continue
+            if z1 > z2:
+                x1, z1, x2, z2 = x2, z2, x1, z1
+            edges.append((z1, z2, x1, x2))
+    edges.sort()
+    return edges
+
+
+def _x_at(edge, z):
+    z_min, z_max, x_min, x_max = edge
+    return x_min + (x_max - x_min) * (z - z_min) / (z_max - z_min)
+
+
+def slice_slabs(rings, zs):
+    """
+    Slices the polygon made of the rings (outsides and holes alike, by the even-odd rule) into slabs
+    :param zs: The sorted heights to cut at. Must include every vertex height of the rings
+    :return: A list with, for each slab between consecutive heights, a list of the slice's intervals
+    as ((start, end) at the bottom, (start, end) at the top), in order along x
+    """
+    edges = _edges(rings)
+    next_edge = 0
+    active = []
+    slabs = []
+    for z0, z1 in zip(zs, zs[1:]):
+        active = [e for e in active if e[1] > z0 + EPSILON]
+        while next_edge < len(edges) and edges[next_edge][0] < z1 - EPSILON:
+            if edges[next_edge][1] > z0 + EPSILON:
+                active.append(edges[next_edge])
+            next_edge += 1
+
+        # No vertices are inside the slab, so the edges crossing it don't cross each other and
+        # their order in the middle is their order all the way through
+        z_mid = (z0 + z1) / 2
+        crossings = sorted(active, key=lambda e: _x_at(e, z_mid))
+        assert len(crossings) % 2 == 0, "The outline isn't closed"
+        intervals = []
+        for start, end in zip(crossings[::2], crossings[1::2]):
+            bottom = (_x_at(start, z0), _x_at(end, z0))
+            top = (_x_at(start, z1), _x_at(end, z1))
+            # Edges that run along each other leave intervals with no width, which aren't worth a cell
+            if bottom[1] - bottom[0] > EPSILON or top[1] - top[0] > EPSILON:
+                intervals.append((bottom, top))
+        slabs.append(intervals)
+    return slabs
+
+
+def combine_rings(rings1, rings2):
+    """
+    Intersects the first polygon extruded along Y with the second extruded along X, the same way
+    combine_faces does with the letters' faces
+    :param rings1: The first letter's rings, from flatten_outlines, in the XZ plane
+    :param rings2: The second letter's rings, in the YZ plane (their x is the combined letter's y)
+    :return: A list of Cells. Cells stacked directly on top of each other are merged where their
+    sides carry straight on
+    """
+    heights1 = [z for ring in rings1 for _, z in ring]
+    heights2 = [z for ring in rings2 for _, z in ring]
+    if not heights1 or not heights2:
+        return []
+    z_min = max(min(heights1), min(heights2))
+    z_max = min(max(heights1), max(heights2))
+
+    zs = []
+    for z in sorted(set(heights1 + heights2)):
+        if z_min <= z <= z_max and (not zs or z - zs[-1] > EPSILON):
+            zs.append(z)
+    slabs1 = slice_slabs(rings1, zs)
+    slabs2 = slice_slabs(rings2, zs)
+
+    cells = []
+    # The cells from the slab below whose top could still be extended, by their top intervals
+    open_cells = {}
+    for z0, z1, intervals1, intervals2 in zip(zs, zs[1:], slabs1, slabs2):
+        next_open_cells = {}
+        for x_bottom, x_top in intervals1:
+            for y_bottom, y_top in intervals2:
+                cell = Cell(z0, z1, x_bottom, x_top, y_bottom, y_top)
+                below = open_cells.get(_key(x_bottom, y_bottom))
+                if below is not None and _continues(cells[below], cell):
+                    cells[below] = cells[below]._replace(z1=z1, x_top=x_top, y_top=y_top)
+                    index = below
+                else:
+                    index = len(cells)
+                    cells.append(cell)
+                next_open_cells[_key(x_top, y_top)] = index
+        open_cells = next_open_cells
+    return cells
+
+
+def _key(x_interval, y_interval):
+    # Rounded so ends computed from either side of a slab boundary still match
+    return tuple(round(v, 6) for v in x_interval + y_interval)
+
+
+def _continues(below, cell):
+    """
+    Whether the cell's four sides are the same planes as the sides of the cell below it
+    """
+    for side in range(2):
+        for bottom, top, below_bottom, below_top in ((cell.x_bottom, cell.x_top, below.x_bottom, below.x_top),
+                                                     (cell.y_bottom, cell.y_top, below.y_bottom, below.y_top)):
+            # Extend the side below up to the top of the cell, and check it lands in the same place
+            slope = (below_top[side] - below_bottom[side]) / (below.z1 - below.z0)
+            if abs(below_top[side] + slope * (cell.z1 - cell.z0) - top[side]) > 1e-6:
+                return False
+    return True
+
+
+def cell_volume(cell):
+    # The cross section's area is the product of two linear widths, so Simpson's rule is exact
+    def area(x_interval, y_interval):
+        return (x_interval[1] - x_interval[0]) * (y_interval[1] - y_interval[0])
+
+    x_mid = tuple((b + t) / 2 for b, t in zip(cell.x_bottom, cell.x_top))
+    y_mid = tuple((b + t) / 2 for b, t in zip(cell.y_bottom, cell.y_top))
+    return (cell.z1 - cell.z0) / 6 * (area(cell.x_bottom, cell.y_bottom) + 4 * area(x_mid, y_mid) +
+                                     area(cell.x_top, cell.y_top))
+
+
+def combine_outlines(outlines1, outlines2, height_mm, tolerance=DEFAULT_CURVE_TOLERANCE):
+    """
+    The polygon equivalent of combiner.combine_faces, taking the letters' outlines rather than their faces
+    :param outlines1: The first letter's outlines, as returned by FaceFactory.create_outlines
+    :return: The combined letter, as a TopoDS_Compound of its solids
+    """
+    cells = combine_rings(flatten_outlines(outlines1, height_mm, tolerance),
+                          flatten_outlines(outlines2, height_mm, tolerance))
+    return build_cells(cells)
+
+
+def build_cells(cells):
+    """
+    Builds each cell and fuses them into one solid per connected piece of the letter, without any
+    faces left inside where the cells touched
+    :return: A TopoDS_Compound of the solids, like combiner.combine_faces returns
+    """
+    from OCC.Core.BOPAlgo import BOPAlgo_GlueShift
+    from OCC.Core.BRep import BRep_Builder
+    from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Fuse
+    from OCC.Core.ShapeUpgrade import ShapeUpgrade_UnifySameDomain
+    from OCC.Core.TopoDS import TopoDS_Compound
+    from OCC.Core.TopTools import TopTools_ListOfShape
+    from OCC.Extend.TopologyUtils import TopologyExplorer
+
+    solids = [_build_cell(cell) for cell in cells]
+    if len(solids) > 1:
+        with profiling.span("fuse_cells", cells=len(solids)):
+            arguments = TopTools_ListOfShape()
+            arguments.Append(solids[0])
+            tools = TopTools_ListOfShape()
+            for solid in solids[1:]:
+                tools.Append(solid)
+            fuse = BRepAlgoAPI_Fuse()
+            fuse.SetArguments(arguments)
+            fuse.SetTools(tools)
+            # Cells only ever touch where a slab boundary cuts them, along faces that partly coincide,
+            # which is what the shift glue is for. It skips intersecting the rest of the faces
+            fuse.SetGlue(BOPAlgo_GlueShift)
+            fuse.Build()
+            assert fuse.IsDone()
+
+            # Merges the faces and edges the slab boundaries split back together
+            unify = ShapeUpgrade_UnifySameDomain(fuse.Shape(), True, True, False)
+            unify.Build()
+            solids = list(TopologyExplorer(unify.Shape()).solids())
+
+    compound = TopoDS_Compound()
+    builder = BRep_Builder()
+    builder.MakeCompound(compound)
+    for solid in solids:
+        builder.Add(compound, solid)
+    return compound
+
+
+def _build_cell(cell):
+    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeBox
+    from OCC.Core.gp import gp_Pnt
+
+    if cell.x_bottom == cell.x_top and cell.y_bottom == cell.y_top:
+        # Straight up and down, which most cells of letters with straight edges are
+        return BRepPrimAPI_MakeBox(gp_Pnt(cell.x_bottom[0], cell.y_bottom[0], cell.z0),
+                                   gp_Pnt(cell.x_bottom[1], cell.y_bottom[1], cell.z1)).Solid()
+    return _build_hexahedron(cell)
+
+
+def _build_hexahedron(cell):
+    from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_MakeFace, BRepBuilderAPI_MakePolygon, BRepBuilderAPI_Sewing
+    from OCC.Core.ShapeFix import ShapeFix_Solid
+    from OCC.Core.gp import gp_Pnt
+    from OCC.Extend.TopologyUtils import TopologyExplorer
+
+    corners = []
+    for z, x, y in ((cell.z0, cell.x_bottom, cell.y_bottom), (cell.z1, cell.x_top, cell.y_top)):
+        corners += [(x[0], y[0], z), (x[1], y[0], z), (x[1], y[1], z), (x[0], y[1], z)]
+    faces = [(0, 1, 2, 3), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+
+    sewing = BRepBuilderAPI_Sewing(1e-6)
+    for face in faces:
+        # Intervals that shrink to nothing at the top or bottom of a slab leave some corners on top of
+        # each other. Faces left with fewer than 3 corners are just edges, and aren't needed
+        points = []
+        for index in face:
+            if not any(_same_corner(corners[index], p) for p in points):
+                points.append(corners[index])
+        if len(points) < 3:
+            continue
+
+        polygon = BRepBuilderAPI_MakePolygon()
+        for point in points:
+            polygon.Add(gp_Pnt(*point))
+        polygon.Close()
+        sewing.Add(BRepBuilderAPI_MakeFace(polygon.Wire(), True).Face())
+    sewing.Perform()
+
+    shells = list(TopologyExplorer(sewing.SewedShape()).shells())
+    assert len(shells) == 1
+    # Also orients the faces outwards
+    return ShapeFix_Solid().SolidFromShell(shells[0])
+
+
+def _same_corner(p1, p2):
+    return all(abs(a - b) < 1e-6 for a, b in zip(p1, p2))
@@ -0,0 +1,91 @@
+import unittest
+import math
+import pathlib
+from shapely.geometry import LineString, Polygon
+from face_factory import FaceFactory
+from polygon_combiner import cell_volume, combine_rings, flatten_outlines, has_curves
+
+
+def square_outline(x, y, size):
+    corners = [(x, y), (x + size, y), (x + size, y + size), (x, y + size)]
+    return [list(zip(corners, corners[1:] + corners[:1]))]
+
+
+def volume(cells):
+    return sum(cell_volume(c) for c in cells)
+
+
+def slice_length(polygon, z):
+    return polygon.intersection(LineString([(-1e3, z), (1e3, z)])).length
+
+
+class TestPolygonCombiner(unittest.TestCase):
+    def test_squares_make_a_cube(self):
+        rings = flatten_outlines([square_outline(0, 0, 1)], 10)
+        cells = combine_rings(rings, rings)
+        self.assertEqual(1, len(cells))
+        self.assertAlmostEqual(1000, volume(cells))
+
+    def test_square_and_triangle(self):
+        square = flatten_outlines([square_outline(0, 0, 1)], 1)
+        triangle = [[(0, 0), (1, 0), (0.5, 1)]]
+        cells = combine_rings(square, triangle)
+        # Every slice is 1 wide one way and 1 - z the other
+        self.assertAlmostEqual(0.5, volume(cells))
+        self.assertAlmostEqual(0.5, volume(combine_rings(triangle, square)))
+        # Two triangles make a pyramid
+        self.assertAlmostEqual(1 / 3, volume(combine_rings(triangle, triangle)))
+
+    def test_holes(self):
+        with_hole = flatten_outlines([square_outline(0, 0, 1) + square_outline(0.25, 0.25, 0.5)], 1)
+        square = flatten_outlines([square_outline(0, 0, 1)], 1)
+        self.assertAlmostEqual(0.75, volume(combine_rings(with_hole, square)))
+        # Half the height is 1 x 1, and the other half 0.5 x 0.5
+        self.assertAlmostEqual(0.5 + 0.5 * 0.25, volume(combine_rings(with_hole, with_hole)))
+
+    def test_stacked_cells_merged(self):
+        square = flatten_outlines([square_outline(0, 0, 1)], 1)
+        # The extra vertex cuts the slabs at 0.5, but the cells either side of it carry straight on
+        split_square = [[(0, 0), (1, 0), (1, 0.5), (1, 1), (0, 1)]]
+        cells = combine_rings(square, split_square)
+        self.assertEqual(1, len(cells))
+        self.assertEqual((0, 1), (cells[0].z0, cells[0].z1))
+
+        step = [[(0, 0), (1, 0), (1, 0.5), (0.5, 0.5), (0.5, 1), (0, 1)]]
+        cells = combine_rings(square, step)
+        self.assertEqual(2, len(cells))
+        self.assertAlmostEqual(0.75, volume(cells))
+
+    def test_flatten_curves(self):
+        # A quarter circle as a cubic Bezier
+        k = 4 / 3 * (math.sqrt(2) - 1)
+        outline = [[[(1, 0), (1, k), (k, 1), (0, 1)], [(0, 1), (0, 0)], [(0, 0), (1, 0)]]]
+        self.assertTrue(has_curves([outline]))
+        self.assertFalse(has_curves([square_outline(0, 0, 1)]))
+        for tolerance in (0.01, 0.001):
+            ring = flatten_outlines([outline], 1, tolerance)[0]
+            self.assertNotEqual(ring[0], ring[-1])
+            self.assertAlmostEqual(math.pi / 4, Polygon(ring).area, delta=0.01)
+
+    def test_glyphs_match_sliced_polygons(self):
+        face_images_dir = pathlib.Path(__file__).parent / "test_data"
+        rings = {c: flatten_outlines(FaceFactory.parse_svg(face_images_dir / "{}.svg".format(c)), 50)
+                 for c in ("H", "E", "4")}
+        self.assertFalse(has_curves(FaceFactory.parse_svg(face_images_dir / "H.svg")))
+
+        for c1, c2 in (("H", "E"), ("E", "4"), ("4", "H")):
+            # Simpson's rule on each slab is exact, so slicing the polygons with shapely at the same
+            # heights must give the same volume
+            polygon1 = Polygon(rings[c1][0], rings[c1][1:])
+            polygon2 = Polygon(rings[c2][0], rings[c2][1:])
+            zs = sorted({z for ring in rings[c1] + rings[c2] for _, z in ring})
+            expected = 0
+            for z0, z1 in zip(zs, zs[1:]):
+                samples = [z0 + 1e-9, (z0 + z1) / 2, z1 - 1e-9]
+                areas = [slice_length(polygon1, z) * slice_length(polygon2, z) for z in samples]
+                expected += (z1 - z0) / 6 * (areas[0] + 4 * areas[1] + areas[2])
+            self.assertAlmostEqual(expected, volume(combine_rings(rings[c1], rings[c2])), delta=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
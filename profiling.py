@@ -0,0 +1,218 @@
+"""
+Lightweight instrumentation for the generation pipeline. Code marks out the stages it runs with
+nested spans, and counts interesting events with counters:
+
+    with profiling.span("split_compound", cells=4):
+        ...
+    profiling.count("booleans")
+
+Nothing is recorded until enable() is called (main.py's --profile). Until then span() hands back
+one shared object whose __enter__ and __exit__ do nothing, and count() returns straight away, so
+leaving the instrumentation in costs a function call and a global lookup.
+
+Once enabled, the recorded spans and counters can be written as a JSON trace (the spans, plus the
+total time and count for each span name) and in the Chrome trace event format, which can be opened
+in chrome://tracing or https://ui.perfetto.dev. Only the process that called enable() is profiled,
+so spans inside worker processes (eg. with -j) aren't recorded, only the time spent waiting on them.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+_profiler = None
+
+
+class _NullSpan():
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span():
+    __slots__ = ("_profiler", "name", "args", "start", "duration", "depth", "thread_id")
+
+    def __init__(self, profiler, name, args):
+        self._profiler = profiler
+        self.name = name
+        self.args = args
+        self.start = None
+        self.duration = None
+        self.depth = None
+        self.thread_id = None
+
+    def __enter__(self):
+        self._profiler._push(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.start
+        self._profiler._pop(self)
+        return False
+
+
+class Profiler():
+    """
+    Collects the spans and counters. Spans are nested per thread
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._spans = []
+        self._counters = Counter()
+        self._origin = time.perf_counter()
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def spans(self):
+        """
+        :return: The finished spans, in the order they finished
+        """
+        with self._lock:
+            return list(self._spans)
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def totals(self):
+        """
+        :return: An OrderedDict of span name to its count and total seconds, slowest first
+        """
+        totals = {}
+        for s in self.spans():
+            total = totals.setdefault(s.name, {"count": 0, "seconds": 0.0})
+            total["count"] += 1
+            total["seconds"] += s.duration
+        return OrderedDict(sorted(totals.items(), key=lambda item: -item[1]["seconds"]))
+
+    def to_json(self):
+        return {
+            "spans": [{"name": s.name, "start": s.start - self._origin, "duration": s.duration, "depth": s.depth,
+                       "thread": s.thread_id, "args": s.args} for s in self.spans()],
+            "counters": self.counters(),
+            "totals": self.totals(),
+        }
+
+    def to_chrome_trace(self):
+        """
+        :return: The spans as complete ("X") events, and the final counter values as one counter
+        ("C") event, in the Chrome trace event format. Times are in microseconds
+        """
+        pid = os.getpid()
+        events = []
+        end = 0.0
+        for s in self.spans():
+            start_us = (s.start - self._origin) * 1e6
+            events.append({"name": s.name, "ph": "X", "ts": start_us, "dur": s.duration * 1e6, "pid": pid,
+                           "tid": s.thread_id, "args": s.args})
+            end = max(end, start_us + s.duration * 1e6)
+        counters = self.counters()
+        if counters:
+            events.append({"name": "counters", "ph": "C", "ts": end, "pid": pid, "args": counters})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def format_summary(self, limit=15):
+        """
+        :return: A table of the slowest span names and the counters, to print
+        """
+        lines = ["{:<24} {:>8} {:>12}".format("span", "count", "seconds")]
+        for name, total in list(self.totals().items())[:limit]:
+            lines.append("{:<24} {:>8} {:>12.3f}".format(name, total["count"], total["seconds"]))
+        for name, value in sorted(self.counters().items()):
+            lines.append("{:<24} {:>8}".format(name, value))
+        return "\n".join(lines)
+
+    def write(self, json_path=None, chrome_trace_path=None):
+        for path, data in ((json_path, self.to_json), (chrome_trace_path, self.to_chrome_trace)):
+            if path is None:
+                continue
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(str(path), "w") as f:
+                json.dump(data(), f, indent=1)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _push(self, span):
+        stack = self._stack()
+        span.depth = len(stack)
+        span.thread_id = threading.get_ident()
+        stack.append(span)
+
+    def _pop(self, span):
+        stack = self._stack()
+        # Spans are context managers, so they always finish innermost first
+        assert stack and stack[-1] is span
+        stack.pop()
+        with self._lock:
+            self._spans.append(span)
+
+
+def chrome_trace_path(json_path):
+    """
+    :return: Where main.py writes the Chrome trace for a JSON trace written to json_path
+    """
+    json_path = Path(json_path)
+    return json_path.with_name(json_path.stem + ".chrome.json")
+
+
+def span(name, **args):
+    """
+    A context manager that records how long its body takes, nested in any span it's opened in
+    :param args: Extra details to keep with the span, eg. which letter it's for. Must be JSON serializable
+    """
+    if _profiler is None:
+        return _NULL_SPAN
+    return _profiler.span(name, **args)
+
+
+def count(name, n=1):
+    if _profiler is None:
+        return
+    _profiler.count(name, n)
+
+
+def enable():
+    """
+    Starts recording, if it isn't already
+    :return: The Profiler that's recording
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def disable():
+    """
+    Stops recording
+    :return: The Profiler that was recording, or None
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def is_enabled():
+    return _profiler is not None
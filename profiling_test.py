@@ -0,0 +1,89 @@
+import unittest
+import json
+import pathlib
+import tempfile
+import profiling
+
+
+class TestProfiling(unittest.TestCase):
+    def tearDown(self):
+        profiling.disable()
+
+    def test_disabled_records_nothing(self):
+        self.assertFalse(profiling.is_enabled())
+        with profiling.span("outer") as s:
+            profiling.count("booleans")
+        self.assertIs(profiling.span("other"), s)
+        self.assertIsNone(profiling.disable())
+
+    def test_nested_spans(self):
+        profiler = profiling.enable()
+        self.assertIs(profiler, profiling.enable())
+        with profiling.span("outer", word="HE"):
+            with profiling.span("inner"):
+                pass
+            with profiling.span("inner"):
+                pass
+
+        spans = profiler.spans()
+        self.assertEqual(["inner", "inner", "outer"], [s.name for s in spans])
+        self.assertEqual([1, 1, 0], [s.depth for s in spans])
+        self.assertEqual({"word": "HE"}, spans[2].args)
+        outer = spans[2]
+        for inner in spans[:2]:
+            self.assertGreaterEqual(inner.start, outer.start)
+            self.assertLessEqual(inner.start + inner.duration, outer.start + outer.duration)
+        self.assertEqual({"count": 2, "seconds": spans[0].duration + spans[1].duration}, profiler.totals()["inner"])
+
+    def test_span_recorded_on_exception(self):
+        profiler = profiling.enable()
+        with self.assertRaises(ValueError):
+            with profiling.span("failing"):
+                raise ValueError()
+        self.assertEqual(["failing"], [s.name for s in profiler.spans()])
+        with profiling.span("after"):
+            pass
+        self.assertEqual(0, profiler.spans()[-1].depth)
+
+    def test_counters(self):
+        profiler = profiling.enable()
+        profiling.count("booleans")
+        profiling.count("booleans")
+        profiling.count("split_cells", 12)
+        self.assertEqual({"booleans": 2, "split_cells": 12}, profiler.counters())
+
+    def test_chrome_trace(self):
+        profiler = profiling.enable()
+        with profiling.span("outer"):
+            with profiling.span("inner", letter="H"):
+                pass
+        profiling.count("booleans")
+
+        events = profiler.to_chrome_trace()["traceEvents"]
+        complete = [e for e in events if e["ph"] == "X"]
+        self.assertEqual(["inner", "outer"], [e["name"] for e in complete])
+        self.assertEqual({"letter": "H"}, complete[0]["args"])
+        self.assertLessEqual(complete[1]["ts"], complete[0]["ts"])
+        counter_events = [e for e in events if e["ph"] == "C"]
+        self.assertEqual([{"booleans": 1}], [e["args"] for e in counter_events])
+
+    def test_write(self):
+        profiler = profiling.enable()
+        with profiling.span("outer"):
+            profiling.count("booleans")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = pathlib.Path(tmp_dir, "profile.json")
+            chrome_trace_path = profiling.chrome_trace_path(json_path)
+            self.assertEqual(pathlib.Path(tmp_dir, "profile.chrome.json"), chrome_trace_path)
+            profiler.write(json_path, chrome_trace_path)
+
+            trace = json.loads(json_path.read_text())
+            self.assertEqual(["outer"], [s["name"] for s in trace["spans"]])
+            self.assertEqual({"booleans": 1}, trace["counters"])
+            self.assertEqual(1, trace["totals"]["outer"]["count"])
+            self.assertIn("traceEvents", json.loads(chrome_trace_path.read_text()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+"""
+Long-running generation server. Keeps worker processes alive so pythonocc is imported, and glyphs
+parsed, once per worker rather than once per job. Each worker also keeps its own FaceFactory and
+combined letter pair cache warm between jobs. Workers share the cache directory, if one is given.
+
+Usage: python server.py -o output_directory [--port 8642] [--workers 4] [--cache_dir cache_directory] [--font font]
+
+POST /jobs with a JSON body like
+    {"word1": "HE", "word2": "TV", "height_mm": 50, "formats": ["stl"],
+     "options": {"parallel": false, "fuzzy_value": 0.0, "use_obb": false, "glue": "off"},
+     "return": "paths"}
+responds with {"paths": [...], "timings": {...}}. With "return": "bytes" the files are sent back
+base64 encoded as {"files": {"combined_shape_1.stl": "...", ...}, "timings": {...}} and not kept.
+Only word1, word2 and height_mm are required.
+
+GET /stats responds with how many jobs have run and failed, and the time spent on them
+"""
+import argparse
+import base64
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from boolean_options import BooleanOptions
+from main import DEFAULT_FONT
+
+logger = logging.getLogger("TFT")
+
+DEFAULT_PORT = 8642
+DEFAULT_WORKERS = 2
+DEFAULT_FORMATS = ("stl", "step")
+# The JSON types each boolean option can be given as
+OPTION_TYPES = {"parallel": bool, "fuzzy_value": (int, float), "use_obb": bool, "glue": str}
+RETURN_MODES = ("paths", "bytes")
+
+
+def parse_job(payload):
+    """
+    Checks a job sent to the server and fills in the defaults
+    :param payload: The decoded JSON body of the request
+    :return: The job as a dict
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("The job must be a JSON object")
+    for name in ("word1", "word2", "height_mm"):
+        if name not in payload:
+            raise ValueError("The job is missing '{}'".format(name))
+
+    word1, word2 = payload["word1"], payload["word2"]
+    if not isinstance(word1, str) or not isinstance(word2, str) or not word1 or len(word1) != len(word2):
+        raise ValueError("word1 and word2 must be non-empty strings of the same length")
+    # The words name the job's output directory, so they mustn't contain path separators or dots
+    if not word1.isalnum() or not word2.isalnum():
+        raise ValueError("word1 and word2 must only contain letters and numbers")
+
+    height_mm = payload["height_mm"]
+    if isinstance(height_mm, bool) or not isinstance(height_mm, (int, float)) or height_mm <= 0:
+        raise ValueError("height_mm must be a positive number")
+
+    formats = payload.get("formats", list(DEFAULT_FORMATS))
+    if not isinstance(formats, list) or not formats:
+        raise ValueError("formats must be a non-empty list")
+
+    options = payload.get("options", {})
+    if not isinstance(options, dict):
+        raise ValueError("options must be a JSON object")
+    for name, value in options.items():
+        if name not in OPTION_TYPES:
+            raise ValueError("Unknown option: '{}'. Please use one of {}".format(name, list(OPTION_TYPES)))
+        if not isinstance(value, OPTION_TYPES[name]) or (name == "fuzzy_value" and isinstance(value, bool)):
+            raise ValueError("Invalid value for option '{}': {}".format(name, json.dumps(value)))
+    # Checks the values themselves (eg. the glue mode), so a bad option is rejected here rather than in a worker
+    BooleanOptions(**options)
+
+    return_mode = payload.get("return", "paths")
+    if return_mode not in RETURN_MODES:
+        raise ValueError("Invalid return mode: '{}'. Please use one of {}".format(return_mode, list(RETURN_MODES)))
+
+    return {
+        "word1": word1,
+        "word2": word2,
+        "height_mm": float(height_mm),
+        "formats": formats,
+        "options": options,
+        "return": return_mode,
+    }
+
+
+# Set up once in each worker process by _init_worker, and kept for as long as the process lives
+_worker_state = {}
+
+
+def _init_worker(font_path, cache_dir):
+    from cache import make_caches
+    from face_factory import FaceFactory
+
+    face_cache, _worker_state["pair_cache"] = make_caches(cache_dir)
+    _worker_state["face_factory"] = FaceFactory(Path(font_path), cache=face_cache)
+
+
+def _run_job(job, output_dir):
+    from export import ExportPipeline
+    from main import generate
+
+    for f in job["formats"]:
+        if f not in ExportPipeline.FORMATS:
+            raise ValueError("Unsupported export format: '{}'. Please use one of {}".format(f, ExportPipeline.FORMATS))
+    options = BooleanOptions(**job["options"])
+
+    if job["return"] == "paths":
+        _, timings = generate(job["word1"], job["word2"], job["height_mm"], output_dir, _worker_state["face_factory"],
+                              _worker_state["pair_cache"], boolean_options=options, formats=job["formats"])
+        return {"paths": sorted(str(p) for p in Path(output_dir).iterdir()), "timings": timings}
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        _, timings = generate(job["word1"], job["word2"], job["height_mm"], tmp_dir, _worker_state["face_factory"],
+                              _worker_state["pair_cache"], boolean_options=options, formats=job["formats"])
+        files = {p.name: base64.b64encode(p.read_bytes()).decode("ascii") for p in sorted(Path(tmp_dir).iterdir())}
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {"files": files, "timings": timings}
+
+
+class GenerationService():
+    """
+    Runs jobs on a pool of worker processes, each with its own warm FaceFactory and pair cache
+    """
+
+    def __init__(self, output_dir, font_path, cache_dir=None, workers=DEFAULT_WORKERS):
+        self._output_dir = Path(output_dir)
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(str(font_path), cache_dir))
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+
+    def run(self, job):
+        """
+        Runs a job returned by parse_job and blocks until it's finished
+        """
+        job_dir = self._output_dir / "{}_{}_{}".format(job["word1"], job["word2"], uuid.uuid4().hex[:8])
+        start = time.perf_counter()
+        try:
+            result = self._executor.submit(_run_job, job, str(job_dir)).result()
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        with self._lock:
+            self._completed += 1
+            self._busy_seconds += time.perf_counter() - start
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"completed": self._completed, "failed": self._failed, "busy_seconds": self._busy_seconds}
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/stats":
+            self._send_json(404, {"error": "Not found"})
+            return
+        self._send_json(200, self.server.service.stats())
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = parse_job(json.loads(self.rfile.read(length).decode("utf-8")))
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            result = self.server.service.run(job)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            logger.exception("Job failed: {}".format(job))
+            self._send_json(500, {"error": "{}: {}".format(type(e).__name__, e)})
+            return
+        self._send_json(200, result)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s" % (self.address_string(), format % args))
+
+
+def serve(output_dir, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, cache_dir=None,
+          font_path=DEFAULT_FONT, host="127.0.0.1"):
+    service = GenerationService(output_dir, font_path, cache_dir, workers)
+    server = ThreadingHTTPServer((host, port), _RequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    logger.info("Serving on http://{}:{} with {} workers".format(host, port, workers))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve Two-Faced Type generation jobs over HTTP")
+    parser.add_argument('-o', '--output_dir', metavar='output_directory', type=str, required=True,
+                        help="The directory to write each job's files to, in their own subdirectory")
+    parser.add_argument('--host', type=str, default="127.0.0.1", help="The address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="The port to listen on")
+    parser.add_argument('-w', '--workers', metavar='num_processes', type=int, default=DEFAULT_WORKERS,
+                        help="The number of jobs to run at once, each in its own process")
+    parser.add_argument('--cache_dir', metavar='cache_directory', type=str, default=None,
+                        help="A directory for the workers to share cached letter faces and combined letter pairs in")
+    parser.add_argument('--font', metavar='font', type=str, default=str(DEFAULT_FONT),
+                        help="A directory of <char>.svg files, or a font pack built from one with font_pack.py")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.output_dir, args.port, args.workers, args.cache_dir, args.font, host=args.host)
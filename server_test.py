@@ -0,0 +1,89 @@
+import base64
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from client import Client, ServerError
+from server import parse_job, _RequestHandler
+
+
+class FakeService():
+    def __init__(self):
+        self.jobs = []
+
+    def run(self, job):
+        self.jobs.append(job)
+        if job["return"] == "bytes":
+            return {"files": {"combined_shape_1.stl": base64.b64encode(b"solid").decode("ascii")}, "timings": {}}
+        return {"paths": ["/tmp/combined_shape_1.stl"], "timings": {"combine": 1.0}}
+
+    def stats(self):
+        return {"completed": len(self.jobs), "failed": 0, "busy_seconds": 0.0}
+
+
+class TestParseJob(unittest.TestCase):
+    def test_defaults(self):
+        job = parse_job({"word1": "HE", "word2": "TV", "height_mm": 50})
+        self.assertEqual(job, {"word1": "HE", "word2": "TV", "height_mm": 50.0, "formats": ["stl", "step"],
+                               "options": {}, "return": "paths"})
+
+    def test_options(self):
+        options = {"parallel": True, "fuzzy_value": 0.01, "use_obb": True, "glue": "shift"}
+        job = parse_job({"word1": "HE", "word2": "TV", "height_mm": 50, "options": options})
+        self.assertEqual(options, job["options"])
+
+    def test_invalid_jobs(self):
+        invalid_jobs = [
+            [],
+            {"word1": "HE", "word2": "TV"},
+            {"word1": "HEY", "word2": "TV", "height_mm": 50},
+            {"word1": "..", "word2": "TV", "height_mm": 50},
+            {"word1": "H/", "word2": "TV", "height_mm": 50},
+            {"word1": "HE", "word2": "TV", "height_mm": -1},
+            {"word1": "HE", "word2": "TV", "height_mm": True},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "formats": []},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "options": {"speed": "fast"}},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "options": {"parallel": "yes"}},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "options": {"fuzzy_value": "0.1"}},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "options": {"fuzzy_value": True}},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "options": {"fuzzy_value": -1}},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "options": {"glue": "sticky"}},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "options": {"glue": ["off"]}},
+            {"word1": "HE", "word2": "TV", "height_mm": 50, "return": "email"},
+        ]
+        for payload in invalid_jobs:
+            with self.assertRaises(ValueError):
+                parse_job(payload)
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeService()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RequestHandler)
+        self.server.service = self.service
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.client = Client("http://127.0.0.1:{}".format(self.server.server_address[1]), timeout=10)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_generate_paths(self):
+        result = self.client.generate("HE", "TV", 50, formats=["stl"], options={"glue": "shift"})
+        self.assertEqual(result["paths"], ["/tmp/combined_shape_1.stl"])
+        self.assertEqual(self.service.jobs[0]["options"], {"glue": "shift"})
+        self.assertEqual(self.client.stats()["completed"], 1)
+
+    def test_generate_bytes(self):
+        result = self.client.generate("HE", "TV", 50, return_bytes=True)
+        self.assertEqual(result["files"], {"combined_shape_1.stl": b"solid"})
+
+    def test_invalid_job(self):
+        with self.assertRaises(ServerError):
+            self.client.generate("HEY", "TV", 50)
+        self.assertEqual(self.service.jobs, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
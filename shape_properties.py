@@ -0,0 +1,66 @@
+from OCC.Core.BRepGProp import brepgprop_VolumeProperties
+from OCC.Core.GProp import GProp_GProps
+from OCC.Core.gp import gp_Pnt
+from OCC.Extend.TopologyUtils import TopologyExplorer
+from OCCUtils.base import GlobalProperties
+from bounding_box import BoundingBox
+
+
+class ShapeProperties():
+    """
+    Geometric properties of a shape. Each one is computed the first time it's needed and then kept,
+    so the same record can be shared by everything that looks at the shape. Uses __slots__ because
+    a letter can split into thousands of cells, each with its own record
+    """
+
+    __slots__ = ("_shape", "_bbox", "_volume", "_centroid", "_face_count")
+
+    def __init__(self, shape):
+        self._shape = shape
+        self._bbox = None
+        self._volume = None
+        self._centroid = None
+        self._face_count = None
+
+    def shape(self):
+        return self._shape
+
+    def bbox(self):
+        if self._bbox is None:
+            props = GlobalProperties(self._shape)
+            x1, y1, z1, x2, y2, z2 = props.bbox()
+            xmin = min(x1, x2)
+            xmax = max(x1, x2)
+            ymin = min(y1, y2)
+            ymax = max(y1, y2)
+            zmin = min(z1, z2)
+            zmax = max(z1, z2)
+            self._bbox = BoundingBox(xmin, ymin, zmin, xmax, ymax, zmax)
+        return self._bbox
+
+    def volume(self):
+        if self._volume is None:
+            self._compute_volume_properties()
+        return self._volume
+
+    def centroid(self):
+        """
+        The centre of mass, as a gp_Pnt
+        """
+        if self._centroid is None:
+            self._compute_volume_properties()
+        return gp_Pnt(*self._centroid)
+
+    def face_count(self):
+        if self._face_count is None:
+            self._face_count = TopologyExplorer(self._shape).number_of_faces()
+        return self._face_count
+
+    def _compute_volume_properties(self):
+        # The volume and centroid come from the same integration, so compute them together
+        props = GProp_GProps()
+        brepgprop_VolumeProperties(self._shape, props)
+        self._volume = props.Mass()
+        # Kept as plain floats so the record can be copied and pickled
+        com = props.CentreOfMass()
+        self._centroid = (com.X(), com.Y(), com.Z())
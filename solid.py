@@ -1,7 +1,5 @@
 from OCC.Core.TopoDS import TopoDS_Solid
-from OCCUtils.Common import GpropsFromShape
-from OCCUtils.base import GlobalProperties
-from bounding_box import BoundingBox
+from shape_properties import ShapeProperties
 from util import distance
 
 
@@ -11,37 +9,35 @@ class Solid():
     depend on memory locations
     """
 
-    def __init__(self, solid):
+    __slots__ = ("_solid", "_props")
+
+    def __init__(self, solid, props=None):
+        """
+        :param props: The solid's ShapeProperties, if something else already has them
+        """
         assert isinstance(solid, TopoDS_Solid)
 
         self._solid = solid
-
-        props = GlobalProperties(solid)
-        x1, y1, z1, x2, y2, z2 = props.bbox()
-        xmin = min(x1, x2)
-        xmax = max(x1, x2)
-        ymin = min(y1, y2)
-        ymax = max(y1, y2)
-        zmin = min(z1, z2)
-        zmax = max(z1, z2)
-        self._bbox = BoundingBox(xmin, ymin, zmin, xmax, ymax, zmax)
+        self._props = props if props is not None else ShapeProperties(solid)
 
     def bbox(self):
-        return self._bbox
+        return self._props.bbox()
 
     def solid(self):
         return self._solid
 
+    def properties(self):
+        return self._props
+
     def __hash__(self):
         # TODO: remove this function? Or force to not be used?
-        return self._bbox.__hash__()
+        return self.bbox().__hash__()
 
     def __eq__(self, other):
-        self_com = GpropsFromShape(self._solid).volume().CentreOfMass()
-        other_com = GpropsFromShape(other._solid).volume().CentreOfMass()
         # Not ideal for equality, but we need to handle minor deviations
         # TODO: does this tolerance really need to be so big?
-        return self._bbox.eq_within_tolerance(other._bbox, tolerance=0.1) and distance(self_com, other_com) < 0.1
+        return self.bbox().eq_within_tolerance(other.bbox(), tolerance=0.1) and \
+               distance(self._props.centroid(), other.properties().centroid()) < 0.1
 
     def __ne__(self, other):
         return not self.__eq__(other)
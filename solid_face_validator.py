@@ -1,14 +1,17 @@
 from OCC.Core.TopoDS import TopoDS_Solid
 from OCCUtils.Common import project_point_on_plane, normal_vector_from_plane, intersect_shape_by_line, assert_isdone
-import itertools
-from OCCUtils.solid import Solid as OCCUtilsSolid
 from collections import defaultdict
 from OCC.Core.IntCurvesFace import IntCurvesFace_ShapeIntersector
-from util import split_compound, point_in_solid
-from OCCUtils.base import GlobalProperties
+from util import split_compound, point_in_solid, distance
+from shape_properties import ShapeProperties
 from constants import *
 from solid import Solid
-import math
+from bounding_box_array import BoundingBoxArray
+import numpy as np
+import profiling
+
+# Upper bound for TopoDS_Shape.HashCode
+HASH_UPPER_BOUND = 2147483647
 
 
 class SolidFaceValidator():
@@ -16,52 +19,122 @@ class SolidFaceValidator():
     Handles checking a solid still projects to / represents the desired faces
     """
 
-    def __init__(self, compound):
-        solids = split_compound(compound)
+    def __init__(self, compound, solids=None, properties=None):
+        """
+        :param compound: The overall shape
+        :param solids: The solids split_compound produces for the compound. Computed if not given. Passing the
+        same solids the caller removes lets remove_if_valid find them by identity rather than by geometry
+        :param properties: The ShapeProperties of each solid, if the caller already has them
+        """
+        if solids is None:
+            solids = split_compound(compound)
         self._compound = compound
-        self._xz_intersections = self.get_intersections_for_face(solids, PL_XZ)
-        self._yz_intersections = self.get_intersections_for_face(solids, PL_YZ)
 
-    def remove_if_valid(self, solid):
+        # Each solid's id is its index in self._solids
+        # Both faces are checked against the same solids, so they can share the loaded intersectors
+        intersector = LineSolidIntersector(solids, properties)
+        self._solids = intersector.wrapped_solids()
+        self._bboxes = BoundingBoxArray.from_bboxes([s.bbox() for s in self._solids])
+        self._centres = self._get_centres(self._solids)
+        line_ids = self._get_intersected_ids_for_face(self._centres, PL_XZ, intersector) + \
+                   self._get_intersected_ids_for_face(self._centres, PL_YZ, intersector)
+
+        # How many of the remaining solids each line intersects, and an inverted index of which
+        # lines intersect each solid. Removing a solid only has to update its own lines
+        self._line_counts = [len(ids) for ids in line_ids]
+        self._lines_by_solid = [[] for _ in solids]
+        for line_index, ids in enumerate(line_ids):
+            for solid_id in ids:
+                self._lines_by_solid[solid_id].append(line_index)
+        self._removed = set()
+
+        self._ids_by_hash = defaultdict(list)
+        for solid_id, s in enumerate(solids):
+            self._ids_by_hash[s.HashCode(HASH_UPPER_BOUND)].append(solid_id)
+
+    def remove_if_valid(self, solid, props=None):
         """
         Checks if the shape resulting from removing the given solid is valid. If it is, returns True
         and removes the solid from its internal representation. Otherwise returns false and the internal
         representation is unchanged
         :param solid:
+        :param props: The solid's ShapeProperties, if the caller already has them
         :return:
         """
         assert isinstance(solid, TopoDS_Solid)
-        _solid = Solid(solid)
-        affected_lists = [l for l in self._xz_intersections + self._yz_intersections if _solid in l]
-        bad_lists = [l for l in affected_lists if len(l) == 1]
-        if bad_lists:
+        solid_id = self._find_id(solid, props)
+        if solid_id is None or solid_id in self._removed:
+            # No lines intersect it, so removing it can't make any line empty
+            return True
+
+        affected_lines = self._lines_by_solid[solid_id]
+        if any(self._line_counts[l] == 1 for l in affected_lines):
             return False
 
-        for l in affected_lists:
-            l.remove(Solid(solid))
+        for l in affected_lines:
+            self._line_counts[l] -= 1
+        self._removed.add(solid_id)
 
         return True
 
+    def _find_id(self, solid, props=None):
+        for solid_id in self._ids_by_hash.get(solid.HashCode(HASH_UPPER_BOUND), []):
+            if self._solids[solid_id].solid().IsSame(solid):
+                return solid_id
+
+        # The solid may be a copy, or come from another call to split_compound, so fall back to
+        # the same tolerant comparison as Solid.__eq__, checking the cheap bounding boxes first.
+        # The solids undergo very minor deviations while operated on by OCC, so we can't match hashes
+        if props is None:
+            props = ShapeProperties(solid)
+        bounds = props.bbox().bounds()
+        bbox_matches = np.all(np.abs(self._bboxes.mins() - bounds[:3]) < 0.1, axis=1) & \
+                       np.all(np.abs(self._bboxes.maxs() - bounds[3:]) < 0.1, axis=1)
+        candidates = np.flatnonzero(bbox_matches)
+        if len(candidates) == 0:
+            return None
+
+        com = props.centroid()
+        for solid_id in candidates:
+            if distance(com, self._centres[solid_id]) < 0.1:
+                return solid_id
+        return None
+
     @classmethod
-    def get_intersections_for_face(self, solids, pln):
+    def get_intersections_for_face(cls, solids, pln, intersector=None):
         # TODO: better comment. Doesn't explain where lines come from
         """
         :param solids: The list of solids making up the overall solid
         :param pln: The plane of the face
+        :param intersector: An optional LineSolidIntersector for the same solids, to avoid loading them again
         :return: A list of lists, where the inner lists are lists of solids that each line intersects
         """
+        if intersector is None:
+            intersector = LineSolidIntersector(solids)
+
+        wrapped_solids = intersector.wrapped_solids()
+        line_ids = cls._get_intersected_ids_for_face(cls._get_centres(wrapped_solids), pln, intersector)
+        return [[wrapped_solids[i] for i in ids] for ids in line_ids]
+
+    @classmethod
+    def _get_centres(cls, wrapped_solids):
         pts = []
-        for s in solids:
-            props = GlobalProperties(OCCUtilsSolid(s))
-            p = props.centre()
-            if point_in_solid(OCCUtilsSolid(s), p):
+        for s in wrapped_solids:
+            p = s.properties().centroid()
+            if point_in_solid(s.solid(), p):
                 pts.append(p)
             else:
                 raise NotImplementedError("Need to handle odd shapes")
+        return pts
 
+    @classmethod
+    def _get_intersected_ids_for_face(cls, centres, pln, intersector):
+        """
+        :return: A list of lists, where the inner lists are the ids (indices) of the solids that each line intersects
+        """
         normal_vec = normal_vector_from_plane(pln)
         normal_dir = gp_Dir(normal_vec)
-        lines = [gp_Lin(p, normal_dir) for p in pts]
+        lines = [gp_Lin(p, normal_dir) for p in centres]
 
         # remove redundant lines
         groups = []
@@ -75,13 +148,7 @@ class SolidFaceValidator():
 
         lines = [g.pop() for g in groups]
 
-        # We have to use lists here rather than sets or dicts, because the solids undergo very minor deviations
-        # while operated on by OCC, so we can't get matching hashes
-        result = []
-        for line in lines:
-            result.append([Solid(s) for s in solids if self.get_shape_line_intersections(s, line)])
-
-        return result
+        return intersector.intersect(lines)
 
     @classmethod
     def get_shape_line_intersections(cls, shape, line):
@@ -96,3 +163,70 @@ class SolidFaceValidator():
                              range(1, shape_inter.NbPnt() + 1)]  # Indices start at 1 :(
             return intersections
 
+
+class LineSolidIntersector():
+    """
+    Finds which of a fixed list of solids each line intersects. Each solid is loaded into its own
+    intersector once, rather than once per line. Lines parallel to an axis are only tested against
+    the solids whose bounding box they pass through
+    """
+
+    def __init__(self, solids, properties=None, tolerance=1e-3):
+        """
+        :param properties: The ShapeProperties of each solid, if the caller already has them
+        """
+        self._tolerance = tolerance
+        if properties is None:
+            properties = [None] * len(solids)
+        self._wrapped_solids = [Solid(s, p) for s, p in zip(solids, properties)]
+        self._bboxes = BoundingBoxArray.from_bboxes([s.bbox() for s in self._wrapped_solids])
+        self._intersectors = []
+        with profiling.span("load_intersectors", solids=len(solids)):
+            for s in solids:
+                shape_inter = IntCurvesFace_ShapeIntersector()
+                shape_inter.Load(s, tolerance)
+                self._intersectors.append(shape_inter)
+
+    def wrapped_solids(self):
+        return self._wrapped_solids
+
+    def intersect(self, lines):
+        """
+        :param lines: A list of gp_Lin
+        :return: A list with the indices of the solids each line intersects, in order
+        """
+        with profiling.span("intersect_lines", lines=len(lines)):
+            candidates = self._candidates(lines)
+            result = []
+            for line, line_candidates in zip(lines, candidates):
+                result.append([i for i in np.flatnonzero(line_candidates) if self._intersects(i, line)])
+            return result
+
+    def _intersects(self, index, line):
+        profiling.count("line_intersections")
+        shape_inter = self._intersectors[index]
+        shape_inter.PerformNearest(line, float("-inf"), float("+inf"))
+        with assert_isdone(shape_inter, "failed to computer shape / line intersection"):
+            return shape_inter.NbPnt() > 0
+
+    def _candidates(self, lines):
+        """
+        Returns a (num lines, num solids) boolean array of which solids each line could intersect
+        """
+        candidates = np.ones((len(lines), len(self._intersectors)), dtype=bool)
+        mins = self._bboxes.mins() - self._tolerance
+        maxs = self._bboxes.maxs() + self._tolerance
+        for index, line in enumerate(lines):
+            direction = line.Direction()
+            location = line.Location()
+            axis_components = [abs(direction.X()), abs(direction.Y()), abs(direction.Z())]
+            point = np.array([location.X(), location.Y(), location.Z()])
+            for axis in range(3):
+                if axis_components[axis] == 1.0:
+                    # The line runs along this axis, so it can only hit boxes whose projection
+                    # along the axis contains the line
+                    others = [a for a in range(3) if a != axis]
+                    candidates[index] = np.all((mins[:, others] <= point[others]) &
+                                               (point[others] <= maxs[:, others]), axis=1)
+                    break
+        return candidates
@@ -1,5 +1,6 @@
 import unittest
 from solid import Solid
+from shape_properties import ShapeProperties
 from unittest.mock import MagicMock
 import pathlib
 from OCC.Display.SimpleGui import init_display
@@ -44,6 +45,15 @@ class SolidTest(unittest.TestCase):
         solid = Solid(split_compound(self.compound_HE)[0])
         self.assertEqual(solid.__hash__(), copy.deepcopy(solid).__hash__())
 
+    def test_shared_properties(self):
+        s = split_compound(self.compound_HE)[0]
+        props = ShapeProperties(s)
+        solid = Solid(s, props)
+        self.assertIs(props, solid.properties())
+        self.assertEqual(props.bbox(), Solid(s).bbox())
+        self.assertAlmostEqual(get_mass(s), props.volume())
+        self.assertEqual(solid, Solid(copy.deepcopy(s)))
+
 
 if __name__ == '__main__':
     unittest.main()
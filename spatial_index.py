@@ -0,0 +1,79 @@
+import math
+from collections import defaultdict
+from bounding_box import BoundingBox
+
+
+class BoundingBoxGrid():
+    """
+    Uniform grid over a list of bounding boxes, so the boxes near a given box can be found without
+    checking every other box. Each box is stored in every grid cell it touches. Boxes are referred
+    to by their index in the list the grid was built from
+    """
+
+    def __init__(self, bboxes, cell_size=None):
+        self._bounds = []
+        for bbox in bboxes:
+            assert isinstance(bbox, BoundingBox)
+            self._bounds.append(bbox.bounds())
+
+        if cell_size is None:
+            cell_size = self._default_cell_size(self._bounds)
+        assert cell_size > 0
+        self._cell_size = cell_size
+
+        self._cells = defaultdict(list)
+        for index, bounds in enumerate(self._bounds):
+            for cell in self._cells_touching(bounds):
+                self._cells[cell].append(index)
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def query(self, bbox, margin=0):
+        """
+        Returns the set of indices of the boxes that are within margin of bbox along every axis.
+        This is a superset of the boxes within a (cartesian) distance of margin, so callers can
+        apply an exact test to the result
+        """
+        assert isinstance(bbox, BoundingBox)
+        xmin, ymin, zmin, xmax, ymax, zmax = bbox.bounds()
+        inflated = (xmin - margin, ymin - margin, zmin - margin, xmax + margin, ymax + margin, zmax + margin)
+
+        result = set()
+        for cell in self._cells_touching(inflated):
+            for index in self._cells.get(cell, ()):
+                if index not in result and self._bounds_intersect(self._bounds[index], inflated):
+                    result.add(index)
+        return result
+
+    def candidate_pairs(self, margin=0):
+        """
+        Returns the set of index pairs (i, j), i < j, of boxes within margin of each other along every axis
+        """
+        pairs = set()
+        for i, bounds in enumerate(self._bounds):
+            for j in self.query(BoundingBox(*bounds), margin):
+                if i < j:
+                    pairs.add((i, j))
+        return pairs
+
+    def _cells_touching(self, bounds):
+        xmin, ymin, zmin, xmax, ymax, zmax = [math.floor(b / self._cell_size) for b in bounds]
+        for x in range(xmin, xmax + 1):
+            for y in range(ymin, ymax + 1):
+                for z in range(zmin, zmax + 1):
+                    yield x, y, z
+
+    @classmethod
+    def _bounds_intersect(cls, a, b):
+        return a[0] <= b[3] and b[0] <= a[3] and a[1] <= b[4] and b[1] <= a[4] and a[2] <= b[5] and b[2] <= a[5]
+
+    @classmethod
+    def _default_cell_size(cls, all_bounds):
+        # Roughly one box per cell. The median is used so a few large boxes don't make the
+        # cells too coarse for the rest
+        extents = sorted(max(b[3] - b[0], b[4] - b[1], b[5] - b[2]) for b in all_bounds)
+        extents = [e for e in extents if e > 0]
+        if not extents:
+            return 1.0
+        return extents[len(extents) // 2]
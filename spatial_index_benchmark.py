@@ -0,0 +1,74 @@
+"""
+Compares finding adjacent cells with a BoundingBoxGrid against scanning every other cell, which is
+what create_solid_graph used to do. The cells are a grid of touching boxes, like the ones
+split_compound produces.
+
+Usage: python spatial_index_benchmark.py [num_cells ...]
+"""
+import sys
+import time
+from bounding_box import BoundingBox
+from spatial_index import BoundingBoxGrid
+
+# Same as geom_removal.ADJACENCY_OVERLAP_THRESHOLD and ADJACENCY_MAX_DIST. Not imported so
+# this can run without pythonocc
+OVERLAP_THRESHOLD = 1
+MAX_DIST = 0.1
+
+# Scanning every cell is quadratic, so for large inputs only this many queries are timed
+# and the total is extrapolated
+MAX_SCAN_QUERIES = 200
+
+
+def is_adjacent(bbox1, bbox2):
+    return bbox1.overlaps(bbox2, threshold=OVERLAP_THRESHOLD) and bbox1.dist(bbox2) < MAX_DIST
+
+
+def make_cells(num_cells, cell_size=2.0):
+    # Lay the cells out in a roughly cubic grid
+    side = max(1, round(num_cells ** (1 / 3)))
+    cells = []
+    i = 0
+    while len(cells) < num_cells:
+        x, y, z = i % side, (i // side) % side, i // (side * side)
+        cells.append(BoundingBox(x * cell_size, y * cell_size, z * cell_size,
+                                 (x + 1) * cell_size, (y + 1) * cell_size, (z + 1) * cell_size))
+        i += 1
+    return cells
+
+
+def time_scan(cells):
+    queries = cells[:MAX_SCAN_QUERIES]
+    start = time.perf_counter()
+    num_edges = 0
+    for cell in queries:
+        num_edges += sum(1 for other in cells if other is not cell and is_adjacent(cell, other))
+    elapsed = time.perf_counter() - start
+    return elapsed * len(cells) / len(queries), num_edges * len(cells) / len(queries)
+
+
+def time_grid(cells):
+    start = time.perf_counter()
+    grid = BoundingBoxGrid(cells)
+    num_edges = 0
+    for i, cell in enumerate(cells):
+        num_edges += sum(1 for j in grid.query(cell, margin=MAX_DIST) if j != i and is_adjacent(cell, cells[j]))
+    return time.perf_counter() - start, num_edges
+
+
+def main(sizes):
+    print("{:>8} {:>12} {:>12} {:>9}".format("cells", "scan (s)", "grid (s)", "speedup"))
+    for num_cells in sizes:
+        cells = make_cells(num_cells)
+        scan_time, scan_edges = time_scan(cells)
+        grid_time, grid_edges = time_grid(cells)
+        if num_cells <= MAX_SCAN_QUERIES:
+            assert scan_edges == grid_edges
+        estimated = "*" if num_cells > MAX_SCAN_QUERIES else " "
+        print("{:>8} {:>11.3f}{} {:>12.3f} {:>8.1f}x".format(num_cells, scan_time, estimated, grid_time,
+                                                           scan_time / grid_time))
+    print("* extrapolated from {} queries".format(MAX_SCAN_QUERIES))
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [100, 1000, 10000])
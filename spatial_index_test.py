@@ -0,0 +1,49 @@
+import unittest
+from bounding_box import BoundingBox
+from spatial_index import BoundingBoxGrid
+
+
+class BoundingBoxGridTest(unittest.TestCase):
+    def setUp(self):
+        # A 4x4x4 grid of touching 10mm cubes
+        self.bboxes = []
+        for x in range(4):
+            for y in range(4):
+                for z in range(4):
+                    self.bboxes.append(BoundingBox(10 * x, 10 * y, 10 * z, 10 * (x + 1), 10 * (y + 1), 10 * (z + 1)))
+
+    def brute_force_query(self, bbox, margin):
+        return {i for i, b in enumerate(self.bboxes) if b.dist(bbox) <= margin}
+
+    def test_query_matches_brute_force(self):
+        grid = BoundingBoxGrid(self.bboxes)
+        for bbox in self.bboxes:
+            self.assertEqual(self.brute_force_query(bbox, 0.1), grid.query(bbox, margin=0.1))
+
+    def test_query_small_cells(self):
+        grid = BoundingBoxGrid(self.bboxes, cell_size=3)
+        for bbox in self.bboxes:
+            self.assertEqual(self.brute_force_query(bbox, 0.1), grid.query(bbox, margin=0.1))
+
+    def test_query_far_away(self):
+        grid = BoundingBoxGrid(self.bboxes)
+        self.assertEqual(set(), grid.query(BoundingBox(100, 100, 100, 110, 110, 110), margin=0.1))
+
+    def test_query_margin(self):
+        grid = BoundingBoxGrid([BoundingBox(0, 0, 0, 1, 1, 1), BoundingBox(1.5, 0, 0, 2.5, 1, 1)])
+        self.assertEqual({0}, grid.query(BoundingBox(0, 0, 0, 1, 1, 1), margin=0.1))
+        self.assertEqual({0, 1}, grid.query(BoundingBox(0, 0, 0, 1, 1, 1), margin=1))
+
+    def test_candidate_pairs(self):
+        grid = BoundingBoxGrid([BoundingBox(0, 0, 0, 1, 1, 1), BoundingBox(1, 0, 0, 2, 1, 1),
+                                BoundingBox(5, 0, 0, 6, 1, 1)])
+        self.assertEqual({(0, 1)}, grid.candidate_pairs(margin=0.1))
+
+    def test_empty(self):
+        grid = BoundingBoxGrid([])
+        self.assertEqual(0, len(grid))
+        self.assertEqual(set(), grid.query(BoundingBox(0, 0, 0, 1, 1, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
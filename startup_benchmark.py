@@ -0,0 +1,101 @@
+"""
+Measures how long main.py takes to start up, using python -X importtime.
+
+Target: importing main (everything that happens before a headless generate command starts its first
+job) takes under 150 ms, and loads none of OCC, OCCUtils, shapely or svgpathtools. Those are imported
+when the first letter is built, combined or written, and that time is reported separately below.
+
+Import times are only meaningful in the environment the project supports, so no capture is kept in
+the repo. To compare changes to the imports, save a capture of python -X importtime -c "import main"
+with --save before and after, in the conda environment from two-faced-type.yml.
+
+Usage: python startup_benchmark.py [--repeat n] [--top n] [--save file]
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+TARGET_SECONDS = 0.15
+HEAVY_PACKAGES = ("OCC", "OCCUtils", "shapely", "svgpathtools")
+# What a generate command imports once it starts working on its first job
+GENERATE_IMPORTS = "import combiner, export, face_factory; import OCC.Core.BRepBuilderAPI, svgpathtools, shapely.geometry"
+
+REPO_DIR = Path(__file__).parent
+
+
+def capture_importtime(statement):
+    """
+    Runs the statement in a fresh interpreter with -X importtime
+    :return: The raw importtime output, and a list of (cumulative seconds, module) sorted slowest first
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=str(REPO_DIR),
+                            stderr=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError("'{}' failed:\n{}".format(statement, result.stderr.strip().splitlines()[-1]))
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative) / 1e6, name.strip()))
+    modules.sort(reverse=True)
+    return result.stderr, modules
+
+
+def top_level_seconds(raw, module):
+    # The top-level module's cumulative time includes everything it imports
+    for line in raw.splitlines():
+        if line.startswith("import time:") and line.split("|")[-1].rstrip() == " " + module:
+            return int(line.split("|")[1]) / 1e6
+    raise ValueError("{} not found in the importtime output".format(module))
+
+
+def loaded_heavy_packages(statement):
+    check = "{}; import sys; print(sorted({{m.split('.')[0] for m in sys.modules}} & set({!r})))".format(
+        statement, HEAVY_PACKAGES)
+    result = subprocess.run([sys.executable, "-c", check], cwd=str(REPO_DIR), stdout=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    return result.stdout.strip()
+
+
+def main(repeat, top, save):
+    # The best of several runs is the least affected by whatever else the machine is doing
+    best = float("inf")
+    best_raw = None
+    best_modules = None
+    for _ in range(repeat):
+        raw, modules = capture_importtime("import main")
+        seconds = top_level_seconds(raw, "main")
+        if seconds < best:
+            best, best_raw, best_modules = seconds, raw, modules
+
+    print("import main: {:.3f}s (best of {}), target {:.3f}s: {}".format(
+        best, repeat, TARGET_SECONDS, "OK" if best <= TARGET_SECONDS else "MISSED"))
+    print("Heavy packages loaded by import main: {}".format(loaded_heavy_packages("import main")))
+    print("Slowest imports:")
+    for seconds, name in best_modules[:top]:
+        print("  {:>8.3f}s  {}".format(seconds, name))
+
+    try:
+        raw, modules = capture_importtime(GENERATE_IMPORTS)
+        total = sum(top_level_seconds(raw, name) for name in ("combiner", "export", "face_factory"))
+        print("Imports deferred until the first job: {:.3f}s".format(total))
+    except RuntimeError as e:
+        print("Couldn't time the imports deferred until the first job: {}".format(e))
+
+    if save:
+        Path(save).write_text(best_raw)
+        print("Wrote {}".format(save))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure how long main.py takes to start up")
+    parser.add_argument('--repeat', type=int, default=5, help="How many fresh interpreters to time")
+    parser.add_argument('--top', type=int, default=15, help="How many of the slowest imports to list")
+    parser.add_argument('--save', metavar='file', type=str, default=None,
+                        help="Write the fastest run's raw importtime output to this file")
+    args = parser.parse_args()
+
+    main(args.repeat, args.top, args.save)
@@ -1,13 +1,19 @@
 from pathlib import Path
-import copy
-import os
-import errno
-from OCC.Core.StlAPI import StlAPI_Writer, StlAPI_Reader
-from OCC.Core.TopoDS import TopoDS_Shape
-from OCC.Extend.DataExchange import write_step_file
+import profiling
+
+# The OCC modules are imported by the functions that use them, so the constants here and modules
+# that only need them (eg. main.py parsing its arguments) don't have to load OCC
+
+# How far the STL triangles may deviate from the real surface, in mm and radians. Smaller values
+# give smoother curves and bigger files
+DEFAULT_LINEAR_DEFLECTION = 0.05
+DEFAULT_ANGULAR_DEFLECTION = 0.5
 
 
 def read_stl(filepath):
+    from OCC.Core.StlAPI import StlAPI_Reader
+    from OCC.Core.TopoDS import TopoDS_Shape
+
     assert isinstance(filepath, Path)
     assert filepath.is_file()
     stl = TopoDS_Shape()
@@ -16,38 +22,96 @@ def read_stl(filepath):
     assert success
     return stl
 
-def write_stl(shape, filepath):
+def read_brep(filepath):
+    """
+    Reads a shape written by write_brep. The shape is downcast to its concrete type
+    (eg. TopoDS_Face) so it can be used wherever the original shape was
+    """
+    from OCC.Core.BRep import BRep_Builder
+    from OCC.Core.BRepTools import breptools_Read
+    from OCC.Core.TopoDS import TopoDS_Shape
+
     assert isinstance(filepath, Path)
+    assert filepath.is_file()
+    shape = TopoDS_Shape()
+    builder = BRep_Builder()
+    success = breptools_Read(shape, str(filepath), builder)
+    assert success
+    return _downcast(shape)
 
-    stl_writer = StlAPI_Writer()
-    stl_writer.SetASCIIMode(True)
-    stl_writer.Write(copy.deepcopy(shape), str(filepath))
+def write_brep(shape, filepath):
+    from OCC.Core.BRepTools import breptools_Write
+
+    assert isinstance(filepath, Path)
+    success = breptools_Write(shape, str(filepath))
+    assert success
+
+def shape_to_brep_string(shape):
+    """
+    Serializes a shape to a BRep string in memory, eg. to send it to another process. The shape set
+    only stores the shape's TShape, so its location and orientation go in a header line first
+    """
+    from OCC.Core.BRepTools import BRepTools_ShapeSet
+
+    profiling.count("brep_serializations")
+    shape_set = BRepTools_ShapeSet()
+    shape_set.Add(shape)
+    location_index = shape_set.Locations().Index(shape.Location())
+    return "{} {}\n{}".format(location_index, int(shape.Orientation()), shape_set.WriteToString())
+
+def shape_from_brep_string(brep):
+    from OCC.Core.BRepTools import BRepTools_ShapeSet
+
+    profiling.count("brep_deserializations")
+    header, brep = brep.split("\n", 1)
+    location_index, orientation = (int(field) for field in header.split())
+    shape_set = BRepTools_ShapeSet()
+    shape_set.ReadFromString(brep)
+    # Add puts the shape itself after all of its sub-shapes
+    shape = shape_set.Shape(shape_set.NbShapes())
+    shape.Location(shape_set.Locations().Location(location_index))
+    shape.Orientation(orientation)
+    return _downcast(shape)
 
+def _downcast(shape):
+    from OCC.Core.TopAbs import TopAbs_COMPOUND, TopAbs_SOLID, TopAbs_SHELL, TopAbs_FACE, TopAbs_WIRE, TopAbs_EDGE
+    from OCC.Core.TopoDS import topods_Compound, topods_Solid, topods_Shell, topods_Face, topods_Wire, topods_Edge
 
-def save_to_stl(shapes, dirpath=Path.home()):
-    assert isinstance(shapes, list)
+    downcasts = {
+        TopAbs_COMPOUND: topods_Compound,
+        TopAbs_SOLID: topods_Solid,
+        TopAbs_SHELL: topods_Shell,
+        TopAbs_FACE: topods_Face,
+        TopAbs_WIRE: topods_Wire,
+        TopAbs_EDGE: topods_Edge,
+    }
+    downcast = downcasts.get(shape.ShapeType())
+    return downcast(shape) if downcast else shape
 
-    try:
-        os.makedirs(Path(dirpath))
-    except OSError as e:
-        if e.errno != errno.EEXIST:
-            raise
+def mesh_shape(shape, linear_deflection=DEFAULT_LINEAR_DEFLECTION, angular_deflection=DEFAULT_ANGULAR_DEFLECTION,
+               parallel=True):
+    """
+    Triangulates the faces of the shape in place. The triangulation is what gets written to STL files
+    """
+    from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
 
+    # The constructor performs the meshing
+    with profiling.span("mesh_shape"):
+        mesh = BRepMesh_IncrementalMesh(shape, linear_deflection, False, angular_deflection, parallel)
+    assert mesh.IsDone()
+
+def write_stl(shape, filepath, ascii=False, linear_deflection=DEFAULT_LINEAR_DEFLECTION,
+              angular_deflection=DEFAULT_ANGULAR_DEFLECTION):
+    """
+    Meshes the shape in place, see mesh_shape, rather than copying it first. Meshing only adds a
+    triangulation to the faces and doesn't change the geometry, so the shape can still be shared
+    """
+    from OCC.Core.StlAPI import StlAPI_Writer
+
+    assert isinstance(filepath, Path)
+    mesh_shape(shape, linear_deflection, angular_deflection)
     stl_writer = StlAPI_Writer()
-    stl_writer.SetASCIIMode(True)
-    for index, shape in enumerate(shapes):
-        filepath = Path(dirpath, "combined_shape_" + str(index + 1) + ".stl")
-        stl_writer.Write(shape, str(filepath))
-
-def save_to_step(shapes, dirpath=Path.home()):
-    assert isinstance(shapes, list)
-
-    try:
-        os.makedirs(Path(dirpath))
-    except OSError as e:
-        if e.errno != errno.EEXIST:
-            raise
-
-    for index, shape in enumerate(shapes):
-        filepath = Path(dirpath, "combined_shape_" + str(index + 1) + ".step")
-        write_step_file(shape, str(filepath))
+    stl_writer.SetASCIIMode(ascii)
+    with profiling.span("write_stl"):
+        success = stl_writer.Write(shape, str(filepath))
+    assert success
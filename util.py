@@ -1,12 +1,9 @@
 from enum import Enum
-import copy
 
 import math
-from OCC.Core import BRepGProp
 from OCC.Core.BOPAlgo import BOPAlgo_Builder
 from OCC.Core.BRepGProp import BRepGProp_Face
 from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeBox
-from OCC.Core.GProp import GProp_GProps
 from OCC.Core.ShapeExtend import ShapeExtend_Explorer
 from OCC.Core.TopTools import TopTools_HSequenceOfShape
 from OCC.Core.TopoDS import TopoDS_Compound, TopoDS_Solid, TopoDS_Face
@@ -17,6 +14,8 @@ from OCCUtils.base import GlobalProperties
 from OCCUtils.face import Face
 
 from constants import PL_XZ, PL_YZ
+from shape_properties import ShapeProperties
+from boolean_options import DEFAULT_BOOLEAN_OPTIONS
 
 import logging
 from OCCUtils.Construct import make_box, make_face
@@ -33,15 +32,14 @@ class CompoundSequenceType(Enum):
 def make_bounding_box(compound):
     assert isinstance(compound, TopoDS_Compound)
 
-    compound_ = copy.deepcopy(compound)
-    props = GlobalProperties(compound_)
+    props = GlobalProperties(compound)
     x1, y1, z1, x2, y2, z2 = props.bbox()
     fudge_factor = 0.001
     p = gp_Pnt(x1 - fudge_factor, y1 - fudge_factor, z1 - fudge_factor)
     p2 = gp_Pnt(x2 + fudge_factor, y2 + fudge_factor, z2 + fudge_factor)
     result = BRepPrimAPI_MakeBox(p, p2).Shape()
     assert isinstance(result, TopoDS_Solid)
-    return copy.deepcopy(result)
+    return result
 
 
 def dot(v1, v2):
@@ -93,7 +91,7 @@ def _get_faces_helper(faces, vec, perp=False):
             if abs(dot(vec, normal_vec)) != 0:
                 result.append(face)
 
-    return copy.deepcopy(result)
+    return result
 
 
 def get_faces(compound):
@@ -107,11 +105,10 @@ def get_solids(compound):
 def _get_list_from_compound(compound, sequence_type):
     assert isinstance(sequence_type, CompoundSequenceType)
     assert isinstance(compound, TopoDS_Compound) or isinstance(compound, TopoDS_Solid)
-    compound_ = copy.deepcopy(compound)
 
     if isinstance(compound, TopoDS_Compound):
         se_exp = ShapeExtend_Explorer()
-        shape_sequence = se_exp.SeqFromCompound(compound_, True)
+        shape_sequence = se_exp.SeqFromCompound(compound, True)
         solids_sequence = TopTools_HSequenceOfShape()
         # Only the solids seem to be populated properly.
         # Need to use TopologyExplorer to get other features
@@ -139,23 +136,22 @@ def _get_list_from_compound(compound, sequence_type):
         raise ValueError("Invalid sequence type")
 
 
-def get_mass(compound):
+def get_mass(compound, properties=None):
+    """
+    :param properties: An optional ShapeProperties for the compound or solid. Its volume is reused
+    if it has already been computed, and kept for next time otherwise
+    """
     if not (isinstance(compound, TopoDS_Compound) or isinstance(compound, TopoDS_Solid)):
         raise RuntimeError("bad mass instance type")
-    compound_ = copy.deepcopy(compound)
+    if properties is not None:
+        return properties.volume()
 
     if isinstance(compound, TopoDS_Compound):
-        solids = _get_list_from_compound(compound_, CompoundSequenceType.SOLID)
+        solids = _get_list_from_compound(compound, CompoundSequenceType.SOLID)
     else:
-        solids = [compound_]
+        solids = [compound]
 
-    total_mass = 0
-    for solid in solids:
-        props = GProp_GProps()
-        BRepGProp.brepgprop_VolumeProperties(solid, props)
-        mass = props.Mass()
-        total_mass += mass
-    return total_mass
+    return sum(ShapeProperties(solid).volume() for solid in solids)
 
 
 def bounding_rect(compound, plane):
@@ -171,26 +167,66 @@ def bounding_rect(compound, plane):
     else:
         raise RuntimeError("bad plane")
 
-def split_compound(compound):
+def get_split_planes(compound, tolerance=1e-6):
+    """
+    Returns the planes split_compound splits the compound along: one per distinct plane of the compound's
+    planar faces. Coplanar faces (eg. from collinear edges in a glyph) only produce one plane. Every face
+    of the extruded letters is parallel to X or Y, so there are no other planes to leave out
+    :return: A tuple of the list of gp_Pln, and a dict with the number of planes dropped for each reason
+    """
     all_faces = get_faces(compound)
     planar_faces = list(filter(lambda x: Face(x).is_planar(), all_faces))
 
-    p1, v1 = gp_Pnt(50, 50, 25), gp_Vec(0, 0, -1)
-    fc1 = make_face(gp_Pln(p1, vec_to_dir(v1)), -1000, 1000, -1000, 1000)  # limited, not infinite plane
-
-    bo = BOPAlgo_Builder()
-    bo.AddArgument(copy.deepcopy(compound))
-    # bo.AddArgument(fc1)
-
-    # display.DisplayShape(fc1, transparency=0.7)
+    kept = []
+    dropped = {"duplicate": 0}
     for f in planar_faces:
         gprop = BRepGProp_Face(f)
         normal_point = gp_Pnt(0, 0, 0)
         normal_vec = gp_Vec(0, 0, 0)
         gprop.Normal(0, 0, normal_point, normal_vec)
-        big_face = make_face(gp_Pln(normal_point, vec_to_dir(normal_vec)), -1000, 1000, -1000, 1000)  # limited, not infinite plane
-        bo.AddArgument(big_face)
-        # display.DisplayShape(big_face, transparency=0.7)
+        normal_vec.Normalize()
+        normal = [normal_vec.X(), normal_vec.Y(), normal_vec.Z()]
+
+        # n and -n describe the same plane, so make the first non-zero component positive
+        sign = next((1 if c > 0 else -1 for c in normal if abs(c) > tolerance), 1)
+        normal = [sign * c for c in normal]
+        offset = normal[0] * normal_point.X() + normal[1] * normal_point.Y() + normal[2] * normal_point.Z()
+
+        duplicate = any(abs(offset - o) < tolerance and all(abs(a - b) < tolerance for a, b in zip(normal, n))
+                        for n, o, _ in kept)
+        if duplicate:
+            dropped["duplicate"] += 1
+            continue
+
+        kept.append((normal, offset, gp_Pln(normal_point, vec_to_dir(normal_vec))))
+
+    return [pln for _, _, pln in kept], dropped
+
+def split_compound(compound, options=DEFAULT_BOOLEAN_OPTIONS):
+    planes, dropped = get_split_planes(compound)
+    logger.debug("Splitting compound along {} planes. Dropped {} duplicate planes".format(
+        len(planes), dropped["duplicate"]))
+
+    # Size the splitting faces to just cover the compound rather than making them huge. Centred on the
+    # projection of the bbox centre onto the plane, anything in the bbox is within half the diagonal.
+    # The extra 1mm is a margin so the faces always cut all the way through
+    props = GlobalProperties(compound)
+    x1, y1, z1, x2, y2, z2 = props.bbox()
+    centre = gp_Pnt((x1 + x2) / 2, (y1 + y2) / 2, (z1 + z2) / 2)
+    half_size = gp_Pnt(x1, y1, z1).Distance(gp_Pnt(x2, y2, z2)) / 2 + 1
+
+    bo = BOPAlgo_Builder()
+    options.apply(bo)
+    # The builder doesn't modify its arguments, it builds new shapes from them
+    bo.AddArgument(compound)
+
+    for pln in planes:
+        normal = gp_Vec(pln.Axis().Direction())
+        dist_to_plane = gp_Vec(pln.Location(), centre).Dot(normal)
+        face_centre = centre.Translated(normal.Multiplied(-dist_to_plane))
+        centred_pln = gp_Pln(face_centre, pln.Axis().Direction())
+        split_face = make_face(centred_pln, -half_size, half_size, -half_size, half_size)  # limited, not infinite plane
+        bo.AddArgument(split_face)
 
     bo.Perform()
     # print("error status: {}".format(bo.ErrorStatus()))
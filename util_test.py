@@ -103,6 +103,13 @@ class TestUtil(unittest.TestCase):
         start_display()
 
 
+    def test_get_split_planes_HE(self):
+        planes, dropped = get_split_planes(self.compound_HE)
+        planar_faces = [f for f in get_faces(self.compound_HE) if Face(f).is_planar()]
+        self.assertEqual(len(planar_faces), len(planes) + dropped["duplicate"])
+        # The H and E share plenty of coplanar faces
+        self.assertGreater(dropped["duplicate"], 0)
+
     def test_split_compound_HE(self):
         result = split_compound(self.compound_HE)
         self.assertEqual(22, len(result))
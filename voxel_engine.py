@@ -0,0 +1,377 @@
+"""
+A voxel engine for instant previews. Each glyph is rasterized into a bitmap of (z, x) pixels, and
+since the combined letter's slice at any height is the first letter's slice times the second's,
+each row of voxels is just the outer product of the two bitmaps' rows. The voxels are meshed by
+emitting every face that doesn't touch another voxel. Where voxels only touch along an edge or at a
+corner, the vertices there are split, so the mesh is closed and manifold, ready for STL.
+
+Redundant geometry removal is done per row too. Keeping the first letter's row along a single y,
+and the second letter's row along a single x (an L, or a cross, of voxels) still shows both letters
+in full, so that's all that's kept, with the same x and y kept from row to row where possible.
+
+The results are only as accurate as the voxel size, height_mm / resolution, and are meshes rather
+than BRep shapes, so STEP files can't be written from them. Use the occ or polygon engines for
+anything that's going to be printed.
+
+combine_words and iter_combined_letters take the same arguments as the combiner's, apart from
+the ones that only apply to BRep shapes (the caches, workers and boolean options). Pass
+engine="voxel" to the combiner's to use them.
+"""
+import logging
+import numpy as np
+from export import Mesh
+from polygon_combiner import flatten_outlines
+
+logger = logging.getLogger("TFT")
+
+# How many voxels tall the letters are
+DEFAULT_RESOLUTION = 100
+
+
+def rasterize(outlines, height_mm, voxel_size):
+    """
+    :param outlines: Outlines as returned by FaceFactory.create_outlines
+    :return: A bool array of (z, x) pixels, set where the pixel's centre is inside the glyph
+    """
+    rings = flatten_outlines(outlines, height_mm, tolerance=voxel_size / 4)
+    edges = np.array([(x1, z1, x2, z2) for ring in rings for (x1, z1), (x2, z2) in zip(ring, ring[1:] + ring[:1])
+                      if z1 != z2], dtype=float).reshape(-1, 4)
+    x1, z1, x2, z2 = edges.T
+    width = max((x for ring in rings for x, _ in ring), default=0)
+
+    num_rows = int(np.ceil(height_mm / voxel_size - 1e-9))
+    num_columns = int(np.ceil(width / voxel_size - 1e-9))
+    centres = (np.arange(num_columns) + 0.5) * voxel_size
+    bitmap = np.zeros((num_rows, num_columns), dtype=bool)
+    for row in range(num_rows):
+        z = (row + 0.5) * voxel_size
+        # Half-open, so a row through a vertex counts each of its edges once
+        crossing = (np.minimum(z1, z2) <= z) & (z < np.maximum(z1, z2))
+        t = (z - z1[crossing]) / (z2[crossing] - z1[crossing])
+        xs = np.sort(x1[crossing] + t * (x2[crossing] - x1[crossing]))
+        # Inside if there are an odd number of crossings to the left, which counts holes as outside
+        bitmap[row] = np.searchsorted(xs, centres) % 2 == 1
+    return bitmap
+
+
+def combine_bitmaps(bitmap1, bitmap2):
+    """
+    :param bitmap1: The first letter's (z, x) bitmap
+    :param bitmap2: The second letter's bitmap. Its columns are the combined letter's y
+    :return: A bool array of (x, y, z) voxels
+    """
+    num_rows = min(len(bitmap1), len(bitmap2))
+    occupancy = bitmap1[:num_rows, :, None] & bitmap2[:num_rows, None, :]
+    return np.ascontiguousarray(occupancy.transpose(1, 2, 0))
+
+
+def remove_redundant_voxels(bitmap1, bitmap2):
+    """
+    The voxel equivalent of geom_removal.remove_redundant_geom. Keeps an L of voxels in each row,
+    which still projects to both bitmaps, unless that would split the letter into more pieces than
+    the full occupancy has
+    :return: A bool array of (x, y, z) voxels
+    """
+    num_rows = min(len(bitmap1), len(bitmap2))
+    kept = np.zeros((bitmap1.shape[1], bitmap2.shape[1], num_rows), dtype=bool)
+    kept_boxes = []
+    full_boxes = []
+    x0 = y0 = None
+    for z in range(num_rows):
+        xs = np.flatnonzero(bitmap1[z])
+        ys = np.flatnonzero(bitmap2[z])
+        if len(xs) == 0 or len(ys) == 0:
+            kept_boxes.append([])
+            full_boxes.append([])
+            continue
+
+        x0 = _nearest(xs, x0)
+        y0 = _nearest(ys, y0)
+        kept[xs, y0, z] = True
+        kept[x0, ys, z] = True
+
+        x_runs = _runs(xs)
+        y_runs = _runs(ys)
+        kept_boxes.append([(x_start, x_end, y0, y0 + 1) for x_start, x_end in x_runs] +
+                          [(x0, x0 + 1, y_start, y_end) for y_start, y_end in y_runs])
+        full_boxes.append([x_run + y_run for x_run in x_runs for y_run in y_runs])
+
+    if count_components(kept_boxes) > count_components(full_boxes):
+        logger.debug("Keeping all the voxels, since removing the redundant ones would split the letter")
+        return combine_bitmaps(bitmap1, bitmap2)
+    return kept
+
+
+def _nearest(values, previous):
+    """
+    :param values: Sorted indices
+    :return: The value closest to previous, or the middle one if there's no previous
+    """
+    if previous is None:
+        return int(values[len(values) // 2])
+    return int(values[np.argmin(np.abs(values - previous))])
+
+
+def _runs(indices):
+    """
+    :param indices: Sorted indices
+    :return: The runs of consecutive indices, as half-open (start, end) ranges
+    """
+    breaks = np.flatnonzero(np.diff(indices) > 1)
+    starts = np.concatenate(([indices[0]], indices[breaks + 1]))
+    ends = np.concatenate((indices[breaks] + 1, [indices[-1] + 1]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def count_components(rows):
+    """
+    Counts the face-connected pieces of a shape made of voxel boxes
+    :param rows: For each row of voxels, the boxes in that row as half-open (x start, x end, y start, y end) ranges
+    """
+    parents = {}
+
+    def find(box):
+        while parents[box] != box:
+            parents[box] = parents[parents[box]]
+            box = parents[box]
+        return box
+
+    def union(box1, box2):
+        parents[find(box1)] = find(box2)
+
+    previous = []
+    for z, boxes in enumerate(rows):
+        boxes = [(z,) + box for box in boxes]
+        for box in boxes:
+            parents[box] = box
+        for i, box1 in enumerate(boxes):
+            for box2 in boxes[i + 1:]:
+                if _touching(box1, box2):
+                    union(box1, box2)
+            for box2 in previous:
+                if _overlap(box1[1:3], box2[1:3]) > 0 and _overlap(box1[3:5], box2[3:5]) > 0:
+                    union(box1, box2)
+        previous = boxes
+    return len({find(box) for box in parents})
+
+
+def _overlap(range1, range2):
+    # Negative if there's a gap between them, 0 if they only touch
+    return min(range1[1], range2[1]) - max(range1[0], range2[0])
+
+
+def _touching(box1, box2):
+    x_overlap = _overlap(box1[1:3], box2[1:3])
+    y_overlap = _overlap(box1[3:5], box2[3:5])
+    return (x_overlap > 0 and y_overlap >= 0) or (x_overlap >= 0 and y_overlap > 0)
+
+
+def voxel_mesh(occupancy, voxel_size):
+    """
+    :param occupancy: A bool array of (x, y, z) voxels
+    :return: A Mesh of every voxel face that doesn't touch another voxel. Faces share their vertices,
+    apart from where the surface only touches itself, which is split as if the voxels were apart
+    """
+    padded = np.pad(occupancy, 1)
+    # The corners of a unit square in the plane of the other two axes, in the order (b, c) where
+    # a, b and c are in cyclic order. Counter-clockwise when looking back along +a
+    square = np.array([(0, 0), (1, 0), (1, 1), (0, 1)])
+    corners = []
+    quad_voxels = []
+    for a in range(3):
+        b, c = (a + 1) % 3, (a + 2) % 3
+        for direction in (-1, 1):
+            neighbours = np.roll(padded, -direction, axis=a)
+            voxels = np.argwhere(padded & ~neighbours) - 1
+            if len(voxels) == 0:
+                continue
+            quad = np.zeros((4, 3), dtype=int)
+            quad[:, a] = 1 if direction > 0 else 0
+            quad[:, b] = square[:, 0]
+            quad[:, c] = square[:, 1]
+            if direction < 0:
+                quad = quad[::-1]
+            quad_corners = voxels[:, None, :] + quad[None, :, :]
+
+            # Which of the 12 faces around each corner this quad is, named by axis and the offset of
+            # the voxel on its low side, in the 2 x 2 x 2 block of voxels around the corner
+            low_voxels = voxels if direction > 0 else voxels - np.eye(3, dtype=int)[a]
+            low_offsets = low_voxels[:, None, :] - (quad_corners - 1)
+            faces = a * 8 + low_offsets @ np.array([1, 2, 4])
+            corners.append(np.concatenate((quad_corners, faces[:, :, None]), axis=2))
+            quad_voxels.append(voxels)
+
+    if not corners:
+        return Mesh(np.zeros((0, 3)), np.zeros((0, 3), dtype=int))
+    corners = np.concatenate(corners).reshape(-1, 4)
+    positions = corners[:, :3]
+    # The padded voxels around vertex q are at q + offset
+    blocks = sum(padded[tuple((positions + offset).T)].astype(int) << bit for bit, offset in enumerate(_BLOCK_OFFSETS))
+    sheets = _sheet_table()[blocks, corners[:, 3]]
+
+    # Packed into one int per vertex, since np.unique is much faster on those than on rows. There are
+    # at most 4 sheets through a vertex
+    shape = np.array(padded.shape, dtype=np.int64)
+    keys = ((positions[:, 0] * shape[1] + positions[:, 1]) * shape[2] + positions[:, 2]) * 4 + sheets
+    keys, indices = np.unique(keys, return_inverse=True)
+    vertices = np.column_stack(np.unravel_index(keys // 4, padded.shape)).astype(float)
+    vertices, triangles = _triangulate(vertices, indices.reshape(-1, 4), np.concatenate(quad_voxels))
+    return Mesh(vertices * voxel_size, triangles)
+
+
+def _triangulate(vertices, quads, quad_voxels):
+    """
+    Splits each quad into two triangles. Splitting the vertices still leaves an edge shared by four
+    quads where two voxels only touch along it, but are joined around both of its ends. Each
+    voxel's two quads there get their own vertex in the middle of the edge, and are fanned from
+    their centres instead
+    :param quad_voxels: The voxel each quad is a face of
+    :return: The vertices, with any added ones on the end, and the triangles
+    """
+    edges = np.sort(quads[:, [0, 1, 1, 2, 2, 3, 3, 0]].reshape(-1, 4, 2), axis=2)
+    edge_keys, edge_counts = np.unique(edges[:, :, 0] * len(vertices) + edges[:, :, 1], return_counts=True)
+    shared_edges = {divmod(key, len(vertices)) for key in edge_keys[edge_counts > 2].tolist()}
+    if not shared_edges:
+        return vertices, np.concatenate((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]))
+
+    new_vertices = []
+    midpoints = {}
+    fanned = np.zeros(len(quads), dtype=bool)
+    fans = []
+    for index in np.flatnonzero([any(tuple(edge) in shared_edges for edge in quad_edges.tolist())
+                                 for quad_edges in edges]):
+        fanned[index] = True
+        quad = quads[index].tolist()
+        voxel = tuple(quad_voxels[index].tolist())
+        centre = len(vertices) + len(new_vertices)
+        new_vertices.append(vertices[quad].mean(axis=0))
+
+        outline = []
+        for start, end in zip(quad, quad[1:] + quad[:1]):
+            outline.append(start)
+            edge = (min(start, end), max(start, end))
+            if edge in shared_edges:
+                if (edge, voxel) not in midpoints:
+                    midpoints[(edge, voxel)] = len(vertices) + len(new_vertices)
+                    new_vertices.append((vertices[start] + vertices[end]) / 2)
+                outline.append(midpoints[(edge, voxel)])
+        fans += [(centre, start, end) for start, end in zip(outline, outline[1:] + outline[:1])]
+
+    kept = quads[~fanned]
+    triangles = np.concatenate((kept[:, [0, 1, 2]], kept[:, [0, 2, 3]], np.array(fans, dtype=kept.dtype)))
+    return np.concatenate((vertices, new_vertices)), triangles
+
+
+# The voxels around a vertex, as offsets from the one below and behind it. The index is the bit each
+# one has in the block's occupancy
+_BLOCK_OFFSETS = np.array([(i, j, k) for k in (0, 1) for j in (0, 1) for i in (0, 1)])
+_sheet_table_cache = []
+
+
+def _sheet_table():
+    """
+    For every occupancy of the 2 x 2 x 2 block of voxels around a vertex, which of the surface's sheets
+    through the vertex each of the 12 faces inside the block is part of. Faces are numbered as in
+    voxel_mesh. The faces along each edge out of the vertex belong to the same sheet, apart from
+    where two voxels only touch along the edge, where each voxel's faces get their own sheet
+    :return: An int array of (occupancy, face) to sheet, -1 where the face isn't on the surface
+    """
+    if _sheet_table_cache:
+        return _sheet_table_cache[0]
+
+    table = np.full((256, 24), -1, dtype=np.int64)
+    offsets = [tuple(offset) for offset in _BLOCK_OFFSETS.tolist()]
+    # (face number, axis, low voxel, high voxel)
+    faces = []
+    for a in range(3):
+        for low in offsets:
+            if low[a] == 0:
+                high = tuple(v + (axis == a) for axis, v in enumerate(low))
+                faces.append((a * 8 + offsets.index(low), a, low, high))
+
+    for block in range(256):
+        occupied = {offset for bit, offset in enumerate(offsets) if block >> bit & 1}
+        surface = [face for face in faces if (face[2] in occupied) != (face[3] in occupied)]
+        parents = {face[0]: face[0] for face in surface}
+
+        def find(face):
+            while parents[face] != face:
+                face = parents[face]
+            return face
+
+        for a in range(3):
+            for side in (0, 1):
+                # The faces around the half of the a axis edge on this side of the vertex
+                ring = [face for face in surface if face[1] != a and face[2][a] == side]
+                if len(ring) == 2:
+                    parents[find(ring[0][0])] = find(ring[1][0])
+                elif len(ring) == 4:
+                    # Two voxels on opposite corners. Keep each one's faces together
+                    for voxel in occupied:
+                        pair = [face[0] for face in ring if voxel in face[2:]]
+                        if len(pair) == 2:
+                            parents[find(pair[0])] = find(pair[1])
+
+        roots = sorted({find(face) for face in parents})
+        for face in parents:
+            table[block, face] = roots.index(find(face))
+
+    _sheet_table_cache.append(table)
+    return table
+
+
+def offset_mesh(mesh, index, height_mm):
+    """
+    The same offset as combiner.offset_shape gives the BRep letters
+    """
+    offset = index * 1.1 * height_mm
+    return Mesh(np.asarray(mesh.vertices) + np.array([offset, offset, 0]), mesh.triangles)
+
+
+def combine_letters(bitmap1, bitmap2, voxel_size, remove_redundant=False):
+    """
+    :return: The combined letter as a Mesh
+    """
+    if remove_redundant:
+        occupancy = remove_redundant_voxels(bitmap1, bitmap2)
+    else:
+        occupancy = combine_bitmaps(bitmap1, bitmap2)
+    return voxel_mesh(occupancy, voxel_size)
+
+
+def combine_words(word1, word2, face_factory, height_mm, remove_redundant=False, resolution=DEFAULT_RESOLUTION):
+    """
+    :return: The combined letters as Meshes, and the bitmaps of the letters of each word
+    """
+    bitmaps = {}
+    letters = list(_iter_combined_letters(word1, word2, face_factory, height_mm, remove_redundant, resolution,
+                                          bitmaps))
+    return letters, [bitmaps[l.upper()] for l in word1], [bitmaps[l.upper()] for l in word2]
+
+
+def iter_combined_letters(word1, word2, face_factory, height_mm, remove_redundant=False,
+                          resolution=DEFAULT_RESOLUTION):
+    """
+    Yields the combined letter for each letter pair of the words, in order, as a Mesh
+    :param resolution: How many voxels tall the letters are
+    """
+    return _iter_combined_letters(word1, word2, face_factory, height_mm, remove_redundant, resolution, {})
+
+
+def _iter_combined_letters(word1, word2, face_factory, height_mm, remove_redundant, resolution, bitmaps):
+    assert isinstance(word1, str)
+    assert isinstance(word2, str)
+    assert len(word1) == len(word2)
+
+    voxel_size = height_mm / resolution
+    finished = {}
+    for letter1, letter2 in zip(word1.upper(), word2.upper()):
+        for letter in (letter1, letter2):
+            if letter not in bitmaps:
+                bitmaps[letter] = rasterize(face_factory.create_outlines(letter), height_mm, voxel_size)
+
+        # Pairs are cheap enough that the only caching is of pairs repeated within the words
+        key = (letter1, letter2)
+        if key not in finished:
+            finished[key] = combine_letters(bitmaps[letter1], bitmaps[letter2], voxel_size, remove_redundant)
+        yield finished[key]
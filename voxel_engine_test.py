@@ -0,0 +1,123 @@
+import unittest
+import pathlib
+import tempfile
+from collections import Counter
+import numpy as np
+from export import Mesh, write_mesh_stl
+from face_factory import FaceFactory
+from voxel_engine import (combine_bitmaps, combine_words, count_components, rasterize, remove_redundant_voxels,
+                          voxel_mesh)
+
+
+def square_outline(x, y, size):
+    corners = [(x, y), (x + size, y), (x + size, y + size), (x, y + size)]
+    return [list(zip(corners, corners[1:] + corners[:1]))]
+
+
+def is_closed(mesh):
+    # Every edge of a closed, consistently wound, manifold mesh is used exactly once in each direction
+    edges = Counter()
+    for i, j, k in np.asarray(mesh.triangles).tolist():
+        edges.update([(i, j), (j, k), (k, i)])
+    return all(count == 1 and edges[(j, i)] == 1 for (i, j), count in edges.items())
+
+
+def mesh_volume(mesh):
+    vertices = np.asarray(mesh.vertices)
+    triangles = vertices[np.asarray(mesh.triangles)]
+    return np.einsum("ij,ij->", triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])) / 6
+
+
+class TestVoxelEngine(unittest.TestCase):
+    def test_rasterize(self):
+        bitmap = rasterize([square_outline(0, 0, 1)], 10, 1)
+        self.assertEqual((10, 10), bitmap.shape)
+        self.assertTrue(bitmap.all())
+
+        with_hole = rasterize([square_outline(0, 0, 1) + square_outline(0.3, 0.3, 0.4)], 10, 1)
+        self.assertEqual(100 - 16, with_hole.sum())
+        self.assertFalse(with_hole[3:7, 3:7].any())
+
+    def test_squares_make_a_closed_cube(self):
+        bitmap = np.ones((4, 4), dtype=bool)
+        occupancy = combine_bitmaps(bitmap, bitmap)
+        self.assertTrue(occupancy.all())
+        mesh = voxel_mesh(occupancy, 0.5)
+        # Only the outside faces, as 2 triangles each
+        self.assertEqual(6 * 4 * 4 * 2, len(mesh.triangles))
+        self.assertEqual(5 ** 3 - 3 ** 3, len(mesh.vertices))
+        self.assertTrue(is_closed(mesh))
+        np.testing.assert_allclose([[0, 0, 0], [2, 2, 2]], [mesh.vertices.min(axis=0), mesh.vertices.max(axis=0)])
+
+    def test_voxels_touching_along_an_edge_or_corner(self):
+        for other in ((1, 1, 0), (1, 1, 1)):
+            occupancy = np.zeros((2, 2, 2), dtype=bool)
+            occupancy[0, 0, 0] = occupancy[other] = True
+            mesh = voxel_mesh(occupancy, 1)
+            # Split apart, as two separate cubes
+            self.assertEqual(16, len(mesh.vertices))
+            self.assertTrue(is_closed(mesh))
+
+        # Touching along an edge, but joined around both its ends, so splitting the vertices isn't enough
+        occupancy = np.zeros((3, 3, 2), dtype=bool)
+        for voxel in ((0, 0, 1), (0, 1, 0), (0, 1, 1), (1, 0, 1), (1, 1, 0), (2, 0, 0), (2, 0, 1), (2, 1, 0)):
+            occupancy[voxel] = True
+        mesh = voxel_mesh(occupancy, 1)
+        self.assertTrue(is_closed(mesh))
+        self.assertAlmostEqual(occupancy.sum(), mesh_volume(mesh))
+
+    def test_random_voxels(self):
+        rng = np.random.RandomState(0)
+        for _ in range(20):
+            occupancy = rng.random_sample((6, 6, 6)) < 0.5
+            mesh = voxel_mesh(occupancy, 0.5)
+            self.assertTrue(is_closed(mesh))
+            self.assertAlmostEqual(occupancy.sum() * 0.125, mesh_volume(mesh))
+
+    def test_remove_redundant_voxels(self):
+        bitmap1 = np.array([[1, 1, 1, 1], [1, 0, 0, 1], [1, 1, 1, 1]], dtype=bool)
+        bitmap2 = np.array([[1, 1, 1], [0, 1, 0], [1, 1, 1]], dtype=bool)
+        kept = remove_redundant_voxels(bitmap1, bitmap2)
+        full = combine_bitmaps(bitmap1, bitmap2)
+        self.assertFalse((kept & ~full).any())
+        self.assertLess(kept.sum(), full.sum())
+        # Still looks the same from both directions
+        np.testing.assert_array_equal(bitmap1.T, kept.any(axis=1))
+        np.testing.assert_array_equal(bitmap2.T, kept.any(axis=0))
+        self.assertTrue(is_closed(voxel_mesh(kept, 1)))
+
+    def test_count_components(self):
+        # Boxes are (x start, x end, y start, y end)
+        self.assertEqual(1, count_components([[(0, 2, 0, 1), (1, 2, 1, 3)]]))
+        # Only touching along an edge
+        self.assertEqual(2, count_components([[(0, 1, 0, 1), (1, 2, 1, 2)]]))
+        self.assertEqual(1, count_components([[(0, 1, 0, 1), (2, 3, 0, 1)], [(0, 3, 0, 1)]]))
+        self.assertEqual(2, count_components([[(0, 1, 0, 1)], [], [(0, 1, 0, 1)]]))
+
+    def test_write_mesh_stl(self):
+        mesh = voxel_mesh(np.ones((1, 1, 1), dtype=bool), 2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = pathlib.Path(tmp_dir, "cube.stl")
+            write_mesh_stl(mesh, filepath)
+            self.assertEqual(84 + 50 * 12, filepath.stat().st_size)
+            self.assertEqual(12, int(np.frombuffer(filepath.read_bytes()[80:84], dtype="<u4")[0]))
+
+            write_mesh_stl(Mesh([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 1, 2)]), filepath, ascii=True)
+            text = filepath.read_text()
+            self.assertIn("facet normal 0.0 0.0 1.0", text)
+            self.assertEqual(3, text.count("vertex"))
+
+    def test_combine_words(self):
+        face_factory = FaceFactory(pathlib.Path(__file__).parent / "test_data")
+        letters, bitmaps1, bitmaps2 = combine_words("HEH", "TVT", face_factory, 50, remove_redundant=True)
+
+        self.assertEqual(3, len(letters))
+        self.assertIs(letters[0], letters[2])
+        self.assertIs(bitmaps1[0], bitmaps1[2])
+        for letter in letters:
+            self.assertGreater(len(letter.triangles), 0)
+            self.assertTrue(is_closed(letter))
+
+
+if __name__ == '__main__':
+    unittest.main()